@@ -0,0 +1,77 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.utils.qr_benchmark import (
+    DEGRADATIONS,
+    RESOLUTIONS,
+    benchmark_metadata,
+    build_corpus,
+    compare_results,
+    run_benchmark,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks QR decoding on a synthetic corpus of session QR codes "
+        "(several resolutions, blur, skew, JPEG artefacts, moiré) and reports "
+        "success rate and p50/p95/p99 latency per backend and pipeline stage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, default=4, help="Distinct session QRs in the corpus.")
+        parser.add_argument("--seed", type=int, default=7, help="Random seed (corpus is reproducible).")
+        parser.add_argument("--repeat", type=int, default=1, help="Decode each image this many times.")
+        parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS), help="Subset of resolutions.")
+        parser.add_argument("--degradations", nargs="+", choices=list(DEGRADATIONS), help="Subset of degradations.")
+        parser.add_argument("--out", help="Write the results as JSON to this file.")
+        parser.add_argument("--compare", help="Previous results JSON to diff against.")
+
+    def handle(self, *args, **options):
+        params = {
+            "sessions": options["sessions"],
+            "seed": options["seed"],
+            "repeat": options["repeat"],
+            "resolutions": options["resolutions"] or list(RESOLUTIONS),
+            "degradations": options["degradations"] or list(DEGRADATIONS),
+        }
+
+        corpus = build_corpus(
+            sessions=params["sessions"],
+            seed=params["seed"],
+            resolutions=params["resolutions"],
+            degradations=params["degradations"],
+        )
+        self.stdout.write(f"🧪 Decoding {len(corpus)} images x {params['repeat']} ...")
+
+        results = {"meta": benchmark_metadata(**params)}
+        results.update(run_benchmark(corpus, repeat=params["repeat"]))
+
+        self.stdout.write("\nBackend       success    p50 ms    p95 ms    p99 ms")
+        for name, row in results["backends"].items():
+            self.stdout.write(
+                f"{name:<12} {row['success_rate']:>8.1%} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+            )
+
+        self.stdout.write("\nPipeline stage     share    p50 ms    p95 ms")
+        for stage, row in sorted(results["pipeline_stages"].items(), key=lambda item: -item[1]["share"]):
+            self.stdout.write(f"{stage:<16} {row['share']:>7.1%} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f}")
+
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                previous = json.load(fh)
+            results["compare"] = {
+                "against": previous.get("meta", {}).get("commit"),
+                "deltas": compare_results(results, previous),
+            }
+            self.stdout.write(f"\nΔ vs {results['compare']['against'] or options['compare']}:")
+            for name, delta in results["compare"]["deltas"].items():
+                self.stdout.write(
+                    f"{name:<12} success {delta['success_rate']:+.2%}  p50 {delta['p50_ms']:+.2f} ms  p95 {delta['p95_ms']:+.2f} ms"
+                )
+
+        if options["out"]:
+            with open(options["out"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n✅ Results written to {options['out']}"))
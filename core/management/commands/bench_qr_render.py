@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.utils.qr_benchmark import benchmark_metadata, run_render_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks QR rendering per output format (1-bit PNG, SVG, raw module "
+        "matrix) against the legacy PNG path: render latency and bytes on the wire."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, default=4, help="Distinct session tokens to render.")
+        parser.add_argument("--scales", type=int, nargs="+", default=[4, 8], help="Pixels per module.")
+        parser.add_argument("--repeat", type=int, default=20, help="Renders per token and format.")
+        parser.add_argument("--out", help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        params = {"sessions": options["sessions"], "scales": options["scales"], "repeat": options["repeat"]}
+        results = {"meta": benchmark_metadata(**params)}
+        results["formats"] = run_render_benchmark(
+            sessions=params["sessions"], scales=tuple(params["scales"]), repeat=params["repeat"]
+        )
+
+        self.stdout.write("Format        p50 ms    p95 ms   speedup    bytes   gzip   size")
+        for name, row in results["formats"].items():
+            self.stdout.write(
+                f"{name:<12} {row['p50_ms']:>7.3f} {row['p95_ms']:>9.3f} {row['speedup']:>8.2f}x "
+                f"{row['bytes']:>8} {row['gzip_bytes']:>6} {row['size_ratio']:>6.1%}"
+            )
+
+        if options["out"]:
+            with open(options["out"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n✅ Results written to {options['out']}"))
@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.utils.qr_benchmark import benchmark_metadata
+from core.utils.summary_benchmark import run_summary_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the serializer-free summary read path against DRF's "
+        "AttendancePercentageSerializer(many=True) + JSONRenderer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Synthetic summary rows per response.")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per path.")
+        parser.add_argument(
+            "--from-db", action="store_true",
+            help="Query the AttendanceSummary table instead of using synthetic rows.",
+        )
+        parser.add_argument("--out", help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        params = {"rows": options["rows"], "repeat": options["repeat"], "from_db": options["from_db"]}
+        results = {"meta": benchmark_metadata(**params)}
+        results["paths"] = run_summary_benchmark(**params)
+
+        self.stdout.write("Path      p50 ms    p95 ms   speedup      bytes")
+        for name, row in results["paths"].items():
+            self.stdout.write(
+                f"{name:<8} {row['p50_ms']:>7.3f} {row['p95_ms']:>9.3f} {row['speedup']:>8.2f}x {row['bytes']:>10}"
+            )
+        if not results["paths"]["fast"]["identical_output"]:
+            self.stdout.write(self.style.WARNING("⚠️ Fast path output differs from the DRF path."))
+
+        if options["out"]:
+            with open(options["out"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n✅ Results written to {options['out']}"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.qr_sheets import SheetFilterError, sheet_filters, sheet_sessions, stream_qr_sheet_zip
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders printable QR codes for every session of a subject and/or date "
+        "range into a ZIP (one PNG per session plus index.csv), using a worker pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subject", help="Subject code, e.g. CS101.")
+        parser.add_argument("--from", dest="date_from", help="First class date (YYYY-MM-DD).")
+        parser.add_argument("--to", dest="date_to", help="Last class date (YYYY-MM-DD).")
+        parser.add_argument("--workers", type=int, default=4, help="Render processes (1 = inline).")
+        parser.add_argument("--out", required=True, help="Output ZIP path.")
+
+    def handle(self, *args, **options):
+        if not (options["subject"] or options["date_from"] or options["date_to"]):
+            raise CommandError("Give --subject and/or a --from/--to date range.")
+
+        try:
+            filters = sheet_filters(date_from=options["date_from"], date_to=options["date_to"])
+        except SheetFilterError as e:
+            raise CommandError(str(e))
+        sessions = sheet_sessions(
+            subject_code=options["subject"],
+            date_from=filters["date_from"],
+            date_to=filters["date_to"],
+        )
+
+        stats = {}
+        with open(options["out"], "wb") as fh:
+            for chunk in stream_qr_sheet_zip(sessions, workers=options["workers"], stats=stats):
+                fh.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['count']} QR codes written to {options['out']} "
+            f"in {stats['seconds']}s ({stats['per_second']}/s)"
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.utils.attendance_summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the per-(student, subject) AttendanceSummary counters from "
+        "the Attendance table (after raw SQL edits, restores or bulk imports)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT.")
+
+    def handle(self, *args, **options):
+        count = rebuild_summaries(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {count} attendance summary rows"))
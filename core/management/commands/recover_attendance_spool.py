@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.utils.attendance_spool import get_spool_config, recover_spool
+
+
+class Command(BaseCommand):
+    help = (
+        "Inserts attendance marks left in the write-behind spool by worker "
+        "processes that exited before flushing (segments of live workers are skipped)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Spool directory (default: settings.ATTENDANCE_SPOOL['PATH']).")
+
+    def handle(self, *args, **options):
+        directory = options["path"] or get_spool_config()["PATH"]
+        recovered = recover_spool(directory)
+        self.stdout.write(self.style.SUCCESS(f"✅ {recovered} spooled attendance marks recovered from {directory}"))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_summaries(apps, schema_editor):
+    Attendance = apps.get_model("core", "Attendance")
+    AttendanceSummary = apps.get_model("core", "AttendanceSummary")
+    rows = (
+        Attendance.objects
+        .values("student_id", "subject_id")
+        .annotate(total_classes=Count("id"), attended=Count("id", filter=Q(status="Present")))
+        .order_by()
+    )
+    AttendanceSummary.objects.bulk_create(
+        [AttendanceSummary(**row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_classes', models.PositiveIntegerField(default=0)),
+                ('attended', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='core.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='core.subject')),
+            ],
+            options={
+                'unique_together': {('student', 'subject')},
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_attendance_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['subject', 'id'], name='attendance_subject_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'subject', 'status'], name='attendance_stu_subj_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesummary',
+            index=models.Index(fields=['subject', 'student'], name='summary_subject_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['subject', '-class_date'], name='session_subject_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['teacher', 'code'], name='subject_teacher_code_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from datetime import datetime
 from django.db import models, connection
 from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
@@ -71,6 +72,12 @@ class Subject(models.Model):
     name = models.CharField(max_length=100)
     teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name="subjects")
 
+    class Meta:
+        indexes = [
+            # Teacher's subject list, ordered by code
+            models.Index(fields=["teacher", "code"], name="subject_teacher_code_idx"),
+        ]
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
@@ -83,9 +90,23 @@ class Session(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
 
+    class Meta:
+        indexes = [
+            # Sessions of a subject, newest first
+            models.Index(fields=["subject", "-class_date"], name="session_subject_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.subject.code} - {self.topic}"
 
+    @property
+    def starts_at(self):
+        return timezone.make_aware(datetime.combine(self.class_date, self.start_time))
+
+    @property
+    def ends_at(self):
+        return timezone.make_aware(datetime.combine(self.class_date, self.end_time))
+
 
 # ✅ Attendance Table
 class Attendance(models.Model):
@@ -97,11 +118,36 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ('session', 'student')
+        indexes = [
+            # Attendance list of a subject, keyset-paginated on id
+            models.Index(fields=["subject", "id"], name="attendance_subject_id_idx"),
+            # Per-student, per-subject counts (covers the status filter)
+            models.Index(fields=["student", "subject", "status"], name="attendance_stu_subj_status_idx"),
+        ]
 
     def __str__(self):
         return f"{self.student.student_id} → {self.session.subject.code}"
 
 
+# ✅ Attendance Summary — per (student, subject) counters kept in step with
+#    every attendance write (see core/utils/attendance_summary.py)
+class AttendanceSummary(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="attendance_summaries")
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name="attendance_summaries")
+    total_classes = models.PositiveIntegerField(default=0)
+    attended = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'subject')
+        indexes = [
+            # Per-subject summary, ordered by student
+            models.Index(fields=["subject", "student"], name="summary_subject_student_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} → {self.subject_id}: {self.attended}/{self.total_classes}"
+
 
 # ✅ Dynamic Table Creator (Optional)
 def create_dynamic_attendance_table(subject_code: str):
@@ -0,0 +1,155 @@
+# core/pagination.py
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import CharField, IntegerField, Q, TextField
+from rest_framework.response import Response
+
+# ✅ Defaults — override any key with settings.KEYSET_PAGINATION
+DEFAULT_PAGINATION_CONFIG = {
+    "PAGE_SIZE": 100,       # rows per page when ?cursor= is given without ?limit=
+    "MAX_PAGE_SIZE": 1000,
+}
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def get_pagination_config():
+    config = dict(DEFAULT_PAGINATION_CONFIG)
+    config.update(getattr(settings, "KEYSET_PAGINATION", {}))
+    return config
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Invalid cursor.")
+    return values
+
+
+def _key_field(model, lookup):
+    """
+    Model field a key lookup (e.g. "subject__code", "student_id") ends at;
+    a trailing foreign key resolves to the column it points to.
+    """
+    field = None
+    for part in lookup.split("__"):
+        if field is not None:
+            model = field.related_model
+        field = model._meta.get_field(part)
+    return field.target_field if field.is_relation else field
+
+
+def check_cursor_types(model, keys, values):
+    """
+    Raises InvalidCursor unless each cursor value has its key field's type
+    (e.g. a string for an integer id would otherwise fail inside the query).
+    """
+    for (lookup, _), value in zip(keys, values):
+        try:
+            field = _key_field(model, lookup)
+        except FieldDoesNotExist:
+            continue  # annotation — the database compares it
+        if isinstance(field, IntegerField):
+            valid = type(value) is int
+        elif isinstance(field, (CharField, TextField)):
+            valid = isinstance(value, str)
+        else:
+            try:
+                valid = value is not None and field.to_python(value) is not None
+            except (TypeError, ValidationError):
+                valid = False
+        if not valid:
+            raise InvalidCursor("Invalid cursor.")
+
+
+def _after(keys, values):
+    """
+    Q for rows strictly after `values` in (k1, k2, ...) ascending order.
+    """
+    query = Q()
+    for i, (lookup, _) in enumerate(keys):
+        clause = Q(**{f"{lookup}__gt": values[i]})
+        for (earlier, _), value in zip(keys[:i], values[:i]):
+            clause &= Q(**{earlier: value})
+        query |= clause
+    return query
+
+
+def _key_value(row, attribute):
+    return row[attribute] if isinstance(row, dict) else getattr(row, attribute)
+
+
+def page_size(request):
+    config = get_pagination_config()
+    try:
+        size = int(request.query_params.get("limit", config["PAGE_SIZE"]))
+    except ValueError:
+        size = config["PAGE_SIZE"]
+    return min(max(size, 1), config["MAX_PAGE_SIZE"])
+
+
+def is_paginated(request):
+    return "limit" in request.query_params or "cursor" in request.query_params
+
+
+def keyset_page(request, queryset, keys):
+    """
+    One page of `queryset` ordered by `keys` — a list of (lookup, attribute)
+    pairs that together are unique. The ?cursor= carries the last row's key
+    values, so every page is an index range scan (flat latency at any depth).
+
+    Pagination is opt-in: without ?limit= or ?cursor= every row is returned
+    (in key order), so existing clients never get a silently truncated list.
+
+    Returns (rows, next_cursor or None). Raises InvalidCursor.
+    """
+    queryset = queryset.order_by(*[lookup for lookup, _ in keys])
+    if not is_paginated(request):
+        return list(queryset), None
+
+    size = page_size(request)
+    cursor = request.query_params.get("cursor")
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        check_cursor_types(queryset.model, keys, values)
+        queryset = queryset.filter(_after(keys, values))
+
+    rows = list(queryset[:size + 1])
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor([_key_value(rows[-1], attribute) for _, attribute in keys])
+
+
+def paginated_response(request, data, next_cursor, status=200):
+    """
+    Response with the page as a plain JSON array; the next page is linked
+    from the Link / X-Next-Cursor headers.
+    """
+    return link_next_page(request, Response(data, status=status), next_cursor)
+
+
+def link_next_page(request, response, next_cursor):
+    """
+    Sets the Link / X-Next-Cursor headers on any response (DRF or plain).
+    """
+    if next_cursor:
+        params = request.query_params.copy()
+        params["cursor"] = next_cursor
+        params["limit"] = page_size(request)
+        url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+        response["Link"] = f'<{url}>; rel="next"'
+        response["X-Next-Cursor"] = next_cursor
+    return response
@@ -0,0 +1,43 @@
+# core/renderers.py
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Lets an endpoint that returns its own bytes (images, streamed exports)
+    accept a non-JSON Accept header. Error payloads are still rendered as JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            response["Content-Type"] = "application/json"
+        return json.dumps(data).encode()
+
+
+class QRImageRenderer(PassthroughRenderer):
+    media_type = "image/*"
+    format = "qr"
+
+
+class QRMatrixRenderer(PassthroughRenderer):
+    media_type = "application/octet-stream"
+    format = "matrix"
+
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(PassthroughRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+QR_RENDERER_CLASSES = [JSONRenderer, QRImageRenderer, QRMatrixRenderer]
+EXPORT_RENDERER_CLASSES = [JSONRenderer, CSVRenderer, NDJSONRenderer]
@@ -0,0 +1,69 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.models import Attendance, Session, Student, Subject, Teacher
+from core.utils.attendance_summary import bump_summary, drop_from_summary, refresh_summaries
+from core.utils.qr_image_cache import get_session_qr_cache
+from core.utils.qr_rotation import get_rotating_frame_cache
+from core.utils.response_cache import bump_versions
+from core.utils.session_registry import get_session_registry
+
+
+# ✅ Drop cached QR images / registry entries whenever the data they hold changes
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def invalidate_session_qr(sender, instance, **kwargs):
+    get_session_qr_cache().invalidate(instance.id)
+    get_rotating_frame_cache().invalidate(instance.id)
+    get_session_registry().invalidate(instance.id)
+
+
+@receiver(post_save, sender=Subject)
+def invalidate_subject_qrs(sender, instance, created, **kwargs):
+    if created:
+        return
+    cache = get_session_qr_cache()
+    rotating = get_rotating_frame_cache()
+    registry = get_session_registry()
+    for session_id in instance.sessions.values_list("id", flat=True):
+        cache.invalidate(session_id)
+        rotating.invalidate(session_id)
+        registry.invalidate(session_id)
+
+
+# ✅ Keep AttendanceSummary counters in step with ORM writes (inside the
+#    writer's transaction). Bulk inserts add their inserted rows explicitly.
+@receiver(post_save, sender=Attendance)
+def count_attendance(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump_summary(instance.student_id, instance.subject_id, instance.status == "Present")
+    else:
+        refresh_summaries([(instance.student_id, instance.subject_id)])
+
+
+@receiver(post_delete, sender=Attendance)
+def uncount_attendance(sender, instance, **kwargs):
+    drop_from_summary(instance.student_id, instance.subject_id, instance.status == "Present")
+
+
+# ✅ Roll the response-cache version of whatever a write touched
+RESPONSE_CACHE_SCOPES = {
+    Subject: "subject",
+    Session: "session",
+    Student: "student",
+    Teacher: "teacher",
+    Attendance: "attendance",
+}
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    if kwargs.get("raw"):
+        return
+    bump_versions(RESPONSE_CACHE_SCOPES[sender])
+
+
+for _model in RESPONSE_CACHE_SCOPES:
+    post_save.connect(invalidate_cached_responses, sender=_model, dispatch_uid=f"response-cache-save-{_model.__name__}")
+    post_delete.connect(invalidate_cached_responses, sender=_model, dispatch_uid=f"response-cache-delete-{_model.__name__}")
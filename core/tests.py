@@ -1,3 +1,670 @@
-from django.test import TestCase
+import csv
+import datetime
+import fcntl
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Attendance, AttendanceSummary, Session, Student, Subject, Teacher, User
+from core.pagination import encode_cursor
+from core.throttles import charge_verified_session
+from core.utils.admission import AdmissionController, get_admission_config
+from core.utils.attendance_export import ATTENDANCE_COLUMNS
+from core.utils.attendance_spool import AttendanceSpool, get_spool_config, has_pending_marks, pending_marks, recover_spool
+from core.utils.attendance_summary import bump_summaries, rebuild_summaries, refresh_summaries
+from core.utils.attendance_writer import ALREADY_MARKED, MARKED, SESSION_NOT_STARTED, insert_attendance, mark_attendance
+from core.utils.fast_summary import percentage
+from core.utils.idempotency import REPLAYED_HEADER, IdempotencyStore, get_idempotency_config
+from core.utils.qr_token import session_token
+from core.utils.session_registry import (
+    ENDED as REGISTRY_ENDED,
+    NOT_FOUND as REGISTRY_NOT_FOUND,
+    NOT_STARTED as REGISTRY_NOT_STARTED,
+    ActiveSessionRegistry,
+    get_registry_config,
+    get_session_registry,
+)
+
+
+# ✅ Concurrent duplicate scans must yield one row and no 500s
+class ConcurrentMarkAttendanceTests(TransactionTestCase):
+    SCANS = 16
+
+    def setUp(self):
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        self.student = Student.objects.create(student_id="S1", name="Student", department="CS", email="s1@example.com")
+        self.subject = Subject.objects.create(code="CS101", name="Intro", teacher=teacher)
+        self.session = Session.objects.create(
+            subject=self.subject,
+            topic="Concurrency",
+            class_date=timezone.localdate(),
+            start_time=datetime.time(0, 0),
+            end_time=datetime.time(23, 59),
+        )
+        self.user = User.objects.create_user("s1", "pw", role="student", linked_id="S1")
+
+    def _in_parallel(self, func):
+        barrier = threading.Barrier(self.SCANS)
+        results = [None] * self.SCANS
+
+        def worker(index):
+            try:
+                barrier.wait()
+                results[index] = func()
+            except Exception as e:
+                results[index] = e
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.SCANS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    @skipIf(connection.vendor == "sqlite", "SQLite locks the whole table under concurrent writers")
+    def test_parallel_mark_attendance_inserts_once(self):
+        results = self._in_parallel(lambda: mark_attendance("S1", "CS101", self.session.id)[0])
+
+        self.assertEqual(results.count(MARKED), 1, results)
+        self.assertEqual(results.count(ALREADY_MARKED), self.SCANS - 1, results)
+        self.assertEqual(Attendance.objects.filter(session=self.session, student=self.student).count(), 1)
+        summary = AttendanceSummary.objects.get(student=self.student, subject=self.subject)
+        self.assertEqual((summary.total_classes, summary.attended), (1, 1))
+
+    @skipIf(connection.vendor == "sqlite", "SQLite locks the whole table under concurrent writers")
+    def test_parallel_scans_through_api(self):
+        token = session_token(self.session)
+
+        def scan():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.post(
+                "/student/mark-attendance/token/",
+                {"student_id": "S1", "token": token},
+                format="json",
+            )
+            return response.status_code
+
+        codes = self._in_parallel(scan)
+
+        self.assertEqual(codes.count(201), 1, codes)
+        self.assertEqual(codes.count(200), self.SCANS - 1, codes)
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 1)
+
+    def test_unknown_student_and_session(self):
+        self.assertEqual(mark_attendance("NOPE", "CS101", self.session.id)[0], "student_not_found")
+        self.assertEqual(mark_attendance("S1", "OTHER", self.session.id)[0], "session_not_found")
+        self.assertEqual(mark_attendance("S1", "CS101", "abc")[0], "session_not_found")
+
+
+# ✅ Class times are local wall-clock times in settings.TIME_ZONE
+class SessionTimeZoneTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        Student.objects.create(student_id="S1", name="Student", department="CS", email="s1@example.com")
+        self.subject = Subject.objects.create(code="CS101", name="Intro", teacher=teacher)
+
+    def _session_at(self, start):
+        end = min(start + datetime.timedelta(hours=1), start.replace(hour=23, minute=59, second=59))
+        return Session.objects.create(
+            subject=self.subject, topic="Local time", class_date=start.date(),
+            start_time=start.time(), end_time=end.time(),
+        )
+
+    def test_session_starting_now_in_local_time(self):
+        for zone in ("UTC", "Asia/Kolkata", "America/Los_Angeles"):
+            with self.subTest(zone=zone), override_settings(TIME_ZONE=zone):
+                now = timezone.localtime().replace(second=0, microsecond=0, tzinfo=None)
+                session = self._session_at(now)
+                self.assertLessEqual(session.starts_at, timezone.now())
+                self.assertEqual(mark_attendance("S1", "CS101", session.id)[0], MARKED)
+
+                later = self._session_at(now + datetime.timedelta(hours=3))
+                if later.class_date == now.date():
+                    self.assertEqual(mark_attendance("S1", "CS101", later.id)[0], SESSION_NOT_STARTED)
+
+
+# ✅ Summary counters maintained by every writer must match a recount of Attendance
+class AttendanceSummaryCounterTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        self.subjects = [
+            Subject.objects.create(code=f"CS10{i}", name="Intro", teacher=teacher) for i in range(2)
+        ]
+        self.sessions = [
+            Session.objects.create(
+                subject=subject, topic=f"Week {week}", class_date=timezone.localdate(),
+                start_time=datetime.time(0, 0), end_time=datetime.time(23, 59),
+            )
+            for subject in self.subjects for week in range(3)
+        ]
+        for index in range(3):
+            Student.objects.create(student_id=f"S{index}", name="Student", department="CS", email=f"s{index}@example.com")
+
+    def _counters(self):
+        return {
+            (row.student_id, row.subject_id): (row.total_classes, row.attended)
+            for row in AttendanceSummary.objects.filter(total_classes__gt=0)
+        }
+
+    def _recount(self):
+        return {
+            (row["student_id"], row["subject_id"]): (row["total"], row["present"])
+            for row in Attendance.objects.values("student_id", "subject_id").annotate(
+                total=Count("id"), present=Count("id", filter=Q(status="Present")),
+            )
+        }
+
+    def test_writers_keep_counters_equal_to_recount(self):
+        first, second = self.sessions[0], self.sessions[3]
+        self.assertEqual(mark_attendance("S0", first.subject.code, first.id)[0], MARKED)
+        self.assertEqual(mark_attendance("S0", first.subject.code, first.id)[0], ALREADY_MARKED)
+
+        # Batch / spool path: only rows actually inserted are added (S0's is a duplicate)
+        now = timezone.now()
+        rows = [(session.id, session.subject_id, student_id, now)
+                for session in self.sessions[:2] for student_id in ("S0", "S1")]
+        inserted = insert_attendance(rows)
+        bump_summaries((student_id, subject_id) for session_id, subject_id, student_id, _ in rows
+                       if (session_id, student_id) in inserted)
+
+        # ORM writes go through the save / delete signals
+        absent = Attendance.objects.create(session=second, subject=second.subject, student_id="S2", status="Absent")
+        late = Attendance.objects.create(session=self.sessions[4], subject=second.subject, student_id="S2")
+        absent.status = "Present"
+        absent.save()
+        late.delete()
+
+        self.assertEqual(self._counters(), self._recount())
+        self.assertEqual(self._counters()[("S0", first.subject_id)], (2, 2))
+
+    def test_refresh_repairs_drift(self):
+        session = self.sessions[0]
+        mark_attendance("S1", session.subject.code, session.id)
+        AttendanceSummary.objects.update(total_classes=7, attended=5)
+
+        refresh_summaries([("S1", session.subject_id)])
+
+        self.assertEqual(self._counters(), self._recount())
+
+
+# ✅ Active-session registry: scans validated from memory inside the session window
+class ActiveSessionRegistryTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        self.subject = Subject.objects.create(code="CS101", name="Intro", teacher=teacher)
+        self.session = Session.objects.create(
+            subject=self.subject, topic="Registry", class_date=timezone.localdate(),
+            start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+        )
+        self.registry = ActiveSessionRegistry(dict(get_registry_config(), OPEN_BEFORE=900, CLOSE_AFTER=300))
+
+    def test_window_and_cached_lookups(self):
+        starts = self.session.starts_at.timestamp()
+        ends = self.session.ends_at.timestamp()
+        sid = self.session.id
+
+        self.assertEqual(self.registry.validate(sid, "CS101", starts - 901)[1], REGISTRY_NOT_STARTED)
+        self.assertEqual(self.registry.validate(sid, "CS101", ends + 301)[1], REGISTRY_ENDED)
+        self.assertEqual(self.registry.validate(sid, "OTHER", starts)[1], REGISTRY_NOT_FOUND)
+        self.assertEqual(self.registry.validate("abc", "CS101", starts), (None, REGISTRY_NOT_FOUND))
+
+        self.registry.validate(sid, "CS101", starts - 900)
+        with self.assertNumQueries(0):
+            session, error = self.registry.validate(sid, "CS101", starts + 60)
+        self.assertIsNone(error)
+        self.assertEqual(session.id, sid)
+
+    def test_session_save_invalidates_entry(self):
+        registry = get_session_registry()
+        now = self.session.starts_at.timestamp()
+        registry.validate(self.session.id, "CS101", now)
+
+        self.session.end_time = datetime.time(9, 30)
+        self.session.save()
+
+        with self.assertNumQueries(1):
+            _, error = registry.validate(self.session.id, "CS101", self.session.ends_at.timestamp() + 400)
+        self.assertEqual(error, REGISTRY_ENDED)
+
+
+# ✅ Idempotency-Key: a retried mark replays the first response instead of re-running
+@override_settings(ADMISSION_CONTROL={"ENABLED": False})
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        Student.objects.create(student_id="S1", name="Student", department="CS", email="s1@example.com")
+        subject = Subject.objects.create(code="CS101", name="Intro", teacher=teacher)
+        self.session = Session.objects.create(
+            subject=subject, topic="Retry", class_date=timezone.localdate(),
+            start_time=datetime.time(0, 0), end_time=datetime.time(23, 59),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("s1", "pw", role="student", linked_id="S1"))
+        self.store = IdempotencyStore(dict(get_idempotency_config(), WAIT_TIMEOUT=0.1, POLL_INTERVAL=0.01))
+
+    def _mark(self, key, **extra):
+        return self.client.post(
+            "/student/mark-attendance/token/",
+            dict({"student_id": "S1", "token": session_token(self.session)}, **extra),
+            format="json", HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self._mark("retry-1")
+        second = self._mark("retry-1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second[REPLAYED_HEADER], "true")
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 1)
+
+    def test_same_key_with_different_body_runs_again(self):
+        self.assertEqual(self._mark("retry-2").status_code, 201)
+
+        response = self._mark("retry-2", note="edited")
+
+        self.assertEqual(response.status_code, 200)   # already marked — not a replay of the 201
+        self.assertFalse(response.has_header(REPLAYED_HEADER))
+
+    def test_duplicate_while_in_flight_is_busy(self):
+        key = self.store.make_key(1, "/path/", "k", "digest")
+        self.assertEqual(self.store.claim(key), ("new", None))
+        self.assertEqual(self.store.claim(key), ("busy", None))
+
+        self.store.complete(key, Response({"ok": True}, status=201))
+        self.assertEqual(self.store.claim(key), ("done", (201, {"ok": True}, {})))
+
+    def test_non_drf_and_server_error_responses_are_not_stored(self):
+        for response in (HttpResponse(b"png", content_type="image/png"), Response({"error": "x"}, status=503)):
+            key = self.store.make_key(1, "/path/", str(response.status_code), "digest")
+            self.store.claim(key)
+            self.store.complete(key, response)
+            self.assertEqual(self.store.claim(key), ("new", None))
+
+
+# ✅ Admission control: a session that used its budget is shed with 429 + Retry-After
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        subject = Subject.objects.create(code="CS101", name="Intro", teacher=teacher)
+        self.session = Session.objects.create(
+            subject=subject, topic="Admission", class_date=timezone.localdate(),
+            start_time=datetime.time(0, 0), end_time=datetime.time(23, 59),
+        )
+        self.clients = []
+        for index in range(3):
+            Student.objects.create(student_id=f"S{index}", name="Student", department="CS", email=f"s{index}@example.com")
+            client = APIClient()
+            client.force_authenticate(User.objects.create_user(f"s{index}", "pw", role="student", linked_id=f"S{index}"))
+            self.clients.append(client)
+
+        config = dict(get_admission_config(), ENABLED=True, SESSION_RATE=0.5, SESSION_BURST=2)
+        patcher = mock.patch("core.utils.admission._controller", AdmissionController(config))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _mark(self, index):
+        return self.clients[index].post(
+            "/student/mark-attendance/token/",
+            {"student_id": f"S{index}", "token": session_token(self.session)},
+            format="json",
+        )
+
+    def test_session_bucket_exhaustion(self):
+        with override_settings(ADMISSION_CONTROL={"ENABLED": True}):
+            self.assertEqual(self._mark(0).status_code, 201)
+            self.assertEqual(self._mark(1).status_code, 201)
+
+            shed = self._mark(2)
+
+            # Uploads are charged to their verified session's upload bucket the same way
+            uploads = [charge_verified_session(self.session.id) for _ in range(3)]
+
+        self.assertEqual(shed.status_code, 429)
+        self.assertGreaterEqual(int(shed["Retry-After"]), 1)
+        self.assertFalse(Attendance.objects.filter(student_id="S2").exists())
+        self.assertEqual([admitted for admitted, _ in uploads], [True, True, False])
+        self.assertGreater(uploads[2][1], 0)
+
+
+# ✅ Write-behind spool: acknowledged marks are durable, visible and stored once
+class AttendanceSpoolTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.config = dict(
+            get_spool_config(), ENABLED=True, PATH=self.directory, FLUSH_INTERVAL=3600, FSYNC=False,
+        )
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        Student.objects.create(student_id="S1", name="Student", department="CS", email="s1@example.com")
+        self.subject = Subject.objects.create(code="CS101", name="Intro", teacher=teacher)
+        self.session = Session.objects.create(
+            subject=self.subject, topic="Spool", class_date=timezone.localdate(),
+            start_time=datetime.time(0, 0), end_time=datetime.time(23, 59),
+        )
+
+    def _segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".jsonl"))
+
+    def test_flush_stores_spooled_marks_once(self):
+        spool = AttendanceSpool(self.config)
+        self.assertEqual(spool.submit("S1", "CS101", self.session.id)[0], MARKED)
+        self.assertEqual(spool.submit("S1", "CS101", self.session.id)[0], ALREADY_MARKED)
+        self.assertFalse(Attendance.objects.exists())
+
+        with override_settings(ATTENDANCE_SPOOL=self.config):
+            self.assertEqual([mark["session_id"] for mark in pending_marks("S1")], [self.session.id])
+            self.assertTrue(has_pending_marks(None, "S1"))
+
+            spool.flush()
+
+            self.assertEqual(pending_marks("S1"), [])
+            self.assertFalse(has_pending_marks(None, "S1"))
+        self.assertEqual(Attendance.objects.filter(session=self.session, student_id="S1").count(), 1)
+        summary = AttendanceSummary.objects.get(student_id="S1", subject=self.subject)
+        self.assertEqual((summary.total_classes, summary.attended), (1, 1))
+        self.assertEqual(len(self._segments()), 1)   # only the fresh, empty active segment
+
+    def test_recover_replays_unlocked_segments_only(self):
+        record = {
+            "session_id": self.session.id, "subject_id": self.subject.id, "subject_code": "CS101",
+            "student_id": "S1", "marked_at": timezone.now().isoformat(),
+        }
+        dead = os.path.join(self.directory, "attendance-999999-dead-1.jsonl")
+        with open(dead, "w", encoding="utf-8") as fh:
+            fh.write(json.dumps(record) + "\n" + '{"torn')
+        live = open(os.path.join(self.directory, "attendance-999999-live-1.jsonl"), "a+", encoding="utf-8")
+        self.addCleanup(live.close)
+        fcntl.flock(live, fcntl.LOCK_EX)
+        live.write(json.dumps(dict(record, student_id="S2")) + "\n")
+        live.flush()
+
+        self.assertEqual(recover_spool(self.directory), 1)
+        self.assertEqual(recover_spool(self.directory), 0)
+
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 1)
+        self.assertEqual(self._segments(), ["attendance-999999-live-1.jsonl"])
+
+
+# ✅ Keyset pagination: opt-in pages that round-trip through the cursor
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        for index in range(5):
+            Student.objects.create(student_id=f"S{index}", name="Student", department="CS", email=f"s{index}@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", "pw", role="admin"))
+
+    def test_cursor_round_trip(self):
+        seen, params = [], {"limit": 2}
+        while True:
+            response = self.client.get("/adminuser/students/", params)
+            self.assertEqual(response.status_code, 200)
+            seen += [row["student_id"] for row in response.json()]
+            if not response.has_header("X-Next-Cursor"):
+                break
+            self.assertIn('rel="next"', response["Link"])
+            params = {"limit": 2, "cursor": response["X-Next-Cursor"]}
+
+        self.assertEqual(seen, [f"S{index}" for index in range(5)])
+
+    def test_unpaginated_request_returns_every_row(self):
+        with override_settings(KEYSET_PAGINATION={"PAGE_SIZE": 2}):
+            response = self.client.get("/adminuser/students/")
+
+        self.assertEqual(len(response.json()), 5)
+        self.assertFalse(response.has_header("Link"))
+
+    def test_bad_cursor_is_rejected(self):
+        for cursor in ("not-a-cursor", encode_cursor([1]), encode_cursor(["S1", "S2"])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/adminuser/students/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+
+# ✅ Streamed CSV / NDJSON exports
+class AttendanceExportTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        subjects = [Subject.objects.create(code=code, name=code, teacher=teacher) for code in ("CS101", "EE201")]
+        students = [
+            Student.objects.create(student_id=f"S{index}", name=f"Student {index}", department=dept, email=f"s{index}@example.com")
+            for index, dept in enumerate(("CS", "EE"))
+        ]
+        for day, subject in ((1, subjects[0]), (2, subjects[0]), (3, subjects[1])):
+            session = Session.objects.create(
+                subject=subject, topic=f"Day {day}", class_date=datetime.date(2025, 1, day),
+                start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+            )
+            for student in students:
+                status = "Absent" if (student.student_id, day) == ("S1", 2) else "Present"
+                Attendance.objects.create(session=session, subject=subject, student=student, status=status)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", "pw", role="admin"))
+
+    def _export(self, kind, **params):
+        response = self.client.get(f"/adminuser/export/{kind}/", params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_attendance_csv(self):
+        response, body = self._export("attendance", subject="CS101")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(tuple(rows[0]), ATTENDANCE_COLUMNS)
+        self.assertEqual(
+            [(row[0], row[5], row[7]) for row in rows[1:]],
+            [("S0", "2025-01-01", "Present"), ("S1", "2025-01-01", "Present"),
+             ("S0", "2025-01-02", "Present"), ("S1", "2025-01-02", "Absent")],
+        )
+
+    def test_summary_ndjson(self):
+        response, body = self._export("summary", export_format="ndjson")
+        ranged = self._export("summary", export_format="ndjson", date_to="2025-01-01")[1]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(
+            [(row["student_id"], row["subject_code"], row["total_classes"], row["attended"], row["percentage"])
+             for row in rows],
+            [("S0", "CS101", 2, 2, 100.0), ("S0", "EE201", 1, 1, 100.0),
+             ("S1", "CS101", 2, 1, 50.0), ("S1", "EE201", 1, 1, 100.0)],
+        )
+        self.assertEqual([json.loads(line)["total_classes"] for line in ranged.splitlines()], [1, 1])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get("/adminuser/export/summary/", {"date_from": "01/02/2025"}).status_code, 400)
+        self.assertEqual(self.client.get("/adminuser/export/summary/", {"export_format": "xlsx"}).status_code, 400)
+        self.assertEqual(self.client.get("/adminuser/export/unknown/").status_code, 404)
+
+
+# ✅ Summary percentages round like Python's round() on every endpoint (ties to even)
+class SummaryPercentageTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(teacher_id="T1", name="Teacher", department="CS", email="t1@example.com")
+        Student.objects.create(student_id="S1", name="Student", department="CS", email="s1@example.com")
+        for code, attended in (("CS101", 1), ("CS102", 3)):
+            subject = Subject.objects.create(code=code, name=code, teacher=teacher)
+            AttendanceSummary.objects.create(student_id="S1", subject=subject, total_classes=32, attended=attended)
+        self.client = APIClient()
+
+    def test_tie_values(self):
+        expected = {"CS101": 3.12, "CS102": 9.38}   # 3.125 and 9.375 exactly
+        self.assertEqual({code: percentage(attended, 32) for code, attended in (("CS101", 1), ("CS102", 3))}, expected)
+
+        for user, url in (
+            (User.objects.create_user("s1", "pw", role="student", linked_id="S1"), "/student/attendance-overall/S1/"),
+            (User.objects.create_user("admin", "pw", role="admin"), "/adminuser/student-attendance/S1/"),
+        ):
+            with self.subTest(url=url):
+                self.client.force_authenticate(user)
+                rows = self.client.get(url).json()
+                self.assertEqual({row["subject_code"]: row["percentage"] for row in rows}, expected)
+
+
+# ✅ Every read view's main query must keep using its index as the tables grow.
+#    EXPLAIN runs with the default planner settings on a dataset sized like a
+#    real term (100 subjects, 2000 students, 160k attendance rows), so a missing
+#    or unusable index shows up as a different plan, not just a slower one.
+#    Tiny tables (teachers, subjects) are expected to be seq-scanned.
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are checked on PostgreSQL only")
+@override_settings(RESPONSE_CACHE={"ENABLED": False}, ADMISSION_CONTROL={"ENABLED": False})
+class QueryPlanTests(TestCase):
+    SUBJECTS = 100
+    SESSIONS_PER_SUBJECT = 20
+    STUDENTS = 2000
+    SUBJECTS_PER_STUDENT = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        teachers = Teacher.objects.bulk_create([
+            Teacher(teacher_id=f"T{t}", name=f"Teacher {t}", department="CS", email=f"t{t}@example.com")
+            for t in range(10)
+        ])
+        subjects = Subject.objects.bulk_create([
+            Subject(code=f"SUB{i:03d}", name=f"Subject {i}", teacher=teachers[i % len(teachers)])
+            for i in range(cls.SUBJECTS)
+        ])
+        sessions = Session.objects.bulk_create([
+            Session(
+                subject=subject,
+                topic=f"Week {week}",
+                class_date=datetime.date(2030, 1, 1) + datetime.timedelta(days=7 * week + i % 5),
+                start_time=datetime.time(9, 0),
+                end_time=datetime.time(10, 0),
+            )
+            for i, subject in enumerate(subjects)
+            for week in range(cls.SESSIONS_PER_SUBJECT)
+        ])
+        students = Student.objects.bulk_create([
+            Student(student_id=f"S{i:05d}", name=f"Student {i}", department=("CS", "EE")[i % 2], email=f"s{i}@example.com")
+            for i in range(cls.STUDENTS)
+        ])
+
+        by_subject = {}
+        for session in sessions:
+            by_subject.setdefault(session.subject_id, []).append(session)
+        stride = cls.SUBJECTS // cls.SUBJECTS_PER_STUDENT
+        for i, student in enumerate(students):
+            Attendance.objects.bulk_create([
+                Attendance(
+                    session=session,
+                    subject_id=session.subject_id,
+                    student=student,
+                    status="Present" if (i + session.id) % 4 else "Absent",
+                )
+                for k in range(cls.SUBJECTS_PER_STUDENT)
+                for session in by_subject[subjects[(i + k * stride) % cls.SUBJECTS].id]
+            ])
+        rebuild_summaries()
+
+        cls.subject = subjects[1]
+        cls.student = students[1]
+        cls.admin = User.objects.create_user("admin", "pw", role="admin")
+        cls.teacher = User.objects.create_user("teacher", "pw", role="teacher", linked_id=cls.subject.teacher_id)
+        cls.student_user = User.objects.create_user("student", "pw", role="student", linked_id=cls.student.student_id)
+
+        with connection.cursor() as cursor:
+            for model in (Teacher, Student, Subject, Session, Attendance, AttendanceSummary):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def _index_on(self, model, *columns):
+        """
+        Name of the plain index on exactly `columns` (Django-generated names
+        for foreign keys carry a hash, so they are looked up).
+        """
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return next(
+            name for name, info in constraints.items()
+            if info["index"] and not info["unique"] and info["columns"] == list(columns)
+            and not name.endswith("_like")
+        )
+
+    def _endpoints(self):
+        """
+        (user, url, model whose rows the view reads, index that read must use).
+        List endpoints are read a page at a time (?limit=), as clients page them.
+        """
+        subject_id, code, student_id = self.subject.id, self.subject.code, self.student.student_id
+        by_student = self._index_on(AttendanceSummary, "student_id")
+        return [
+            (self.admin, "/adminuser/students/?limit=100", Student, f"{Student._meta.db_table}_pkey"),
+            (self.admin, f"/adminuser/student-attendance/{student_id}/", AttendanceSummary, by_student),
+            (self.admin, "/adminuser/all-attendance/?limit=100", AttendanceSummary, by_student),
+            (self.admin, f"/adminuser/export/attendance/?subject={code}", Attendance, self._index_on(Attendance, "subject_id")),
+            (self.admin, f"/adminuser/export/summary/?subject={code}", AttendanceSummary, "summary_subject_student_idx"),
+            (self.teacher, f"/teacher/sessions/{subject_id}/", Session, self._index_on(Session, "subject_id")),
+            (self.teacher, f"/teacher/attendance/{subject_id}/?limit=100", Attendance, "attendance_subject_id_idx"),
+            (self.teacher, f"/teacher/attendance/{subject_id}/{student_id}/", Attendance, "attendance_stu_subj_status_idx"),
+            (self.teacher, f"/teacher/attendance-summary/{subject_id}/", AttendanceSummary, "summary_subject_student_idx"),
+            (self.student_user, f"/student/attendance-overall/{student_id}/", AttendanceSummary, by_student),
+            (self.student_user, f"/student/attendance-subject/{student_id}/{code}/", Attendance, "attendance_stu_subj_status_idx"),
+        ]
+
+    def _captured_selects(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        selects = []
+        for query in captured.captured_queries:
+            sql = query["sql"].lstrip()
+            if sql.startswith("DECLARE"):   # server-side cursor (streamed exports)
+                sql = sql[sql.index(" FOR ") + len(" FOR "):]
+            if sql.upper().startswith("SELECT"):
+                selects.append(sql)
+        return selects
+
+    def _scans(self, sql):
+        """
+        (table, node type, index name or None) for every scan in the plan.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        found, nodes = [], [(plan[0]["Plan"], None)]
+        while nodes:
+            node, parent_table = nodes.pop()
+            # Bitmap Index Scans name the index; the table is on the Bitmap Heap Scan above
+            table = node.get("Relation Name") or parent_table
+            if "Scan" in node["Node Type"] and table:
+                found.append((table, node["Node Type"], node.get("Index Name")))
+            nodes.extend((child, table) for child in node.get("Plans", []))
+        return found
+
+    def test_read_views_use_expected_indexes(self):
+        for user, url, model, index in self._endpoints():
+            with self.subTest(url=url):
+                table = model._meta.db_table
+                scans = [scan for sql in self._captured_selects(user, url) for scan in self._scans(sql)]
+                on_table = [scan for scan in scans if scan[0] == table]
+                self.assertIn(index, [name for _, _, name in on_table], f"{url} scans {table} as {on_table}")
+                self.assertNotIn("Seq Scan", [node for _, node, _ in on_table], f"{url} seq-scans {table}")
@@ -0,0 +1,73 @@
+# core/throttles.py
+from rest_framework.throttling import BaseThrottle
+
+from core.utils.admission import MARK, READ, UPLOAD, get_admission_config, get_admission_controller
+from core.utils.qr_token import InvalidQRToken, verify_session_token
+
+
+def _session_bucket_key(session_id):
+    return f"session:{session_id}"
+
+
+def _session_key(request):
+    """
+    Bucket a mark request is charged to: the session of a submitted token
+    whose signature verifies, otherwise the authenticated student. Only JSON
+    bodies are read, so a multipart image upload is never parsed before the
+    request is admitted.
+    """
+    if request.content_type.startswith("application/json"):
+        token = request.data.get("token") if hasattr(request.data, "get") else None
+        if token:
+            try:
+                return _session_bucket_key(verify_session_token(str(token))["session_id"])
+            except InvalidQRToken:
+                pass  # the view rejects it; don't let a forged id pick a bucket
+    user = request.user
+    return f"student:{getattr(user, 'linked_id', None) or user.pk}"
+
+
+def charge_verified_session(session_id, endpoint_class=UPLOAD):
+    """
+    Uploads are admitted on the student's bucket (the image is not decoded
+    yet); once the QR verifies, charge the upload to its session's bucket
+    too, so the per-session cap covers decodes. Only verified session ids
+    are charged — a forged one could drain another session's bucket.
+    Returns (admitted, retry_after_seconds).
+    """
+    if not get_admission_config()["ENABLED"]:
+        return True, 0.0
+    return get_admission_controller().charge(endpoint_class, _session_bucket_key(session_id))
+
+
+class AdmissionThrottle(BaseThrottle):
+    """
+    Token-bucket admission control (see core/utils/admission.py).
+    Shed requests get DRF's 429 with a Retry-After header.
+    """
+    endpoint_class = READ
+    keyed_by_session = False
+
+    def allow_request(self, request, view):
+        if not get_admission_config()["ENABLED"]:
+            return True
+        session_key = _session_key(request) if self.keyed_by_session else None
+        admitted, self._wait = get_admission_controller().admit(self.endpoint_class, session_key)
+        return admitted
+
+    def wait(self):
+        return self._wait
+
+
+class ReadAdmissionThrottle(AdmissionThrottle):
+    endpoint_class = READ
+
+
+class UploadAdmissionThrottle(AdmissionThrottle):
+    endpoint_class = UPLOAD
+    keyed_by_session = True
+
+
+class MarkAdmissionThrottle(AdmissionThrottle):
+    endpoint_class = MARK
+    keyed_by_session = True
@@ -6,7 +6,9 @@ from core.views.admin_views import (
     ListStudentsAPIView,
     StudentAttendanceSummaryAPIView,
     AllStudentsAttendanceAPIView,
-    AdminLoginAPIView
+    AdminLoginAPIView,
+    DecodeStatsAPIView,
+    AttendanceExportAPIView
 )
 
 urlpatterns = [
@@ -17,4 +19,6 @@ urlpatterns = [
     path('students/', ListStudentsAPIView.as_view(), name='students-list'),
     path('student-attendance/<str:student_id>/', StudentAttendanceSummaryAPIView.as_view(), name='student-attendance'),
     path('all-attendance/', AllStudentsAttendanceAPIView.as_view(), name='all-students-attendance'),
+    path('export/<str:kind>/', AttendanceExportAPIView.as_view(), name='attendance-export'),
+    path('decode-stats/', DecodeStatsAPIView.as_view(), name='decode-stats'),
 ]
@@ -1,6 +1,8 @@
 from django.urls import path
 from core.views.student_views import (
     MarkAttendanceAPIView,
+    MarkAttendanceBatchAPIView,
+    MarkAttendanceTokenAPIView,
     OverallAttendanceAPIView,
     SubjectAttendanceAPIView,
     StudentLoginAPIView
@@ -9,6 +11,8 @@ from core.views.student_views import (
 urlpatterns = [
     path('login/', StudentLoginAPIView.as_view(), name='student-login'),
     path('mark-attendance/', MarkAttendanceAPIView.as_view(), name='mark-attendance'),
+    path('mark-attendance/batch/', MarkAttendanceBatchAPIView.as_view(), name='mark-attendance-batch'),
+    path('mark-attendance/token/', MarkAttendanceTokenAPIView.as_view(), name='mark-attendance-token'),
     path('attendance-overall/<str:student_id>/', OverallAttendanceAPIView.as_view(), name='overall-attendance'),
     path('attendance-subject/<str:student_id>/<str:subject_code>/', SubjectAttendanceAPIView.as_view(), name='subject-attendance'),
 ]
@@ -2,11 +2,15 @@ from django.urls import path
 from core.views.teacher_views import (
     CreateSubjectAPIView,
     CreateSessionAPIView,
+    SessionQRAPIView,
+    SessionRotatingQRAPIView,
+    SessionQRSheetAPIView,
     TeacherSubjectsAPIView,
     SubjectSessionsAPIView,
     SubjectAttendanceAPIView,
     StudentAttendancePercentageAPIView,
     SubjectAllStudentsAttendanceAPIView,
+    AttendanceTrendsAPIView,
     TeacherLoginAPIView
 )
 
@@ -14,9 +18,13 @@ urlpatterns = [
     path('login/', TeacherLoginAPIView.as_view(), name='teacher-login'),
     path('create-subject/', CreateSubjectAPIView.as_view(), name='create-subject'),
     path('create-session/', CreateSessionAPIView.as_view(), name='create-session'),
+    path('session-qr/<int:session_id>/', SessionQRAPIView.as_view(), name='session-qr'),
+    path('session-qr/<int:session_id>/rotating/', SessionRotatingQRAPIView.as_view(), name='session-qr-rotating'),
+    path('qr-sheets/', SessionQRSheetAPIView.as_view(), name='session-qr-sheets'),
     path('subjects/<str:teacher_id>/', TeacherSubjectsAPIView.as_view(), name='teacher-subjects'),
     path('sessions/<int:subject_id>/', SubjectSessionsAPIView.as_view(), name='subject-sessions'),
     path('attendance/<int:subject_id>/', SubjectAttendanceAPIView.as_view(), name='subject-attendance'),
     path('attendance/<int:subject_id>/<str:student_id>/', StudentAttendancePercentageAPIView.as_view(), name='student-attendance-percent'),
     path('attendance-summary/<int:subject_id>/', SubjectAllStudentsAttendanceAPIView.as_view(), name='subject-all-students'),
+    path('attendance-trends/', AttendanceTrendsAPIView.as_view(), name='attendance-trends'),
 ]
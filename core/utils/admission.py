@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# ✅ Defaults — override any key with settings.ADMISSION_CONTROL
+DEFAULT_ADMISSION_CONFIG = {
+    "ENABLED": True,
+    "RATE": 100,                 # requests/second the process admits overall
+    "BURST": 200,                # global bucket size
+    "READ_RESERVE": 0.25,        # share of the global bucket only "read" requests may use
+    "SESSION_RATE": 10,          # per (endpoint class, verified session or student) requests/second
+    "SESSION_BURST": 40,
+    "MAX_CONCURRENT_DECODES": 4, # image decodes running at once in this process
+    "MAX_SESSION_BUCKETS": 2048,
+}
+
+# ✅ Endpoint classes — uploads pay for an image decode, marks for a DB write,
+#    everything else (teacher / admin / student reads, logins) is "read".
+UPLOAD = "upload"
+MARK = "mark"
+READ = "read"
+ENDPOINT_CLASSES = (UPLOAD, MARK, READ)
+
+
+def get_admission_config():
+    config = dict(DEFAULT_ADMISSION_CONFIG)
+    config.update(getattr(settings, "ADMISSION_CONTROL", {}))
+    return config
+
+
+class TokenBucket:
+    """
+    Classic token bucket (not thread-safe; callers hold the controller lock).
+    """
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now if now is not None else time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now, floor=0.0):
+        """
+        Takes one token if that leaves at least `floor` tokens.
+        Returns 0 on success, else the seconds until it would succeed.
+        """
+        self.refill(now)
+        if self.tokens - 1 >= floor:
+            self.tokens -= 1
+            return 0.0
+        return (floor + 1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Admits or sheds requests before any work is done.
+
+    - A global bucket caps the process' request rate. Uploads and marks may
+      only take tokens while READ_RESERVE of it stays free, so a lecture
+      hall of scans can never starve teacher / admin reads.
+    - Per (endpoint class, session) buckets stop one session from using
+      the whole budget; requests without a verified token are keyed by the
+      authenticated student instead (see core/throttles.py).
+    - Uploads are admitted on the student's bucket (the image is not decoded
+      yet) and charge()d to their session's bucket once the QR verifies.
+    - A counter caps concurrent image decodes in this process.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_admission_config()
+        self._lock = threading.Lock()
+        self._global = TokenBucket(self.config["RATE"], self.config["BURST"])
+        self._sessions = OrderedDict()   # (endpoint class, session key) → TokenBucket
+        self._decodes = 0
+        self._stats = {
+            name: {"admitted": 0, "shed_global": 0, "shed_session": 0, "shed_decode": 0}
+            for name in ENDPOINT_CLASSES
+        }
+
+    def _session_bucket(self, key, now):
+        bucket = self._sessions.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.config["SESSION_RATE"], self.config["SESSION_BURST"], now)
+            self._sessions[key] = bucket
+            while len(self._sessions) > self.config["MAX_SESSION_BUCKETS"]:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(key)
+        return bucket
+
+    def admit(self, endpoint_class, session_key=None):
+        """
+        Returns (admitted, retry_after_seconds).
+        """
+        now = time.monotonic()
+        floor = 0.0 if endpoint_class == READ else self.config["BURST"] * self.config["READ_RESERVE"]
+        with self._lock:
+            stats = self._stats[endpoint_class]
+            if session_key is not None:
+                bucket = self._session_bucket((endpoint_class, session_key), now)
+                bucket.refill(now)
+                if bucket.tokens < 1:
+                    stats["shed_session"] += 1
+                    return False, (1 - bucket.tokens) / bucket.rate
+
+            wait = self._global.take(now, floor)
+            if wait:
+                stats["shed_global"] += 1
+                return False, wait
+
+            if session_key is not None:
+                bucket.tokens -= 1
+            stats["admitted"] += 1
+            return True, 0.0
+
+    def charge(self, endpoint_class, session_key):
+        """
+        Takes one token from a session bucket only, for a request that
+        already passed admit(). Returns (admitted, retry_after_seconds).
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._session_bucket((endpoint_class, session_key), now)
+            bucket.refill(now)
+            if bucket.tokens < 1:
+                self._stats[endpoint_class]["shed_session"] += 1
+                return False, (1 - bucket.tokens) / bucket.rate
+            bucket.tokens -= 1
+            return True, 0.0
+
+    @contextmanager
+    def decode_slot(self, endpoint_class=UPLOAD):
+        """
+        Yields True while holding one of MAX_CONCURRENT_DECODES slots,
+        or False (holding nothing) when all are taken.
+
+        The cap is per process: a sync gunicorn worker serves one request
+        at a time, so it only binds under threaded (gthread) or ASGI
+        workers. The decode pool's MAX_WORKERS / MAX_PENDING bound the
+        decode work itself (settings.QR_DECODE_POOL).
+        """
+        with self._lock:
+            acquired = self._decodes < self.config["MAX_CONCURRENT_DECODES"]
+            if acquired:
+                self._decodes += 1
+            else:
+                self._stats[endpoint_class]["shed_decode"] += 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with self._lock:
+                    self._decodes -= 1
+
+    def stats(self):
+        with self._lock:
+            self._global.refill(time.monotonic())
+            return {
+                "classes": {name: dict(stats) for name, stats in self._stats.items()},
+                "global_tokens": round(self._global.tokens, 1),
+                "read_reserve_tokens": round(self.config["BURST"] * self.config["READ_RESERVE"], 1),
+                "session_buckets": len(self._sessions),
+                "decodes_in_flight": self._decodes,
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
+
+
+def admission_stats():
+    return get_admission_controller().stats()
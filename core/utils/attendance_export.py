@@ -0,0 +1,171 @@
+import csv
+import json
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_date
+
+from core.models import Attendance, AttendanceSummary
+
+EXPORT_KINDS = ("attendance", "summary")
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+ATTENDANCE_COLUMNS = (
+    "student_id", "name", "department", "subject_code",
+    "session_id", "class_date", "start_time", "status", "marked_at",
+)
+SUMMARY_COLUMNS = (
+    "student_id", "name", "department", "subject_code",
+    "total_classes", "attended", "percentage",
+)
+
+# ✅ Defaults — override any key with settings.ATTENDANCE_EXPORT
+DEFAULT_EXPORT_CONFIG = {
+    "CHUNK_SIZE": 2000,      # rows fetched per server-side cursor round trip
+    "ROWS_PER_CHUNK": 500,   # rows joined into one streamed body chunk
+}
+
+
+def get_export_config():
+    config = dict(DEFAULT_EXPORT_CONFIG)
+    config.update(getattr(settings, "ATTENDANCE_EXPORT", {}))
+    return config
+
+
+class ExportFilterError(ValueError):
+    pass
+
+
+def negotiate_export_format(request):
+    """
+    Picks the export format from ?export_format= or the Accept header.
+    Returns None for an unknown format.
+    """
+    fmt = request.GET.get("export_format")
+    if not fmt:
+        accept = request.META.get("HTTP_ACCEPT", "")
+        fmt = "ndjson" if "application/x-ndjson" in accept else "csv"
+    return fmt if fmt in EXPORT_FORMATS else None
+
+
+def export_filters(params):
+    """
+    Reads subject / department / date_from / date_to from the query string.
+    Raises ExportFilterError for a malformed date.
+    """
+    filters = {
+        "subject": params.get("subject") or None,
+        "department": params.get("department") or None,
+    }
+    for key in ("date_from", "date_to"):
+        value = params.get(key)
+        try:
+            filters[key] = parse_date(value) if value else None
+        except ValueError:
+            filters[key] = None
+        if value and filters[key] is None:
+            raise ExportFilterError(f"Invalid {key} (expected YYYY-MM-DD).")
+    return filters
+
+
+def _filtered(queryset, filters, date_lookup):
+    if filters["subject"]:
+        queryset = queryset.filter(subject__code=filters["subject"])
+    if filters["department"]:
+        queryset = queryset.filter(student__department=filters["department"])
+    if filters["date_from"]:
+        queryset = queryset.filter(**{f"{date_lookup}__gte": filters["date_from"]})
+    if filters["date_to"]:
+        queryset = queryset.filter(**{f"{date_lookup}__lte": filters["date_to"]})
+    return queryset
+
+
+def attendance_rows(filters):
+    """
+    Raw attendance rows as tuples in ATTENDANCE_COLUMNS order, read through a
+    server-side cursor (constant memory regardless of table size).
+    """
+    queryset = _filtered(Attendance.objects.all(), filters, "session__class_date")
+    return (
+        queryset
+        .order_by("session__class_date", "session_id", "student_id")
+        .values_list(
+            "student_id", "student__name", "student__department", "subject__code",
+            "session_id", "session__class_date", "session__start_time", "status", "marked_at",
+        )
+        .iterator(chunk_size=get_export_config()["CHUNK_SIZE"])
+    )
+
+
+def summary_rows(filters):
+    """
+    Per-student, per-subject totals as tuples in SUMMARY_COLUMNS order.
+    Served from the summary table; a date range aggregates Attendance instead.
+    """
+    if filters["date_from"] or filters["date_to"]:
+        rows = (
+            _filtered(Attendance.objects.all(), filters, "session__class_date")
+            .values("student_id", "student__name", "student__department", "subject__code")
+            .annotate(total_classes=Count("id"), attended=Count("id", filter=Q(status="Present")))
+            .order_by("student_id", "subject__code")
+            .values_list(
+                "student_id", "student__name", "student__department", "subject__code",
+                "total_classes", "attended",
+            )
+        )
+    else:
+        rows = (
+            _filtered(AttendanceSummary.objects.filter(total_classes__gt=0), filters, None)
+            .order_by("student_id", "subject__code")
+            .values_list(
+                "student_id", "student__name", "student__department", "subject__code",
+                "total_classes", "attended",
+            )
+        )
+
+    for row in rows.iterator(chunk_size=get_export_config()["CHUNK_SIZE"]):
+        total, attended = row[4], row[5]
+        yield row + (round((attended / total) * 100, 2) if total else 0.0,)
+
+
+class _Echo:
+    """csv.writer target that hands back each formatted line."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + "\n"
+
+
+def stream_export(kind, fmt, filters):
+    """
+    Generator of encoded body chunks for a StreamingHttpResponse.
+    """
+    if kind == "summary":
+        columns, rows = SUMMARY_COLUMNS, summary_rows(filters)
+    else:
+        columns, rows = ATTENDANCE_COLUMNS, attendance_rows(filters)
+    lines = _csv_lines(columns, rows) if fmt == "csv" else _ndjson_lines(columns, rows)
+
+    rows_per_chunk = get_export_config()["ROWS_PER_CHUNK"]
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= rows_per_chunk:
+            yield "".join(buffer).encode()
+            buffer = []
+    if buffer:
+        yield "".join(buffer).encode()
@@ -0,0 +1,383 @@
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import Attendance, Student
+from core.utils.attendance_summary import bump_summaries
+from core.utils.attendance_writer import ALREADY_MARKED, MARKED, STUDENT_NOT_FOUND, insert_attendance
+from core.utils.response_cache import bump_versions
+from core.utils.session_registry import get_session_registry
+
+# ✅ Defaults — override any key with settings.ATTENDANCE_SPOOL
+DEFAULT_SPOOL_CONFIG = {
+    "ENABLED": False,
+    "PATH": None,             # spool directory (default: BASE_DIR/var/attendance_spool)
+    "BATCH_SIZE": 200,        # flush as soon as this many marks are buffered
+    "FLUSH_INTERVAL": 0.5,    # ... or this many seconds after the last flush
+    "FSYNC": True,            # fsync every appended mark before acknowledging it
+    "CLAIM_CACHE": "default", # Django cache alias holding duplicate claims and pending marks
+    "CLAIM_TTL": 300,         # seconds a claim outlives its mark (>> FLUSH_INTERVAL)
+}
+
+
+def get_spool_config():
+    config = dict(DEFAULT_SPOOL_CONFIG)
+    config.update(getattr(settings, "ATTENDANCE_SPOOL", {}))
+    if not config["PATH"]:
+        config["PATH"] = os.path.join(settings.BASE_DIR, "var", "attendance_spool")
+    return config
+
+
+def spool_enabled():
+    return get_spool_config()["ENABLED"]
+
+
+def _pending_key(student_id):
+    return f"spool:pending:{student_id}"
+
+
+def _add_pending(config, record):
+    cache = caches[config["CLAIM_CACHE"]]
+    key = _pending_key(record["student_id"])
+    marks = cache.get(key) or {}
+    marks[record["session_id"]] = record
+    cache.set(key, marks, config["CLAIM_TTL"])
+
+
+def _drop_pending(config, records):
+    """
+    Removes stored marks from the pending overlay. Not atomic: a mark the
+    same student spools in another worker at this instant can drop out of
+    the overlay until its own batch is stored (<= FLUSH_INTERVAL).
+    """
+    sessions = defaultdict(set)
+    for record in records:
+        sessions[record["student_id"]].add(record["session_id"])
+
+    cache = caches[config["CLAIM_CACHE"]]
+    for student_id, stored in sessions.items():
+        key = _pending_key(student_id)
+        marks = {
+            session_id: record for session_id, record in (cache.get(key) or {}).items()
+            if session_id not in stored
+        }
+        if marks:
+            cache.set(key, marks, config["CLAIM_TTL"])
+        else:
+            cache.delete(key)
+
+
+def _attendance_rows(records):
+    return [
+        (
+            record["session_id"], record["subject_id"], record["student_id"],
+            parse_datetime(record.get("marked_at") or "") or timezone.now(),
+        )
+        for record in records
+    ]
+
+
+def _insert_records(records):
+    """
+    Inserts spooled marks with their scan-time marked_at (ignoring ones
+    already stored) and adds the rows actually inserted to the summary
+    counters in the same transaction. Cached attendance responses are
+    invalidated once that transaction commits.
+    """
+    with transaction.atomic():
+        inserted = insert_attendance(_attendance_rows(records))
+        unique = {(record["session_id"], record["student_id"]): record for record in records}
+        bump_summaries(
+            (record["student_id"], record["subject_id"]) for key, record in unique.items()
+            if key in inserted
+        )
+        bump_versions("attendance")
+
+
+def _read_segment(fh):
+    fh.seek(0)
+    records = []
+    for line in fh:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            pass  # torn last line from a crash mid-append — never acknowledged
+    return records
+
+
+def recover_spool(directory):
+    """
+    Replays segments left behind by processes that died before flushing.
+    Returns the number of marks replayed.
+    """
+    # Segments still being created (not yet locked) have a temp name and are
+    # never touched here; one left by a process that died mid-create is empty
+    for path in glob.glob(os.path.join(directory, ".attendance-*.tmp")):
+        with open(path, "a", encoding="utf-8") as fh:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                continue
+            os.remove(path)
+
+    recovered = 0
+    for path in sorted(glob.glob(os.path.join(directory, "attendance-*.jsonl"))):
+        fh = open(path, "a+", encoding="utf-8")
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()  # still owned by a live process
+            continue
+        records = _read_segment(fh)
+        try:
+            if records:
+                _insert_records(records)
+                _drop_pending(get_spool_config(), records)
+            os.remove(path)
+        except Exception as e:
+            print(f"⚠️ Could not recover {os.path.basename(path)} (kept for the next start): {e}")
+            continue
+        finally:
+            fh.close()
+        recovered += len(records)
+        print(f"♻️ Recovered {len(records)} spooled attendance marks from {os.path.basename(path)}")
+    return recovered
+
+
+class AttendanceSpool:
+    """
+    Write-behind buffer for attendance marks.
+
+    A validated mark is appended (and fsynced) to this process's active
+    segment file under the spool directory and acknowledged at once; a
+    background thread inserts buffered marks with bulk_create when
+    BATCH_SIZE is reached or FLUSH_INTERVAL has passed, then deletes the
+    segment.
+
+    Segments stay flock()ed by their owner, so at startup any unlocked
+    segment belongs to a dead process and is replayed (inserts ignore
+    conflicts, so replaying twice is harmless).
+
+    Duplicates are caught by the database check and a claim add()ed to
+    CLAIM_CACHE. Acknowledged marks are also kept there, per student, until
+    their batch is stored (see pending_marks()). Both only span processes
+    when that cache is shared (Redis); with the per-process LocMem default,
+    two workers can both answer MARKED for the same scan pair (one row is
+    still stored) and a student may not see a spooled mark on a request
+    served by another worker until it is flushed.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_spool_config()
+        self.directory = self.config["PATH"]
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._buffer = []
+        self._segment = None
+        self._sequence = 0
+        self._token = uuid.uuid4().hex[:8]   # a recycled pid never reuses a dead worker's segment name
+        self._failed = []           # segments whose insert failed; retried on the next flush
+        self._stats = {"accepted": 0, "flushed": 0, "flushes": 0, "recovered": 0, "flush_errors": 0}
+
+        self.recover()
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="attendance-spool", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _open_segment(self):
+        # ✅ Lock under a temp name first — recovery in a sibling worker must
+        #    never see (and remove) a segment before its owner holds the lock
+        self._sequence += 1
+        name = f"attendance-{os.getpid()}-{self._token}-{self._sequence}"
+        temp = os.path.join(self.directory, f".{name}.tmp")
+        path = os.path.join(self.directory, f"{name}.jsonl")
+        fh = open(temp, "a+", encoding="utf-8")
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        os.rename(temp, path)
+        self._segment = (path, fh)
+
+    def _close_segment(self, segment):
+        path, fh = segment
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        fh.close()
+
+    def recover(self):
+        self._stats["recovered"] += recover_spool(self.directory)
+
+    def submit(self, student_id, subject_code, session_id):
+        """
+        Validates a mark (session via the active-session registry, student
+        and duplicates with one read query) and spools it.
+        Returns (outcome, attendance or None, session or None) like mark_attendance().
+        """
+        session, error = get_session_registry().validate(session_id, subject_code)
+        if error:
+            return error, None, session
+
+        student = (
+            Student.objects
+            .filter(student_id=student_id)
+            .annotate(already_marked=Exists(
+                Attendance.objects.filter(session_id=session.id, student=OuterRef("pk"))
+            ))
+            .values("already_marked")
+            .first()
+        )
+        if student is None:
+            return STUDENT_NOT_FOUND, None, None
+
+        marked_at = timezone.now()
+        record = {
+            "session_id": session.id,
+            "subject_id": session.subject_id,
+            "subject_code": subject_code,
+            "student_id": student_id,
+            "marked_at": marked_at.isoformat(),
+        }
+
+        if student["already_marked"]:
+            return ALREADY_MARKED, None, session
+        claims = caches[self.config["CLAIM_CACHE"]]
+        claim_key = f"spool:claim:{session.id}:{student_id}"
+
+        with self._lock:
+            if not claims.add(claim_key, 1, self.config["CLAIM_TTL"]):
+                return ALREADY_MARKED, None, session
+            fh = self._segment[1]
+            try:
+                fh.write(json.dumps(record) + "\n")
+                fh.flush()
+                if self.config["FSYNC"]:
+                    os.fsync(fh.fileno())
+            except OSError:
+                claims.delete(claim_key)   # not acknowledged — let the student retry
+                raise
+            # ✅ Read-your-writes: the attendance views overlay this mark until
+            #    it is stored (response-cache versions are only bumped by the flush)
+            _add_pending(self.config, record)
+            self._buffer.append(record)
+            self._stats["accepted"] += 1
+            if len(self._buffer) >= self.config["BATCH_SIZE"]:
+                self._wake.set()
+
+        attendance = Attendance(
+            session_id=session.id, subject_id=session.subject_id,
+            student_id=student_id, status="Present", marked_at=marked_at,
+        )
+        return MARKED, attendance, session
+
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.config["FLUSH_INTERVAL"])
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Attendance spool flush failed: {e}")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """
+        Inserts everything buffered so far (plus earlier failed batches).
+        """
+        with self._lock:
+            if self._buffer:
+                self._failed.append((self._segment, self._buffer))
+                self._buffer = []
+                self._open_segment()
+            batches, self._failed = self._failed, []
+
+        for segment, records in batches:
+            try:
+                _insert_records(records)
+            except Exception as e:
+                print(f"⚠️ Could not flush {len(records)} attendance marks (will retry): {e}")
+                with self._lock:
+                    self._failed.append((segment, records))
+                    self._stats["flush_errors"] += 1
+                continue
+
+            self._close_segment(segment)
+            _drop_pending(self.config, records)
+            with self._lock:
+                self._stats["flushed"] += len(records)
+                self._stats["flushes"] += 1
+
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["buffered"] = len(self._buffer)
+            data["failed_batches"] = len(self._failed)
+        return data
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_attendance_spool():
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = AttendanceSpool()
+        return _spool
+
+
+def pending_marks(student_id, subject_code=None):
+    """
+    Read-your-writes overlay for the student attendance views: spooled
+    marks of a student that are not in the database yet ([] when the
+    spool is off).
+    """
+    config = get_spool_config()
+    if not config["ENABLED"]:
+        return []
+    records = [
+        record for record in (caches[config["CLAIM_CACHE"]].get(_pending_key(student_id)) or {}).values()
+        if subject_code is None or record["subject_code"] == subject_code
+    ]
+    if not records:
+        return []
+    # A batch may have committed a moment ago — never count a mark twice
+    stored = set(
+        Attendance.objects
+        .filter(student_id=student_id, session_id__in=[record["session_id"] for record in records])
+        .values_list("session_id", flat=True)
+    )
+    return [record for record in records if record["session_id"] not in stored]
+
+
+def has_pending_marks(request, student_id, **kwargs):
+    """
+    cached_response() bypass: a student with spooled marks gets a fresh
+    response (with the overlay) instead of one cached before the mark.
+    """
+    config = get_spool_config()
+    return config["ENABLED"] and bool(caches[config["CLAIM_CACHE"]].get(_pending_key(student_id)))
+
+
+def spool_stats():
+    if _spool is None:
+        return {"enabled": spool_enabled()}
+    return dict(_spool.stats(), enabled=True)
@@ -0,0 +1,129 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.models import Attendance, AttendanceSummary
+from core.utils.response_cache import bump_versions
+
+
+def bump_summary(student_id, subject_id, attended=True):
+    """
+    Adds one attendance row to the (student, subject) counters.
+    Call inside the transaction that wrote the row.
+    """
+    updated = AttendanceSummary.objects.filter(student_id=student_id, subject_id=subject_id).update(
+        total_classes=F("total_classes") + 1,
+        attended=F("attended") + int(attended),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            AttendanceSummary.objects.create(
+                student_id=student_id, subject_id=subject_id, total_classes=1, attended=int(attended)
+            )
+    except IntegrityError:
+        # Created concurrently — fall back to the increment
+        bump_summary(student_id, subject_id, attended)
+
+
+def drop_from_summary(student_id, subject_id, attended=True):
+    """
+    Removes one attendance row from the (student, subject) counters.
+    """
+    AttendanceSummary.objects.filter(student_id=student_id, subject_id=subject_id).update(
+        total_classes=Greatest(F("total_classes") - 1, 0),
+        attended=Greatest(F("attended") - int(attended), 0),
+        updated_at=timezone.now(),
+    )
+
+
+def _ensure_rows(pairs):
+    AttendanceSummary.objects.bulk_create(
+        [AttendanceSummary(student_id=student_id, subject_id=subject_id) for student_id, subject_id in pairs],
+        ignore_conflicts=True,
+    )
+
+
+def bump_summaries(pairs):
+    """
+    Adds one present row per (student_id, subject_id) pair (repeats count
+    twice). Pass only rows the caller actually inserted; the relative
+    increments compose with concurrent writers. Call inside the transaction
+    that wrote the rows.
+    """
+    added = Counter(pairs)
+    if not added:
+        return
+    with transaction.atomic():
+        _ensure_rows(added)
+        now = timezone.now()
+        for (student_id, subject_id), count in sorted(added.items()):
+            AttendanceSummary.objects.filter(student_id=student_id, subject_id=subject_id).update(
+                total_classes=F("total_classes") + count,
+                attended=F("attended") + count,
+                updated_at=now,
+            )
+
+
+def _counts(attendance):
+    return (
+        attendance
+        .values("student_id", "subject_id")
+        .annotate(total_classes=Count("id"), attended=Count("id", filter=Q(status="Present")))
+    )
+
+
+def refresh_summaries(pairs):
+    """
+    Recomputes the counters of the given (student_id, subject_id) pairs from
+    Attendance. The summary rows are locked before counting, so a concurrent
+    increment either lands before the count (and is counted) or waits and
+    applies on top of it.
+    """
+    pairs = sorted(set(pairs))
+    if not pairs:
+        return
+    query = Q()
+    for student_id, subject_id in pairs:
+        query |= Q(student_id=student_id, subject_id=subject_id)
+
+    with transaction.atomic():
+        _ensure_rows(pairs)
+        summaries = list(AttendanceSummary.objects.select_for_update().filter(query).order_by("student_id", "subject_id"))
+        counts = {
+            (row["student_id"], row["subject_id"]): row
+            for row in _counts(Attendance.objects.filter(query))
+        }
+        now = timezone.now()
+        for summary in summaries:
+            row = counts.get((summary.student_id, summary.subject_id), {})
+            summary.total_classes = row.get("total_classes", 0)
+            summary.attended = row.get("attended", 0)
+            summary.updated_at = now
+        AttendanceSummary.objects.bulk_update(summaries, ["total_classes", "attended", "updated_at"])
+
+
+def rebuild_summaries(batch_size=1000):
+    """
+    Recomputes every summary row from the Attendance table.
+    Returns the number of summary rows written.
+    """
+    with transaction.atomic():
+        AttendanceSummary.objects.all().delete()
+        rows = [
+            AttendanceSummary(
+                student_id=row["student_id"],
+                subject_id=row["subject_id"],
+                total_classes=row["total_classes"],
+                attended=row["attended"],
+            )
+            for row in _counts(Attendance.objects.order_by()).iterator()
+        ]
+        AttendanceSummary.objects.bulk_create(rows, batch_size=batch_size)
+        bump_versions("attendance")
+    return len(rows)
@@ -0,0 +1,166 @@
+import numpy as np
+from django.conf import settings
+
+from core.models import Attendance, Session
+
+# ✅ Defaults — override any key with settings.ATTENDANCE_TRENDS
+DEFAULT_TRENDS_CONFIG = {
+    "ROLLING_WINDOW": 3,      # class days in the rolling attendance rate
+    "MAX_ROLLING_WINDOW": 30,
+}
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def get_trends_config():
+    config = dict(DEFAULT_TRENDS_CONFIG)
+    config.update(getattr(settings, "ATTENDANCE_TRENDS", {}))
+    return config
+
+
+def rolling_window(request):
+    config = get_trends_config()
+    try:
+        window = int(request.query_params.get("window", config["ROLLING_WINDOW"]))
+    except ValueError:
+        window = config["ROLLING_WINDOW"]
+    return min(max(window, 1), config["MAX_ROLLING_WINDOW"])
+
+
+def fetch_trend_arrays(filters):
+    """
+    Bulk-fetches the sessions and attendance rows in scope as flat NumPy
+    arrays (two queries, no model instances).
+    filters: subject (code), department (student's), date_from, date_to.
+    """
+    attendance = Attendance.objects.all()
+    if filters["subject"]:
+        attendance = attendance.filter(subject__code=filters["subject"])
+    if filters["department"]:
+        attendance = attendance.filter(student__department=filters["department"])
+
+    sessions = Session.objects.all()
+    if filters["subject"]:
+        sessions = sessions.filter(subject__code=filters["subject"])
+    else:
+        sessions = sessions.filter(subject_id__in=attendance.values("subject_id").distinct())
+    if filters["date_from"]:
+        sessions = sessions.filter(class_date__gte=filters["date_from"])
+    if filters["date_to"]:
+        sessions = sessions.filter(class_date__lte=filters["date_to"])
+
+    session_rows = list(sessions.order_by("id").values_list("id", "subject_id", "class_date", "topic"))
+    attendance_rows = list(
+        attendance.filter(session_id__in=sessions.values("id"))
+        .values_list("session_id", "student_id", "status")
+    )
+
+    session_ids, subject_ids, dates, topics = zip(*session_rows) if session_rows else ((), (), (), ())
+    att_sessions, students, statuses = zip(*attendance_rows) if attendance_rows else ((), (), ())
+    return {
+        "session_id": np.array(session_ids, dtype=np.int64),
+        "subject_id": np.array(subject_ids, dtype=np.int64),
+        "class_date": np.array(dates, dtype="datetime64[D]"),
+        "topic": np.array(topics, dtype=str),
+        "att_session_id": np.array(att_sessions, dtype=np.int64),
+        "att_student_id": np.array(students, dtype=str),
+        "att_present": np.array(statuses, dtype=str) == "Present",
+    }
+
+
+def _rate(present, expected):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(expected > 0, np.round(present / expected * 100, 2), np.nan)
+
+
+def _floats(values):
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def compute_trends(arrays, window=3):
+    """
+    Daily / rolling / weekly / weekday / topic attendance rates in one
+    vectorized pass. A session's expected count is its subject's roster:
+    the distinct students (in scope) with any attendance row for the subject.
+    Rates are percentages; deltas are percentage points.
+    """
+    session_ids = arrays["session_id"]
+    n_sessions = len(session_ids)
+
+    # Attendance row → session index (session ids are sorted)
+    row_session = np.searchsorted(session_ids, arrays["att_session_id"])
+    present = np.bincount(row_session, weights=arrays["att_present"], minlength=n_sessions)
+
+    # Roster per subject from unique (subject, student) pairs
+    subjects, session_subject = np.unique(arrays["subject_id"], return_inverse=True)
+    students, row_student = np.unique(arrays["att_student_id"], return_inverse=True)
+    pairs = np.unique(session_subject[row_session] * max(len(students), 1) + row_student)
+    roster = np.bincount(pairs // max(len(students), 1), minlength=len(subjects))
+    expected = roster[session_subject].astype(np.float64)
+
+    # Per class day, with a rolling rate over the last `window` class days
+    days, session_day = np.unique(arrays["class_date"], return_inverse=True)
+    day_present = np.bincount(session_day, weights=present, minlength=len(days))
+    day_expected = np.bincount(session_day, weights=expected, minlength=len(days))
+    cum_present = np.concatenate(([0.0], np.cumsum(day_present)))
+    cum_expected = np.concatenate(([0.0], np.cumsum(day_expected)))
+    start = np.maximum(np.arange(1, len(days) + 1) - window, 0)
+    rolling = _rate(cum_present[1:] - cum_present[start], cum_expected[1:] - cum_expected[start])
+
+    # ISO weeks (1970-01-01 was a Thursday) and weekday pattern
+    weekday = (days.astype(np.int64) + 3) % 7
+    weeks, day_week = np.unique(days - weekday.astype("timedelta64[D]"), return_inverse=True)
+    week_present = np.bincount(day_week, weights=day_present, minlength=len(weeks))
+    week_expected = np.bincount(day_week, weights=day_expected, minlength=len(weeks))
+    week_rate = _rate(week_present, week_expected)
+    week_delta = np.round(np.diff(week_rate, prepend=np.nan), 2)
+
+    session_weekday = weekday[session_day]
+    weekday_sessions = np.bincount(session_weekday, minlength=7)
+    weekday_rate = _rate(
+        np.bincount(session_weekday, weights=present, minlength=7),
+        np.bincount(session_weekday, weights=expected, minlength=7),
+    )
+
+    topics, session_topic = np.unique(arrays["topic"], return_inverse=True)
+    topic_rate = _rate(
+        np.bincount(session_topic, weights=present, minlength=len(topics)),
+        np.bincount(session_topic, weights=expected, minlength=len(topics)),
+    )
+
+    total_expected = expected.sum()
+    return {
+        "summary": {
+            "sessions": n_sessions,
+            "students": len(students),
+            "present": int(present.sum()),
+            "expected": int(total_expected),
+            "percentage": _floats(_rate(present.sum(), total_expected).reshape(1))[0],
+            "rolling_window": window,
+        },
+        "daily": [
+            {"date": str(day), "sessions": int(count), "present": int(p), "expected": int(e),
+             "percentage": rate, "rolling_percentage": roll}
+            for day, count, p, e, rate, roll in zip(
+                days, np.bincount(session_day, minlength=len(days)), day_present, day_expected,
+                _floats(_rate(day_present, day_expected)), _floats(rolling),
+            )
+        ],
+        "weekly": [
+            {"week_start": str(week), "present": int(p), "expected": int(e), "percentage": rate, "delta": delta}
+            for week, p, e, rate, delta in zip(
+                weeks, week_present, week_expected, _floats(week_rate), _floats(week_delta)
+            )
+        ],
+        "weekday": [
+            {"weekday": WEEKDAYS[i], "sessions": int(weekday_sessions[i]), "percentage": rate}
+            for i, rate in enumerate(_floats(weekday_rate))
+            if weekday_sessions[i]
+        ],
+        "topics": [
+            {"topic": str(topic), "sessions": int(count), "percentage": rate}
+            for topic, count, rate in zip(
+                topics, np.bincount(session_topic, minlength=len(topics)), _floats(topic_rate)
+            )
+        ],
+    }
@@ -0,0 +1,164 @@
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from core.models import Attendance, AttendanceSummary, Student
+from core.utils.response_cache import bump_versions
+from core.utils.session_registry import ENDED, NOT_FOUND, NOT_STARTED, get_session_registry
+
+# ✅ Outcomes of mark_attendance()
+MARKED = "marked"
+ALREADY_MARKED = "already_marked"
+STUDENT_NOT_FOUND = "student_not_found"
+SESSION_NOT_FOUND = NOT_FOUND
+SESSION_NOT_STARTED = NOT_STARTED
+SESSION_ENDED = ENDED
+
+# ✅ Validate the student + insert in one statement. The session was already
+#    validated by the active-session registry; ON CONFLICT on
+#    unique_together(session, student) turns duplicate / concurrent scans into
+#    an empty RETURNING instead of an IntegrityError. A new row also bumps
+#    the (student, subject) summary counters in the same statement.
+MARK_ATTENDANCE_SQL = f"""
+WITH student AS (
+    SELECT student_id FROM {Student._meta.db_table} WHERE student_id = %s
+), inserted AS (
+    INSERT INTO {Attendance._meta.db_table} (session_id, subject_id, student_id, status, marked_at)
+    SELECT %s, %s, student.student_id, 'Present', %s
+    FROM student
+    ON CONFLICT (session_id, student_id) DO NOTHING
+    RETURNING id, marked_at, student_id, subject_id
+), counted AS (
+    INSERT INTO {AttendanceSummary._meta.db_table} AS summary
+        (student_id, subject_id, total_classes, attended, updated_at)
+    SELECT student_id, subject_id, 1, 1, marked_at FROM inserted
+    ON CONFLICT (student_id, subject_id) DO UPDATE
+    SET total_classes = summary.total_classes + 1,
+        attended = summary.attended + 1,
+        updated_at = EXCLUDED.updated_at
+)
+SELECT EXISTS (SELECT 1 FROM student), inserted.id, inserted.marked_at
+FROM (SELECT 1) AS one
+LEFT JOIN inserted ON TRUE
+"""
+
+
+def _mark_attendance_postgres(student_id, session):
+    with connection.cursor() as cursor:
+        cursor.execute(MARK_ATTENDANCE_SQL, [student_id, session.id, session.subject_id, timezone.now()])
+        student_found, attendance_id, marked_at = cursor.fetchone()
+
+    if not student_found:
+        return STUDENT_NOT_FOUND, None
+    if attendance_id is None:
+        return ALREADY_MARKED, None
+
+    attendance = Attendance(
+        id=attendance_id,
+        session_id=session.id,
+        subject_id=session.subject_id,
+        student_id=student_id,
+        status="Present",
+        marked_at=marked_at,
+    )
+    bump_versions("attendance")   # raw SQL insert — no post_save signal
+    return MARKED, attendance
+
+
+def _mark_attendance_orm(student_id, session):
+    if not Student.objects.filter(student_id=student_id).exists():
+        return STUDENT_NOT_FOUND, None
+
+    try:
+        with transaction.atomic():
+            attendance = Attendance.objects.create(
+                student_id=student_id,
+                session_id=session.id,
+                subject_id=session.subject_id,
+                status="Present",
+            )
+    except IntegrityError:
+        return ALREADY_MARKED, None
+    return MARKED, attendance
+
+
+INSERT_BATCH_SIZE = 500
+
+
+def _insert_attendance_postgres(rows):
+    table = Attendance._meta.db_table
+    inserted = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            batch = rows[start:start + INSERT_BATCH_SIZE]
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (session_id, subject_id, student_id, status, marked_at)
+                VALUES {", ".join(["(%s, %s, %s, 'Present', %s)"] * len(batch))}
+                ON CONFLICT (session_id, student_id) DO NOTHING
+                RETURNING session_id, student_id
+                """,
+                [value for row in batch for value in row],
+            )
+            inserted.update(cursor.fetchall())
+    return inserted
+
+
+def _insert_attendance_orm(rows):
+    inserted = set()
+    for session_id, subject_id, student_id, marked_at in rows:
+        try:
+            with transaction.atomic():
+                # bulk_create skips the post_save summary bump (callers count inserted rows)
+                Attendance.objects.bulk_create([Attendance(
+                    session_id=session_id, subject_id=subject_id,
+                    student_id=student_id, status="Present",
+                )])
+        except IntegrityError:
+            continue
+        # auto_now_add stamped the insert time — keep the scan time instead
+        Attendance.objects.filter(session_id=session_id, student_id=student_id).update(marked_at=marked_at)
+        inserted.add((session_id, student_id))
+    return inserted
+
+
+def insert_attendance(rows):
+    """
+    Inserts (session_id, subject_id, student_id, marked_at) "Present" rows,
+    skipping ones already stored, and keeps each row's marked_at.
+    Returns the set of (session_id, student_id) actually inserted — rows a
+    concurrent writer got to first are not in it. Summary counters are the
+    caller's job.
+    """
+    rows = list(rows)
+    if not rows:
+        return set()
+    if connection.vendor == "postgresql":
+        return _insert_attendance_postgres(rows)
+    return _insert_attendance_orm(rows)
+
+
+def mark_attendance(student_id, subject_code, session_id):
+    """
+    Marks a student present for a session.
+    Returns (outcome, attendance or None, session or None).
+
+    The session (and its time window) is checked against the in-process
+    active-session registry. On PostgreSQL the insert is then a single
+    round-trip; other databases fall back to a student lookup plus an insert
+    that treats IntegrityError as "already marked" (the summary counters are
+    bumped by the Attendance post_save signal inside that transaction).
+    """
+    session, error = get_session_registry().validate(session_id, subject_code)
+    if error:
+        return error, None, session
+
+    try:
+        if connection.vendor == "postgresql":
+            outcome, attendance = _mark_attendance_postgres(student_id, session)
+        else:
+            outcome, attendance = _mark_attendance_orm(student_id, session)
+    except IntegrityError:
+        # Session deleted after the registry loaded it (FK violation)
+        get_session_registry().invalidate(session.id)
+        return SESSION_NOT_FOUND, None, None
+    return outcome, attendance, session
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# ✅ Defaults — override any key with settings.QR_DECODE_CACHE
+DEFAULT_CACHE_CONFIG = {
+    "ENABLED": True,
+    "MAX_ENTRIES": 2048,   # bounded LRU size (per process)
+    "DEFAULT_TTL": 3600,   # seconds a decoded payload lives until its session end is known
+    "NEGATIVE_TTL": 60,    # seconds an undecodable image is remembered
+}
+
+CACHE_MISS = object()
+
+
+def get_cache_config():
+    config = dict(DEFAULT_CACHE_CONFIG)
+    config.update(getattr(settings, "QR_DECODE_CACHE", {}))
+    return config
+
+
+def image_hash(data):
+    """
+    Fast content hash of the uploaded bytes (used as the cache key).
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class DecodeCache:
+    """
+    Bounded LRU of decode results keyed by image content hash.
+
+    Stores both decoded payloads and negative (None) results, each with an
+    absolute expiry time. Payload entries are re-pinned to the session end
+    once the view has looked the session up.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_cache_config()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key → (result, expires_at, decode_ms)
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._saved_ms = 0.0
+
+    def get(self, key):
+        """
+        Returns the cached result (None for a remembered failure),
+        or CACHE_MISS when the key is unknown or expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return CACHE_MISS
+
+            result, expires_at, decode_ms = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return CACHE_MISS
+
+            self._entries.move_to_end(key)
+            self._stats["hits" if result is not None else "negative_hits"] += 1
+            self._saved_ms += decode_ms
+            return dict(result) if result is not None else None
+
+    def put(self, key, result, decode_ms=0.0):
+        ttl = self.config["DEFAULT_TTL"] if result is not None else self.config["NEGATIVE_TTL"]
+        stored = dict(result) if result is not None else None
+        with self._lock:
+            self._entries[key] = (stored, time.time() + ttl, decode_ms)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.config["MAX_ENTRIES"]:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def expire_at(self, key, expires_at):
+        """
+        Ties a cached payload to an absolute expiry (epoch seconds),
+        e.g. the end of the session it belongs to.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if expires_at <= time.time():
+                del self._entries[key]
+                return
+            result, _, decode_ms = entry
+            self._entries[key] = (result, expires_at, decode_ms)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["size"] = len(self._entries)
+            data["saved_decode_ms"] = round(self._saved_ms, 2)
+        lookups = data["hits"] + data["negative_hits"] + data["misses"]
+        data["max_entries"] = self.config["MAX_ENTRIES"]
+        data["hit_rate"] = round((data["hits"] + data["negative_hits"]) / lookups, 4) if lookups else 0.0
+        return data
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_decode_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DecodeCache()
+        return _cache
+
+
+def cache_stats():
+    if not get_cache_config()["ENABLED"]:
+        return {"enabled": False}
+    stats = get_decode_cache().stats()
+    stats["enabled"] = True
+    return stats
+
+
+def pin_to_session_end(qr_result, session):
+    """
+    Keeps a cached decode alive until the session it points at ends.
+    """
+    key = (qr_result or {}).get("image_hash")
+    if key and get_cache_config()["ENABLED"]:
+        get_decode_cache().expire_at(key, session.ends_at.timestamp())
@@ -0,0 +1,392 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+import cv2
+from django.conf import settings
+
+from core.utils.qr_scanner import scan_qr
+from core.utils.qr_decoders import get_decoder_registry, start_attempt_log, drain_attempt_log
+from core.utils.decode_cache import get_cache_config, get_decode_cache, image_hash, CACHE_MISS
+
+# ✅ Defaults — override any key with settings.QR_DECODE_POOL
+DEFAULT_POOL_CONFIG = {
+    "ENABLED": True,
+    "MAX_WORKERS": 2,        # decode processes per gunicorn worker
+    "MAX_PENDING": 8,        # queued jobs allowed beyond MAX_WORKERS before shedding
+    "TIMEOUT": 5.0,          # seconds a request waits for its decode
+    "BATCH_TIMEOUT": 10.0,   # seconds a batch request waits for all of its decodes
+    "OPENCV_THREADS": 1,     # cv2.setNumThreads() inside each decode process
+    "LATENCY_WINDOW": 500,   # samples kept for the latency percentiles
+}
+
+
+class DecodePoolBusy(Exception):
+    """Raised when the decode queue is full (caller should retry later)."""
+
+
+class DecodeTimeout(Exception):
+    """Raised when a decode does not finish within the configured timeout."""
+
+
+class DecodeCrashed(Exception):
+    """Raised when decode processes keep dying on the image (never retried inline)."""
+
+
+def get_pool_config():
+    config = dict(DEFAULT_POOL_CONFIG)
+    config.update(getattr(settings, "QR_DECODE_POOL", {}))
+    return config
+
+
+def _init_worker(opencv_threads):
+    # ✅ Keep each decode process single-threaded so N processes never
+    #    oversubscribe the cores shared with the gunicorn workers.
+    cv2.setNumThreads(opencv_threads)
+
+
+def _decode_job(data, student_id, order=None):
+    started = time.perf_counter()
+    start_attempt_log(order)
+    result = scan_qr(data, student_id=student_id)
+    return result, (time.perf_counter() - started) * 1000, drain_attempt_log()
+
+
+def _absorb_attempts(attempts):
+    # ✅ Mirror the child's backend stats so decode-stats shows them
+    registry = get_decoder_registry()
+    for name, success, elapsed_ms in attempts:
+        registry.record(name, success, elapsed_ms)
+
+
+def _decode_batch_job(datas, student_id, orders):
+    # ✅ One job per chunk — the child reuses its detectors across the whole chunk
+    return [_decode_job(data, student_id, order) for data, order in zip(datas, orders)]
+
+
+def _plans(count):
+    # ✅ Try orders come from this process's registry (the one decode-stats shows)
+    registry = get_decoder_registry()
+    return [registry.plan() for _ in range(count)]
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+class DecodePool:
+    """
+    Size-bounded process pool for QR decoding.
+
+    Pending work is counted per image (a batch holds one slot per image).
+    Requests beyond MAX_WORKERS + MAX_PENDING images are rejected immediately with
+    DecodePoolBusy instead of queueing behind the CPU-bound work. A slot is
+    held until its job actually finishes in the child (not just until the
+    caller stops waiting), so timed-out decodes still count against the bound.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_pool_config()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._capacity = self.config["MAX_WORKERS"] + self.config["MAX_PENDING"]
+        self._pending = 0
+        self._stats = {"submitted": 0, "completed": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+        self._total_ms = deque(maxlen=self.config["LATENCY_WINDOW"])
+        self._decode_ms = deque(maxlen=self.config["LATENCY_WINDOW"])
+
+    def _get_executor(self):
+        with self._lock:
+            # ✅ Re-create after a fork (gunicorn --preload) or a crashed child
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.config["MAX_WORKERS"],
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.config["OPENCV_THREADS"],),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _reserve(self, slots, images):
+        with self._lock:
+            if self._pending + slots > self._capacity:
+                self._stats["rejected"] += 1
+                raise DecodePoolBusy("QR decode queue is full.")
+            self._pending += slots
+            self._stats["submitted"] += images
+
+    def _release(self, slots):
+        with self._lock:
+            self._pending -= slots
+
+    def _submit(self, slots, fn, *args):
+        """
+        Submits a job holding `slots`; they are returned when the job is done
+        (finished, failed or cancelled) rather than when the caller gives up.
+        """
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset_executor()
+            future = self._get_executor().submit(fn, *args)
+        future.add_done_callback(lambda _: self._release(slots))
+        return future
+
+    def _start(self, slots, fn, *args):
+        self._reserve(slots, slots)
+        try:
+            return self._submit(slots, fn, *args)
+        except Exception:
+            self._release(slots)
+            raise
+
+    def _crashed(self, attempt):
+        """
+        A decode process died (OOM, native crash). The pool is replaced; the
+        job is retried once on the fresh pool, never in the request worker,
+        which the pool exists to protect from hostile images.
+        """
+        self._reset_executor()
+        with self._lock:
+            self._stats["errors"] += 1
+        if attempt:
+            print("❌ QR decode process died twice on this upload — giving up.")
+            raise DecodeCrashed("QR decoding failed.")
+        print("⚠️ QR decode process died — retrying once on a fresh pool.")
+
+    def decode(self, data, student_id=None):
+        """
+        Decodes the image bytes on the pool and returns the scan_qr() result.
+        """
+        started = time.perf_counter()
+        deadline = started + self.config["TIMEOUT"]
+        order = _plans(1)[0]
+        for attempt in range(2):
+            future = self._start(1, _decode_job, data, student_id, order)
+            try:
+                result, decode_ms, attempts = future.result(timeout=max(0, deadline - time.perf_counter()))
+                break
+            except FutureTimeout:
+                # A running job cannot be cancelled; its slot is freed when it ends
+                future.cancel()
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise DecodeTimeout("QR decode timed out.")
+            except BrokenProcessPool:
+                self._crashed(attempt)
+
+        _absorb_attempts(attempts)
+        with self._lock:
+            self._stats["completed"] += 1
+            self._total_ms.append((time.perf_counter() - started) * 1000)
+            self._decode_ms.append(decode_ms)
+        return result
+
+    def decode_many(self, datas, student_id=None):
+        """
+        Decodes several images in parallel, one chunk per pool process.
+        Returns the scan_qr() results in input order.
+        """
+        if not datas:
+            return []
+
+        chunk_count = min(self.config["MAX_WORKERS"], len(datas))
+        chunks = [datas[i::chunk_count] for i in range(chunk_count)]
+
+        started = time.perf_counter()
+        deadline = started + self.config["BATCH_TIMEOUT"]
+        for attempt in range(2):
+            self._reserve(len(datas), len(datas))
+            futures = []
+            try:
+                for chunk in chunks:
+                    futures.append(self._submit(len(chunk), _decode_batch_job, chunk, student_id, _plans(len(chunk))))
+            except Exception:
+                self._release(sum(len(chunk) for chunk in chunks[len(futures):]))
+                raise
+
+            try:
+                chunk_results = [
+                    future.result(timeout=max(0, deadline - time.perf_counter())) for future in futures
+                ]
+                break
+            except FutureTimeout:
+                for future in futures:
+                    future.cancel()
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise DecodeTimeout("QR batch decode timed out.")
+            except BrokenProcessPool:
+                for future in futures:
+                    future.cancel()
+                self._crashed(attempt)
+
+        # ✅ Re-interleave chunk results back into input order
+        results = [None] * len(datas)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            for offset, chunk in enumerate(chunk_results):
+                for position, (result, decode_ms, attempts) in enumerate(chunk):
+                    results[offset + position * chunk_count] = result
+                    self._decode_ms.append(decode_ms)
+                    _absorb_attempts(attempts)
+            self._stats["completed"] += len(datas)
+            self._total_ms.append(elapsed_ms)
+        return results
+
+    def stats(self):
+        with self._lock:
+            total_ms = list(self._total_ms)
+            decode_ms = list(self._decode_ms)
+            data = dict(self._stats)
+            data["queue_depth"] = max(0, self._pending - self.config["MAX_WORKERS"])
+            data["in_flight"] = self._pending
+        data["max_workers"] = self.config["MAX_WORKERS"]
+        data["max_pending"] = self.config["MAX_PENDING"]
+        data["latency_ms"] = {
+            "p50": _percentile(total_ms, 50),
+            "p95": _percentile(total_ms, 95),
+            "p99": _percentile(total_ms, 99),
+        }
+        data["decode_ms"] = {
+            "p50": _percentile(decode_ms, 50),
+            "p95": _percentile(decode_ms, 95),
+            "p99": _percentile(decode_ms, 99),
+        }
+        return data
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_decode_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DecodePool()
+        return _pool
+
+
+def batch_capacity():
+    """
+    Most images one batch may hold: every decode slot when the pool is on.
+    """
+    config = get_pool_config()
+    if not config["ENABLED"]:
+        return float("inf")
+    return config["MAX_WORKERS"] + config["MAX_PENDING"]
+
+
+def read_upload(image_input):
+    """
+    Returns the raw bytes of an uploaded file or file path (None if invalid).
+    """
+    if hasattr(image_input, "read"):
+        if hasattr(image_input, "seek"):
+            image_input.seek(0)
+        return image_input.read()
+    if isinstance(image_input, str) and os.path.exists(image_input):
+        with open(image_input, "rb") as fh:
+            return fh.read()
+    return None
+
+
+def _decode_bytes(data, student_id=None):
+    if not get_pool_config()["ENABLED"]:
+        return scan_qr(data, student_id=student_id)
+    return get_decode_pool().decode(data, student_id=student_id)
+
+
+def _decode_bytes_many(datas, student_id=None):
+    if not get_pool_config()["ENABLED"]:
+        return [scan_qr(data, student_id=student_id) for data in datas]
+    return get_decode_pool().decode_many(datas, student_id=student_id)
+
+
+def decode_upload(image_input, student_id=None):
+    """
+    Decodes an uploaded QR image off the request worker.
+    Repeat uploads of identical bytes are answered from the decode cache;
+    falls back to inline decoding when the pool is disabled.
+    """
+    data = read_upload(image_input)
+    if data is None:
+        print("❌ Invalid image input:", image_input)
+        return None
+
+    if not get_cache_config()["ENABLED"]:
+        return _decode_bytes(data, student_id=student_id)
+
+    cache = get_decode_cache()
+    key = image_hash(data)
+    cached = cache.get(key)
+    if cached is not CACHE_MISS:
+        return cached
+
+    started = time.perf_counter()
+    result = _decode_bytes(data, student_id=student_id)
+    if result is not None:
+        result["image_hash"] = key
+    cache.put(key, result, decode_ms=(time.perf_counter() - started) * 1000)
+    return result
+
+
+def decode_uploads(image_inputs, student_id=None):
+    """
+    Decodes a batch of uploaded QR images in parallel.
+    Returns one scan_qr() result (or None) per input, in order.
+    """
+    datas = [read_upload(image_input) for image_input in image_inputs]
+    cache_enabled = get_cache_config()["ENABLED"]
+    cache = get_decode_cache() if cache_enabled else None
+
+    # ✅ Look every image up in the cache and decode each distinct miss once
+    keys = [image_hash(data) if data is not None else None for data in datas]
+    known = {}
+    misses = {}
+    for key, data in zip(keys, datas):
+        if key is None or key in known or key in misses:
+            continue
+        cached = cache.get(key) if cache_enabled else CACHE_MISS
+        if cached is CACHE_MISS:
+            misses[key] = data
+        else:
+            known[key] = cached
+
+    if misses:
+        started = time.perf_counter()
+        decoded = _decode_bytes_many(list(misses.values()), student_id=student_id)
+        per_image_ms = (time.perf_counter() - started) * 1000 / len(misses)
+        for key, result in zip(misses, decoded):
+            if result is not None:
+                result["image_hash"] = key
+            if cache_enabled:
+                cache.put(key, result, decode_ms=per_image_ms)
+            known[key] = result
+
+    return [dict(known[key]) if key and known[key] else None for key in keys]
+
+
+def pool_stats():
+    if not get_pool_config()["ENABLED"]:
+        return {"enabled": False}
+    stats = get_decode_pool().stats()
+    stats["enabled"] = True
+    return stats
@@ -0,0 +1,61 @@
+from json.encoder import encode_basestring
+
+from django.http import HttpResponse
+
+# ✅ Same keys, order and types as AttendancePercentageSerializer
+SUMMARY_FIELDS = ("student_id", "subject_code", "total_classes", "attended", "percentage")
+# Columns read from the database; the percentage is computed while encoding
+ROW_FIELDS = SUMMARY_FIELDS[:4]
+
+# One row of the JSON array, compiled once; matches DRF's compact JSONRenderer output
+_ROW = '{"student_id":%s,"subject_code":%s,"total_classes":%d,"attended":%d,"percentage":%r}'
+
+
+def percentage(attended, total):
+    # Python's round() (ties to even), like every other view — not SQL ROUND (ties away from zero)
+    return round((attended / total) * 100, 2) if total else 0.0
+
+
+def summary_rows(queryset, **aliases):
+    """
+    AttendanceSummary queryset -> named tuples in ROW_FIELDS order.
+    `aliases` maps a field that is not a column of the model (e.g.
+    subject_code=F("subject__code")) to its expression.
+    """
+    return (
+        queryset
+        .annotate(**aliases)
+        .values_list(*ROW_FIELDS, named=True)
+    )
+
+
+def add_pending_marks(rows, student_id, marks):
+    """
+    Folds write-behind spool marks (not yet in the summary table) into one
+    student's rows.
+    """
+    rows = {row[1]: tuple(row) for row in rows}
+    for mark in marks:
+        code = mark["subject_code"]
+        _, _, total, attended = rows.get(code, (student_id, code, 0, 0))
+        rows[code] = (student_id, code, total + 1, attended + 1)
+    return list(rows.values())
+
+
+def encode_summary_rows(rows):
+    """
+    Serializes (student_id, subject_code, total_classes, attended) tuples
+    straight to JSON bytes with the percentage added, skipping serializer
+    field validation.
+    """
+    return (
+        "[" + ",".join(
+            _ROW % (encode_basestring(str(student_id)), encode_basestring(str(subject_code)),
+                    total_classes, attended, percentage(attended, total_classes))
+            for student_id, subject_code, total_classes, attended in rows
+        ) + "]"
+    ).encode()
+
+
+def summary_json_response(rows, status=200):
+    return HttpResponse(encode_summary_rows(rows), status=status, content_type="application/json")
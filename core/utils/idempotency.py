@@ -0,0 +1,189 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+# ✅ Defaults — override any key with settings.IDEMPOTENCY
+DEFAULT_IDEMPOTENCY_CONFIG = {
+    "ENABLED": True,
+    "CACHE": "default",     # Django cache alias (shared cache → shared across workers)
+    "KEY_PREFIX": "idem",
+    "TTL": 600,             # seconds a completed response is replayed
+    "LOCK_TTL": 60,         # seconds a claim survives a worker that died mid-request
+    "WAIT_TIMEOUT": 10,     # seconds a duplicate waits for the in-flight original
+    "POLL_INTERVAL": 0.05,  # seconds between checks while waiting
+    "MAX_KEY_LENGTH": 255,
+}
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+REPLAYED_HEADER = "Idempotent-Replayed"
+STORED_HEADERS = ("Retry-After",)
+PENDING = "pending"
+
+
+def get_idempotency_config():
+    config = dict(DEFAULT_IDEMPOTENCY_CONFIG)
+    config.update(getattr(settings, "IDEMPOTENCY", {}))
+    return config
+
+
+def _body_digest(request):
+    """
+    SHA-256 of the parsed request body (uploaded files by content), so the
+    same Idempotency-Key with a different body is a different request.
+    """
+    digest = hashlib.sha256()
+    data = request.data
+    items = sorted(data.lists()) if hasattr(data, "lists") else [(None, [data])]
+    for name, values in items:
+        digest.update(f"{name}\0".encode())
+        for value in values:
+            if hasattr(value, "chunks"):
+                for chunk in value.chunks():
+                    digest.update(chunk)
+                value.seek(0)
+            else:
+                digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Completed responses in a Django cache, keyed by user, path,
+    Idempotency-Key and a hash of the body.
+
+    The first request claims the key with cache.add() (atomic, so only one
+    worker wins); duplicates arriving while it runs poll until the response
+    is stored and then replay it. Only DRF Responses below 500 are stored
+    (replay rebuilds them from .data); anything else releases the claim,
+    so a retry does the work again. Workers only share claims when CACHE
+    is a shared backend (Redis via REDIS_URL); LocMem is per process.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_idempotency_config()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {"replayed": 0, "waited": 0, "stored": 0, "wait_timeouts": 0}
+
+    @property
+    def cache(self):
+        return caches[self.config["CACHE"]]
+
+    def make_key(self, user_id, path, key, body_digest):
+        raw = f"{user_id}|{path}|{key}|{body_digest}"
+        return f"{self.config['KEY_PREFIX']}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    def claim(self, key):
+        """
+        Returns ("new", None) when the caller should run the request,
+        ("done", entry) to replay a stored response, or ("busy", None)
+        when the original is still running after WAIT_TIMEOUT.
+        """
+        deadline = time.monotonic() + self.config["WAIT_TIMEOUT"]
+        waited = False
+        while True:
+            entry = self.cache.get(key)
+            if entry is None and self.cache.add(key, PENDING, self.config["LOCK_TTL"]):
+                with self._lock:
+                    self._in_flight += 1
+                return "new", None
+            if entry is not None and entry != PENDING:
+                with self._lock:
+                    self._stats["replayed"] += 1
+                    self._stats["waited"] += int(waited)
+                return "done", entry
+
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    self._stats["wait_timeouts"] += 1
+                return "busy", None
+            time.sleep(self.config["POLL_INTERVAL"])
+            waited = True
+
+    def complete(self, key, response):
+        if isinstance(response, Response) and response.status_code < 500:
+            headers = {name: response[name] for name in STORED_HEADERS if response.has_header(name)}
+            self.cache.set(key, (response.status_code, response.data, headers), self.config["TTL"])
+            stored = 1
+        else:
+            self.cache.delete(key)
+            stored = 0
+        with self._lock:
+            self._stats["stored"] += stored
+            self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["in_flight"] = self._in_flight
+        return data
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IdempotencyStore()
+        return _store
+
+
+def idempotency_stats():
+    return get_idempotency_store().stats()
+
+
+def idempotent(view_method):
+    """
+    Decorator for APIView handlers: a repeated Idempotency-Key header gets the
+    stored response back without running the handler again.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        config = get_idempotency_config()
+        if not key or not config["ENABLED"]:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > config["MAX_KEY_LENGTH"]:
+            return Response(
+                {"error": f"Idempotency-Key must be at most {config['MAX_KEY_LENGTH']} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        store = get_idempotency_store()
+        scoped_key = store.make_key(request.user.pk, request.path, key, _body_digest(request))
+        state, entry = store.claim(scoped_key)
+
+        if state == "done":
+            status_code, data, headers = entry
+            response = Response(data, status=status_code, headers=headers)
+            response[REPLAYED_HEADER] = "true"
+            return response
+
+        if state == "busy":
+            return Response(
+                {"error": "A request with this Idempotency-Key is still in progress."},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Retry-After": "1"},
+            )
+
+        response = None
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            return response
+        finally:
+            store.complete(scoped_key, response)
+
+    return wrapper
@@ -0,0 +1,261 @@
+import gzip
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+from core.utils.qr_generator import QR_FORMATS, render_qr, render_qr_png
+from core.utils.qr_decoders import get_decoder_registry
+from core.utils.qr_scanner import decode_gray, _load_gray
+from core.utils.qr_token import make_session_token
+
+# ✅ Corpus dimensions — every session QR is rendered at each resolution
+#    with each degradation applied.
+RESOLUTIONS = {
+    "vga": (640, 480),
+    "hd": (1280, 960),
+    "12mp": (4032, 3024),
+}
+DEGRADATIONS = ("clean", "blur", "skew", "jpeg", "moire")
+
+
+def _session_payloads(count):
+    return [
+        make_session_token(
+            subject_code=f"BENCH{100 + i}",
+            session_id=1000 + i,
+            topic=f"Benchmark topic {i}",
+            class_date="2030-01-01",
+            start_time="09:00:00",
+            expires_at=1893456000,
+        )
+        for i in range(count)
+    ]
+
+
+def _place(qr, size, rng):
+    """
+    Pastes the QR onto a textured background covering ~35% of the short side.
+    """
+    width, height = size
+    side = int(min(width, height) * 0.35)
+    qr = cv2.resize(qr, (side, side), interpolation=cv2.INTER_NEAREST)
+
+    gradient = np.linspace(150, 210, width, dtype=np.float32)[None, :]
+    scene = np.repeat(gradient, height, axis=0)
+    scene += rng.normal(0, 6, size=(height, width)).astype(np.float32)
+
+    x = int(rng.integers(0, width - side))
+    y = int(rng.integers(0, height - side))
+    scene[y:y + side, x:x + side] = qr
+    return np.clip(scene, 0, 255).astype(np.uint8), (x, y, side)
+
+
+def _skew(scene, box, rng):
+    x, y, side = box
+    src = np.float32([[x, y], [x + side, y], [x + side, y + side], [x, y + side]])
+    jitter = rng.uniform(-0.12, 0.12, size=(4, 2)).astype(np.float32) * side
+    matrix = cv2.getPerspectiveTransform(src, src + jitter)
+    h, w = scene.shape
+    return cv2.warpPerspective(scene, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE)
+
+
+def _moire(scene, rng):
+    h, w = scene.shape
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    angle = rng.uniform(0, np.pi)
+    period = rng.uniform(2.5, 4.0)
+    wave = np.sin(2 * np.pi * (xx * np.cos(angle) + yy * np.sin(angle)) / period)
+    return np.clip(scene.astype(np.float32) * (1 + 0.22 * wave), 0, 255).astype(np.uint8)
+
+
+def _degrade(scene, box, degradation, rng):
+    """
+    Returns the JPEG-encoded scene with one degradation applied.
+    """
+    quality = 90
+    if degradation == "blur":
+        sigma = max(scene.shape) / 900
+        scene = cv2.GaussianBlur(scene, (0, 0), sigma)
+    elif degradation == "skew":
+        scene = _skew(scene, box, rng)
+    elif degradation == "jpeg":
+        quality = 20
+    elif degradation == "moire":
+        scene = _moire(scene, rng)
+    ok, encoded = cv2.imencode(".jpg", scene, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes()
+
+
+def build_corpus(sessions=4, seed=7, resolutions=None, degradations=None):
+    """
+    Generates the synthetic image corpus.
+    Returns a list of dicts: expected, resolution, degradation, data (JPEG bytes).
+    """
+    rng = np.random.default_rng(seed)
+    resolutions = resolutions or list(RESOLUTIONS)
+    degradations = degradations or list(DEGRADATIONS)
+
+    corpus = []
+    for payload in _session_payloads(sessions):
+        png = np.frombuffer(render_qr_png(payload), dtype=np.uint8)
+        qr = cv2.imdecode(png, cv2.IMREAD_GRAYSCALE)
+        for resolution in resolutions:
+            for degradation in degradations:
+                scene, box = _place(qr, RESOLUTIONS[resolution], rng)
+                corpus.append({
+                    "expected": payload,
+                    "resolution": resolution,
+                    "degradation": degradation,
+                    "data": _degrade(scene, box, degradation, rng),
+                })
+    return corpus
+
+
+def _summarise(samples):
+    """
+    samples: list of (success, latency_ms)
+    """
+    if not samples:
+        return {"samples": 0}
+    latencies = np.array([ms for _, ms in samples])
+    successes = sum(1 for ok, _ in samples if ok)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "samples": len(samples),
+        "success_rate": round(successes / len(samples), 4),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run_benchmark(corpus, repeat=1):
+    """
+    Decodes every corpus image with each backend and the staged pipeline.
+
+    Every registered backend is timed on the same grayscale frame; "pipeline"
+    is scan_qr's staged decoder timed end to end from the encoded bytes
+    (including image loading).
+    """
+    backends = get_decoder_registry().backends()
+    per_backend = {name: [] for name in list(backends) + ["pipeline"]}
+    per_degradation = {}
+    per_resolution = {}
+    per_stage = {}
+
+    for item in corpus:
+        expected = item["expected"]
+        for _ in range(repeat):
+            gray = _load_gray(item["data"])
+            outcomes = {}
+            for name, backend in backends.items():
+                data, ms = _timed(backend.decode, gray)
+                outcomes[name] = (data == expected, ms)
+
+            started = time.perf_counter()
+            data, stage, _ = decode_gray(_load_gray(item["data"]))
+            ms = (time.perf_counter() - started) * 1000
+            outcomes["pipeline"] = (data == expected, ms)
+            per_stage.setdefault(stage if data == expected else "failed", []).append((data == expected, ms))
+
+            for name, outcome in outcomes.items():
+                per_backend[name].append(outcome)
+                per_degradation.setdefault(item["degradation"], {}).setdefault(name, []).append(outcome)
+                per_resolution.setdefault(item["resolution"], {}).setdefault(name, []).append(outcome)
+
+    pipeline_total = len(per_backend["pipeline"])
+    return {
+        "backends": {name: _summarise(samples) for name, samples in per_backend.items()},
+        "by_degradation": {
+            key: {name: _summarise(samples) for name, samples in group.items()}
+            for key, group in per_degradation.items()
+        },
+        "by_resolution": {
+            key: {name: _summarise(samples) for name, samples in group.items()}
+            for key, group in per_resolution.items()
+        },
+        "pipeline_stages": {
+            stage: dict(_summarise(samples), share=round(len(samples) / pipeline_total, 4))
+            for stage, samples in per_stage.items()
+        },
+    }
+
+
+def run_render_benchmark(sessions=4, scales=(4, 8), repeat=20):
+    """
+    Times every QR output format against the legacy render_qr_png() path.
+    Reports render latency plus raw and gzipped bytes on the wire.
+    """
+    payloads = _session_payloads(sessions)
+    variants = {"png": ("png", None), "matrix": ("matrix", None)}   # neither has a scale
+    for fmt in QR_FORMATS:
+        if fmt not in variants:
+            variants.update({f"{fmt}@{scale}": (fmt, scale) for scale in scales})
+
+    results = {}
+    for name, (fmt, scale) in variants.items():
+        samples, sizes, gzipped = [], [], []
+        for payload in payloads:
+            for _ in range(repeat):
+                (body, _), ms = _timed(render_qr, payload, fmt, scale)
+                samples.append((True, ms))
+            sizes.append(len(body))
+            gzipped.append(len(gzip.compress(body)))
+        row = _summarise(samples)
+        del row["success_rate"]
+        row["bytes"] = int(np.mean(sizes))
+        row["gzip_bytes"] = int(np.mean(gzipped))
+        results[name] = row
+
+    baseline = results["png"]
+    for row in results.values():
+        row["speedup"] = round(baseline["p50_ms"] / row["p50_ms"], 2) if row["p50_ms"] else None
+        row["size_ratio"] = round(row["bytes"] / baseline["bytes"], 3)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def benchmark_metadata(**params):
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+        "params": params,
+    }
+
+
+def compare_results(current, previous):
+    """
+    Returns per-backend deltas (current - previous) for success rate and latency.
+    """
+    deltas = {}
+    for name, now in current["backends"].items():
+        before = previous.get("backends", {}).get(name)
+        if not before or not now.get("samples") or not before.get("samples"):
+            continue
+        deltas[name] = {
+            key: round(now[key] - before[key], 4)
+            for key in ("success_rate", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return deltas
@@ -0,0 +1,248 @@
+import abc
+import threading
+import time
+
+import cv2
+
+try:
+    from pyzbar.pyzbar import decode as pyzbar_decode
+except ImportError as e:  # zbar shared library missing
+    pyzbar_decode = None
+    print(f"⚠️ pyzbar unavailable, QR decoding will use OpenCV only: {e}")
+
+# ✅ Adaptive ordering — backends are sorted by expected cost of trying them
+#    first (average latency / success probability). Every EXPLORE_EVERY-th
+#    decode runs the order reversed so late backends keep getting measured
+#    on ordinary frames, not only on the ones the others failed.
+EWMA_ALPHA = 0.05
+EXPLORE_EVERY = 100
+
+_local = threading.local()
+
+
+def get_detector():
+    """
+    Returns the cv2.QRCodeDetector reused by this thread.
+    (Detectors are not thread-safe, so each thread keeps its own instance.)
+    """
+    detector = getattr(_local, "detector", None)
+    if detector is None:
+        detector = cv2.QRCodeDetector()
+        _local.detector = detector
+    return detector
+
+
+class DecoderBackend(abc.ABC):
+    """
+    A QR decoder that takes a grayscale frame and returns the text or None.
+    """
+    name = None
+
+    def is_available(self):
+        return True
+
+    @abc.abstractmethod
+    def decode(self, gray):
+        """Returns the decoded text, or None."""
+
+
+class OpenCVBackend(DecoderBackend):
+    name = "opencv"
+
+    def decode(self, gray):
+        data, _, _ = get_detector().detectAndDecode(gray)
+        return data or None
+
+
+class PyzbarBackend(DecoderBackend):
+    name = "pyzbar"
+
+    def is_available(self):
+        return pyzbar_decode is not None
+
+    def decode(self, gray):
+        decoded_objs = pyzbar_decode(gray)
+        if decoded_objs:
+            return decoded_objs[0].data.decode("utf-8")
+        return None
+
+
+class WeChatBackend(DecoderBackend):
+    """
+    OpenCV's CNN-based WeChat detector (only in opencv-contrib builds).
+    """
+    name = "wechat"
+
+    def is_available(self):
+        return hasattr(cv2, "wechat_qrcode_WeChatQRCode")
+
+    def decode(self, gray):
+        detector = getattr(_local, "wechat", None)
+        if detector is None:
+            detector = cv2.wechat_qrcode_WeChatQRCode()
+            _local.wechat = detector
+        texts, _ = detector.detectAndDecode(gray)
+        return texts[0] if texts else None
+
+
+class DecoderRegistry:
+    """
+    Registered decoder backends plus their success / latency statistics.
+
+    The try order adapts to the observed stats unless it is pinned
+    (settings.QR_DECODER_ORDER).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backends = {}
+        self._stats = {}
+        self._calls = 0
+        self.pinned = None
+
+    def register(self, backend):
+        if not backend.is_available():
+            return
+        with self._lock:
+            self._backends[backend.name] = backend
+            self._stats[backend.name] = {"attempts": 0, "successes": 0, "ewma_ms": None}
+
+    def pin(self, names):
+        """
+        Fixes the try order (unknown / unavailable names are ignored).
+        Pass None to go back to adaptive ordering.
+        """
+        with self._lock:
+            self.pinned = [name for name in names if name in self._backends] if names else None
+
+    def _expected_cost(self, name):
+        stats = self._stats[name]
+        # Laplace-smoothed success probability; unmeasured backends look cheap
+        success = (stats["successes"] + 1) / (stats["attempts"] + 2)
+        return (stats["ewma_ms"] or 0.0) / success
+
+    def order(self):
+        with self._lock:
+            if self.pinned:
+                return list(self.pinned)
+            return sorted(self._backends, key=self._expected_cost)
+
+    def record(self, name, success, elapsed_ms):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                return
+            stats["attempts"] += 1
+            stats["successes"] += int(success)
+            if stats["ewma_ms"] is None:
+                stats["ewma_ms"] = elapsed_ms
+            else:
+                stats["ewma_ms"] += EWMA_ALPHA * (elapsed_ms - stats["ewma_ms"])
+
+    def plan(self):
+        """
+        The try order for the next decode: order(), reversed on every
+        EXPLORE_EVERY-th call. The decode pool computes this in the request
+        worker (whose stats absorb every child's attempts) and ships it with
+        the job, so children follow the order decode-stats reports.
+        """
+        order = self.order()
+        with self._lock:
+            self._calls += 1
+            explore = not self.pinned and self._calls % EXPLORE_EVERY == 0
+        if explore:
+            order.reverse()
+        return order
+
+    def current_plan(self):
+        """The order set by start_attempt_log() when there is one, else plan()."""
+        return getattr(_local, "order", None) or self.plan()
+
+    def decode(self, gray, order=None):
+        """
+        Tries each backend in order and returns (data, backend name) for the
+        first one that decodes, or (None, None). Callers running several
+        pipeline stages pass one current_plan() to every stage.
+        """
+        order = order or self.current_plan()
+        order = [name for name in order if name in self._backends]
+
+        log = getattr(_local, "attempts", None)
+        for name in order:
+            started = time.perf_counter()
+            try:
+                data = self._backends[name].decode(gray)
+            except Exception as e:
+                print(f"⚠️ {name} decoder failed: {e}")
+                data = None
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.record(name, bool(data), elapsed_ms)
+            if log is not None:
+                log.append((name, bool(data), elapsed_ms))
+            if data:
+                return data, name
+        return None, None
+
+    def backends(self):
+        with self._lock:
+            return dict(self._backends)
+
+    def stats(self):
+        order = self.order()
+        with self._lock:
+            backends = {}
+            for name, stats in self._stats.items():
+                attempts = stats["attempts"]
+                backends[name] = {
+                    "attempts": attempts,
+                    "successes": stats["successes"],
+                    "success_rate": round(stats["successes"] / attempts, 4) if attempts else None,
+                    "ewma_ms": round(stats["ewma_ms"], 3) if stats["ewma_ms"] is not None else None,
+                    "expected_cost_ms": round(self._expected_cost(name), 3),
+                }
+            return {"order": order, "pinned": bool(self.pinned), "backends": backends}
+
+
+def start_attempt_log(order=None):
+    """
+    Starts recording this thread's backend attempts (used by decode pool
+    processes to ship their stats back to the request worker), optionally
+    following the request worker's planned try `order`.
+    """
+    _local.attempts = []
+    _local.order = order
+
+
+def drain_attempt_log():
+    attempts = getattr(_local, "attempts", None) or []
+    _local.attempts = None
+    _local.order = None
+    return attempts
+
+
+def _pinned_order_from_settings():
+    try:
+        from django.conf import settings
+        return getattr(settings, "QR_DECODER_ORDER", None)
+    except Exception:  # settings not configured (standalone scripts)
+        return None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_decoder_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = DecoderRegistry()
+            for backend in (OpenCVBackend(), PyzbarBackend(), WeChatBackend()):
+                registry.register(backend)
+            registry.pin(_pinned_order_from_settings())
+            _registry = registry
+        return _registry
+
+
+def decoder_stats():
+    return get_decoder_registry().stats()
@@ -1,22 +1,140 @@
+import math
 import qrcode
+import numpy as np
 from io import BytesIO
-from django.http import HttpResponse
+from PIL import Image
 
-def generate_session_qr_response(subject_code, session_id, topic, class_date, start_time):
+# ✅ Output formats offered by the QR endpoints (?qr_format= or Accept header)
+#    (not ?format=, which DRF reserves for renderer selection)
+QR_FORMATS = {
+    "png": "image/png",                      # legacy qrcode.make() PNG
+    "png1": "image/png",                     # 1-bit PNG at the requested scale
+    "svg": "image/svg+xml",
+    "matrix": "application/octet-stream",    # bit-packed module matrix
+}
+DEFAULT_SCALE = 8
+MAX_SCALE = 40
+QR_BORDER = 4
+
+def render_qr_png(qr_data):
     """
-    Generates and returns a QR code image (as HttpResponse with image/png).
+    Renders the QR text to PNG bytes.
     """
-    qr_data = f"{subject_code},{session_id},{topic},{class_date},{start_time}"
-
     # Generate the QR
     qr_img = qrcode.make(qr_data)
 
     # Convert QR to bytes
     buffer = BytesIO()
     qr_img.save(buffer, format="PNG")
-    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def render_sheet_entry(job):
+    """
+    QR sheet pool job: (filename, token) → (filename, png bytes).
+    Runs in spawned processes that never call django.setup(), so this module
+    must not import models.
+    """
+    filename, token = job
+    return filename, render_qr_png(token)
+
+
+def qr_matrix(qr_data):
+    """
+    Module matrix of the QR (True = dark), including the quiet-zone border.
+    """
+    qr = qrcode.QRCode(border=QR_BORDER)
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+    return np.array(qr.get_matrix(), dtype=bool)
+
+
+def render_qr_png_1bit(qr_data, scale=DEFAULT_SCALE):
+    """
+    1-bit PNG with each module drawn as scale x scale pixels.
+    """
+    modules = qr_matrix(qr_data)
+    pixels = np.repeat(np.repeat(~modules, scale, axis=0), scale, axis=1)
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_qr_svg(qr_data, scale=DEFAULT_SCALE):
+    """
+    SVG with one path made of horizontal runs of dark modules.
+    """
+    modules = qr_matrix(qr_data)
+    size = modules.shape[0]
+    padded = np.zeros((size, size + 2), dtype=np.int8)
+    padded[:, 1:-1] = modules
+    edges = np.diff(padded, axis=1)
+    rows_start, cols_start = np.nonzero(edges == 1)
+    _, cols_end = np.nonzero(edges == -1)
+    path = "".join(
+        f"M{x},{y}h{end - x}v1h{x - end}z"
+        for y, x, end in zip(rows_start.tolist(), cols_start.tolist(), cols_end.tolist())
+    )
+    pixels = size * scale
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{path}" fill="#000"/></svg>'
+    ).encode()
 
-    # Return as image response
-    response = HttpResponse(buffer.getvalue(), content_type="image/png")
-    response["Content-Disposition"] = f'inline; filename="qr_{subject_code}_{session_id}.png"'
-    return response
+
+def render_qr_matrix(qr_data):
+    """
+    Bit-packed module matrix: row-major, MSB first, 1 = dark.
+    Returns (bytes, modules per side).
+    """
+    modules = qr_matrix(qr_data)
+    return np.packbits(modules.reshape(-1)).tobytes(), modules.shape[0]
+
+
+def matrix_side(body):
+    """
+    Modules per side of a packed matrix (at most 7 bits of padding, so exact).
+    """
+    return math.isqrt(len(body) * 8)
+
+
+def matrix_headers(body):
+    return {"X-QR-Modules": str(matrix_side(body))}
+
+
+def negotiate_qr_format(request):
+    """
+    Picks (format, scale) from ?qr_format=&scale= or the Accept header.
+    Returns (None, None) for an unknown format.
+    """
+    fmt = request.GET.get("qr_format") if request is not None else None
+    if not fmt and request is not None:
+        accept = request.META.get("HTTP_ACCEPT", "")
+        if "image/svg+xml" in accept:
+            fmt = "svg"
+        elif "application/octet-stream" in accept:
+            fmt = "matrix"
+    fmt = fmt or "png"
+    if fmt not in QR_FORMATS:
+        return None, None
+
+    try:
+        scale = int(request.GET.get("scale", DEFAULT_SCALE)) if request is not None else DEFAULT_SCALE
+    except ValueError:
+        scale = DEFAULT_SCALE
+    return fmt, min(max(scale, 1), MAX_SCALE)
+
+
+def render_qr(qr_data, fmt="png", scale=DEFAULT_SCALE):
+    """
+    Renders the QR in the given format. Returns (body bytes, extra headers).
+    """
+    if fmt == "png1":
+        return render_qr_png_1bit(qr_data, scale), {}
+    if fmt == "svg":
+        return render_qr_svg(qr_data, scale), {}
+    if fmt == "matrix":
+        body, _ = render_qr_matrix(qr_data)
+        return body, matrix_headers(body)
+    return render_qr_png(qr_data), {}
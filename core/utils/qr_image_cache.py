@@ -0,0 +1,173 @@
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.response import Response
+
+from core.utils.qr_generator import QR_FORMATS, DEFAULT_SCALE, matrix_headers, negotiate_qr_format, render_qr
+from core.utils.qr_token import session_token
+
+# ✅ Bump when a renderer changes so cached images / ETags roll over
+RENDER_VERSION = "2"
+MAX_MEMORY_ENTRIES = 256
+QR_CACHE_SUBDIR = "qrcodes"
+FILE_EXTENSIONS = {"png": "png", "png1": "png", "svg": "svg", "matrix": "bin"}
+
+
+def qr_variant(fmt="png", scale=DEFAULT_SCALE):
+    # The legacy PNG has a fixed size, so its scale is irrelevant
+    return "png" if fmt == "png" else f"{fmt}{scale}"
+
+
+class SessionQRCache:
+    """
+    Pre-rendered session QR images (one per format variant), kept in memory (bounded LRU) and under
+    MEDIA_ROOT/qrcodes/ so other workers and restarts never re-render.
+
+    The ETag is derived from the signed token the QR carries, so a repeat
+    fetch can be answered with 304 before any image is rendered or read.
+    """
+
+    def __init__(self, max_entries=MAX_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (session_id, variant) → (etag, body, headers)
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "renders": 0, "not_modified": 0}
+
+    @staticmethod
+    def etag_for(token, variant="png"):
+        return hashlib.sha256(f"{RENDER_VERSION}:{variant}:{token}".encode()).hexdigest()[:32]
+
+    @staticmethod
+    def _directory():
+        return os.path.join(settings.MEDIA_ROOT, QR_CACHE_SUBDIR)
+
+    def _path(self, session, etag, fmt):
+        return os.path.join(
+            self._directory(),
+            f"{session.subject.code}_{session.id}_{etag[:16]}.{FILE_EXTENSIONS[fmt]}",
+        )
+
+    def get(self, session, fmt="png", scale=DEFAULT_SCALE):
+        """
+        Returns (etag, body bytes, extra headers) for the session's current QR.
+        """
+        token = session_token(session)
+        variant = qr_variant(fmt, scale)
+        etag = self.etag_for(token, variant)
+        key = (session.id, variant)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry
+
+        path = self._path(session, etag, fmt)
+        if os.path.exists(path):
+            with open(path, "rb") as fh:
+                body = fh.read()
+            headers = matrix_headers(body) if fmt == "matrix" else {}
+            self._count("disk_hits")
+        else:
+            body, headers = render_qr(token, fmt, scale)
+            self._count("renders")
+            self._write(path, body)
+
+        entry = (etag, body, headers)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _write(self, path, body):
+        # ✅ Write-then-rename so concurrent workers never read a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as fh:
+                fh.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not store QR image {path}: {e}")
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def invalidate(self, session_id):
+        """
+        Drops the cached images of a session (memory and disk).
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                del self._entries[key]
+        for path in glob.glob(os.path.join(self._directory(), f"*_{session_id}_*.*")):
+            parts = os.path.splitext(os.path.basename(path))[0].rsplit("_", 2)
+            if len(parts) == 3 and parts[1] == str(session_id) and len(parts[2]) == 16:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["memory_entries"] = len(self._entries)
+        return data
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_session_qr_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SessionQRCache()
+        return _cache
+
+
+def etag_matches(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return f'"{etag}"' in [tag.strip() for tag in header.split(",")]
+
+
+def session_qr_response(request, session, max_age=300):
+    """
+    Serves the session's QR (format negotiated from ?qr_format= / Accept) with a
+    strong ETag and Cache-Control, answering repeat fetches with 304.
+    """
+    fmt, scale = negotiate_qr_format(request)
+    if fmt is None:
+        return Response({"error": f"Unknown format. Use one of: {', '.join(QR_FORMATS)}."}, status=400)
+
+    cache = get_session_qr_cache()
+    etag = cache.etag_for(session_token(session), qr_variant(fmt, scale))
+    if request is not None and etag_matches(request, etag):
+        cache._count("not_modified")
+        response = HttpResponseNotModified()
+    else:
+        etag, body, headers = cache.get(session, fmt, scale)
+        response = HttpResponse(body, content_type=QR_FORMATS[fmt])
+        extension = FILE_EXTENSIONS[fmt]
+        response["Content-Disposition"] = f'inline; filename="qr_{session.subject.code}_{session.id}.{extension}"'
+        for name, value in headers.items():
+            response[name] = value
+
+    response["ETag"] = f'"{etag}"'
+    response["Cache-Control"] = f"private, max-age={max_age}, must-revalidate"
+    response["Vary"] = "Accept"
+    return response
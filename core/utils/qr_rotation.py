@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from core.utils.qr_generator import DEFAULT_SCALE, render_qr
+from core.utils.qr_token import make_session_token
+
+# ✅ Defaults — override any key with settings.QR_ROTATION
+DEFAULT_ROTATION_CONFIG = {
+    "PERIOD": 10,          # seconds each rotating code is shown
+    "GRACE_WINDOWS": 1,    # previous windows still accepted (scan → upload latency)
+    "PRECOMPUTE": 6,       # windows rendered ahead of time
+    "MAX_FRAMES": 512,     # bounded frame cache size (per process)
+    "MAX_SESSIONS": 256,   # sessions whose token fields are kept (per process, LRU)
+    "FIELDS_TTL": 60,      # seconds before a session's fields are reloaded from the DB
+    "REQUIRED": False,     # reject long-lived (static) session tokens when on
+}
+
+
+ROTATION_REQUIRED_ERROR = "This session uses rotating QR codes. Scan the code currently shown."
+
+
+def get_rotation_config():
+    config = dict(DEFAULT_ROTATION_CONFIG)
+    config.update(getattr(settings, "QR_ROTATION", {}))
+    return config
+
+
+def current_window(now=None, period=None):
+    period = period or get_rotation_config()["PERIOD"]
+    return int((now if now is not None else time.time()) // period)
+
+
+def window_token(fields, window, config=None):
+    """
+    Signed token for one rotation window. It expires GRACE_WINDOWS periods
+    after the window ends, so validating it is pure arithmetic.
+    """
+    config = config or get_rotation_config()
+    expires_at = (window + 1 + config["GRACE_WINDOWS"]) * config["PERIOD"]
+    return make_session_token(expires_at=expires_at, rotating=True, **fields)
+
+
+def is_rotating_token(payload, now=None, config=None):
+    """
+    True when a verified token was signed as a rotating-window token and its
+    lifetime fits a rotation window (O(1), no DB).
+    """
+    config = config or get_rotation_config()
+    now = now if now is not None else time.time()
+    max_lifetime = (config["GRACE_WINDOWS"] + 1) * config["PERIOD"]
+    return bool(payload.get("rotating")) and payload["expires_at"] - now <= max_lifetime
+
+
+def check_rotation_policy(payload):
+    """
+    Returns an error message when rotating codes are required and the
+    payload is a static session token, otherwise None.
+    """
+    config = get_rotation_config()
+    if config["REQUIRED"] and not is_rotating_token(payload, config=config):
+        return ROTATION_REQUIRED_ERROR
+    return None
+
+
+def session_fields(session):
+    return {
+        "subject_code": session.subject.code,
+        "session_id": session.id,
+        "topic": session.topic,
+        "class_date": str(session.class_date),
+        "start_time": str(session.start_time),
+    }
+
+
+class RotatingFrameCache:
+    """
+    Bounded cache of pre-rendered rotating QR frames keyed by
+    (session, window, format variant).
+
+    The current window is rendered on demand if missing; the next PRECOMPUTE
+    windows are rendered on a background thread so polls never wait on
+    qrcode.make().
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_rotation_config()
+        self._lock = threading.Lock()
+        self._frames = OrderedDict()     # (session_id, window, fmt, scale) → (etag, body, headers)
+        self._fields = OrderedDict()     # session_id → (token fields, loaded at), LRU
+        self._scheduled = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qr-rotation")
+        self._stats = {"hits": 0, "renders": 0, "precomputed": 0}
+
+    def _render(self, session_id, window, fields, fmt, scale):
+        token = window_token(fields, window, self.config)
+        body, headers = render_qr(token, fmt, scale)
+        etag = hashlib.sha256(f"{fmt}:{scale}:{token}".encode()).hexdigest()[:32]
+        with self._lock:
+            if self._fields.get(session_id, (None,))[0] is fields:
+                self._frames[(session_id, window, fmt, scale)] = (etag, body, headers)
+                while len(self._frames) > self.config["MAX_FRAMES"]:
+                    self._frames.popitem(last=False)
+        return etag, body, headers
+
+    def _precompute(self, key, fields):
+        try:
+            with self._lock:
+                missing = key not in self._frames
+            if missing:
+                session_id, window, fmt, scale = key
+                self._render(session_id, window, fields, fmt, scale)
+                with self._lock:
+                    self._stats["precomputed"] += 1
+        finally:
+            with self._lock:
+                self._scheduled.discard(key)
+
+    def set_fields(self, session_id, fields):
+        with self._lock:
+            self._fields[session_id] = (fields, time.monotonic())
+            self._fields.move_to_end(session_id)
+            while len(self._fields) > self.config["MAX_SESSIONS"]:
+                self._fields.popitem(last=False)
+
+    def frame(self, session_id, now=None, fmt="png", scale=DEFAULT_SCALE):
+        """
+        Returns (window, etag, body, headers) for the session's current window,
+        or None when the session's fields are not loaded (set_fields()) or are
+        older than FIELDS_TTL. Signals only invalidate the saving process, so
+        the TTL bounds how long other workers can sign stale fields.
+        """
+        window = current_window(now, self.config["PERIOD"])
+        key = (session_id, window, fmt, scale)
+        with self._lock:
+            fields, loaded_at = self._fields.get(session_id, (None, None))
+            if fields is None or time.monotonic() - loaded_at > self.config["FIELDS_TTL"]:
+                return None
+            self._fields.move_to_end(session_id)
+            entry = self._frames.get(key)
+            if entry:
+                self._frames.move_to_end(key)
+                self._stats["hits"] += 1
+
+        if entry is None:
+            entry = self._render(session_id, window, fields, fmt, scale)
+            with self._lock:
+                self._stats["renders"] += 1
+
+        # ✅ Queue the upcoming windows (same format) for background rendering
+        for ahead in range(1, self.config["PRECOMPUTE"] + 1):
+            upcoming = (session_id, window + ahead, fmt, scale)
+            with self._lock:
+                if upcoming in self._frames or upcoming in self._scheduled:
+                    continue
+                self._scheduled.add(upcoming)
+            self._executor.submit(self._precompute, upcoming, fields)
+
+        return (window,) + entry
+
+    def invalidate(self, session_id):
+        with self._lock:
+            self._fields.pop(session_id, None)
+            for key in [key for key in self._frames if key[0] == session_id]:
+                del self._frames[key]
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["frames"] = len(self._frames)
+            data["sessions"] = len(self._fields)
+        return data
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_rotating_frame_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RotatingFrameCache()
+        return _cache
@@ -1,65 +1,255 @@
 import cv2
 import numpy as np
-from pyzbar.pyzbar import decode as pyzbar_decode
 from PIL import Image
+from io import BytesIO
 import os
+import threading
+import time
+
+from core.utils.qr_decoders import get_decoder_registry, get_detector
+
+# ✅ Pyramid widths tried from coarse to fine before falling back to full resolution.
+#    QR codes on a projector / phone screen usually fill a good part of the frame,
+#    so the cheap 480px pass succeeds most of the time.
+PYRAMID_WIDTHS = (480, 800, 1280)
+
+# ✅ Padding (fraction of the located QR size) kept around the crop taken
+#    from the full-resolution frame in the locate-then-crop stage.
+CROP_MARGIN = 0.15
+
+_local = threading.local()
+
+
+def _get_clahe():
+    clahe = getattr(_local, "clahe", None)
+    if clahe is None:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        _local.clahe = clahe
+    return clahe
+
+
+# ✅ JPEGs whose longer side exceeds this are decoded at 1/2, 1/4 or 1/8 scale
+#    (libjpeg scales in the DCT domain, so the full frame is never materialised).
+REDUCED_DECODE_MIN_SIDE = 2000
+
+# ✅ Bytes handed to PIL to read the JPEG dimensions (covers large EXIF blocks)
+JPEG_HEADER_BYTES = 128 * 1024
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+
+def _read_buffer(image_input):
+    """
+    Returns the encoded image bytes without copying them where possible
+    (bytes, in-memory uploads and BytesIO expose their buffer directly).
+    """
+    if isinstance(image_input, (bytes, bytearray, memoryview)):
+        return image_input
+    if hasattr(image_input, "read"):  # Django uploaded file / file object
+        inner = getattr(image_input, "file", image_input)
+        if hasattr(inner, "getbuffer"):
+            return inner.getbuffer()
+        image_input.seek(0)
+        return image_input.read()
+    if isinstance(image_input, str) and os.path.exists(image_input):  # File path
+        with open(image_input, "rb") as fh:
+            return fh.read()
+    return None
+
+
+def _imread_flag(buffer):
+    """
+    Picks a reduced-size grayscale decode for huge JPEGs.
+    Only the image header is parsed to learn the dimensions.
+    """
+    if bytes(buffer[:2]) != b"\xff\xd8":  # not a JPEG
+        return cv2.IMREAD_GRAYSCALE
+    try:
+        with Image.open(BytesIO(buffer[:JPEG_HEADER_BYTES])) as header:
+            longest = max(header.size)
+    except Exception:
+        return cv2.IMREAD_GRAYSCALE
+    for factor, flag in _REDUCED_FLAGS:
+        if longest // factor >= REDUCED_DECODE_MIN_SIDE:
+            return flag
+    return cv2.IMREAD_GRAYSCALE
+
+
+def _load_gray(image_input):
+    """
+    Decodes an uploaded file, file path or raw bytes straight into a
+    single-channel uint8 array (no RGB/BGR intermediate copies).
+    """
+    buffer = _read_buffer(image_input)
+    if buffer is None or len(buffer) == 0:
+        print("❌ Invalid image input:", image_input)
+        return None
+
+    encoded = np.frombuffer(buffer, dtype=np.uint8)
+    gray = cv2.imdecode(encoded, _imread_flag(buffer))
+    if gray is None:
+        print("❌ Unsupported or corrupt image.")
+    return gray
+
+
+def _resize_to_width(gray, width):
+    h, w = gray.shape[:2]
+    if w <= width:
+        return gray
+    height = max(1, int(round(h * width / w)))
+    return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def _decode_any(gray, order):
+    # ✅ Backends are tried in the registry's (adaptive or pinned) order
+    return get_decoder_registry().decode(gray, order)
+
+
+def _enhance_contrast(gray):
+    # ✅ Local histogram equalisation — evens out glare and dim projector shots
+    return _get_clahe().apply(gray)
+
+
+def _binarize(gray):
+    # ✅ Otsu threshold on a lightly blurred frame — removes screen moiré / JPEG noise
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def _locate_and_crop(gray, small):
+    """
+    Locates the QR on the downscaled frame and returns the matching
+    full-resolution crop (or None when nothing is found).
+    """
+    found, points = get_detector().detect(small)
+    if not found or points is None:
+        return None
+
+    scale = gray.shape[1] / small.shape[1]
+    pts = points.reshape(-1, 2) * scale
+    x0, y0 = pts.min(axis=0)
+    x1, y1 = pts.max(axis=0)
+    margin = max(x1 - x0, y1 - y0) * CROP_MARGIN
+
+    h, w = gray.shape[:2]
+    x0 = int(max(0, x0 - margin))
+    y0 = int(max(0, y0 - margin))
+    x1 = int(min(w, x1 + margin))
+    y1 = int(min(h, y1 + margin))
+    if x1 - x0 < 8 or y1 - y0 < 8:
+        return None
+    return gray[y0:y1, x0:x1]
+
+
+def decode_gray(gray):
+    """
+    Runs the staged decode pipeline on a grayscale frame.
+    Returns (data, stage, backend) for the first stage that decodes,
+    or (None, None, None).
+
+    Stages (cheapest first):
+        pyramid_<width>  → downscaled frame, coarse to fine
+        crop             → locate on a small frame, decode the full-res crop
+        full             → full-resolution frame
+        contrast         → CLAHE-enhanced full frame
+        threshold        → Otsu-binarised full frame
+    """
+    # ✅ One try order per scan — every stage below reuses it
+    order = get_decoder_registry().current_plan()
+    levels = [_resize_to_width(gray, width) for width in PYRAMID_WIDTHS]
+
+    for width, level in zip(PYRAMID_WIDTHS, levels):
+        if level is gray:
+            break  # frame is already smaller than this level
+        data, backend = _decode_any(level, order)
+        if data:
+            return data, f"pyramid_{width}", backend
+
+    if levels[0] is not gray:
+        crop = _locate_and_crop(gray, levels[0])
+        if crop is not None:
+            data, backend = _decode_any(crop, order)
+            if data:
+                return data, "crop", backend
+
+    data, backend = _decode_any(gray, order)
+    if data:
+        return data, "full", backend
+
+    enhanced = _enhance_contrast(gray)
+    data, backend = _decode_any(enhanced, order)
+    if data:
+        return data, "contrast", backend
+
+    data, backend = _decode_any(_binarize(enhanced), order)
+    if data:
+        return data, "threshold", backend
+
+    return None, None, None
+
+
+def parse_qr_payload(data):
+    """
+    Parses the raw QR text into the structured attendance payload.
+    Returns None when the text is not in the expected format.
+    """
+    parts = data.split(",")
+    if len(parts) < 5:
+        print("⚠️ Invalid QR format. Expected 5 fields.")
+        return None
+
+    subject_code, session_id, topic, class_date, start_time = parts[:5]
+    return {
+        "subject_code": subject_code.strip(),
+        "session_id": session_id.strip(),
+        "topic": topic.strip(),
+        "class_date": class_date.strip(),
+        "start_time": start_time.strip(),
+    }
+
 
 def scan_qr(image_input, student_id=None):
     """
-    Scans and decodes QR code from an image file or uploaded file.
+    Scans and decodes QR code from an image file, uploaded file, raw bytes
+    or an already-decoded grayscale frame (NumPy array).
     Returns a dictionary with decoded data (subject_code, session_id, topic, date, time)
-    or None if unsuccessful.
+    plus the pipeline stage that succeeded, or None if unsuccessful.
 
     Expected QR format:
         subject_code,session_id,topic,class_date,start_time
     """
 
     try:
-        # ✅ Load the image properly
-        if hasattr(image_input, "read"):  # Django uploaded file
-            image = Image.open(image_input).convert("RGB")
-        elif isinstance(image_input, str) and os.path.exists(image_input):  # File path
-            image = Image.open(image_input).convert("RGB")
-        else:
-            print("❌ Invalid image input:", image_input)
-            return None
+        started = time.perf_counter()
 
-        # ✅ Convert image for OpenCV decoding
-        np_img = np.array(image)
-        image_bgr = cv2.cvtColor(np_img, cv2.COLOR_RGB2BGR)
-
-        # ✅ Try OpenCV QR decoding first
-        detector = cv2.QRCodeDetector()
-        data, points, _ = detector.detectAndDecode(image_bgr)
+        # ✅ Load the image straight to grayscale (both decoders only need luminance)
+        gray = image_input if isinstance(image_input, np.ndarray) else _load_gray(image_input)
+        if gray is None:
+            return None
+        load_ms = (time.perf_counter() - started) * 1000
 
-        # ✅ If OpenCV fails, use Pyzbar
-        if not data:
-            decoded_objs = pyzbar_decode(image_bgr)
-            if decoded_objs:
-                data = decoded_objs[0].data.decode("utf-8")
+        data, stage, backend = decode_gray(gray)
+        elapsed_ms = (time.perf_counter() - started) * 1000
 
         if not data:
-            print("❌ No QR code detected or could not decode QR.")
+            print(f"❌ No QR code detected or could not decode QR. ({elapsed_ms:.1f} ms)")
             return None
 
-        print(f"📦 Decoded QR Data: {data}")
+        print(f"📦 Decoded QR Data: {data} (stage={stage}, decoder={backend}, load {load_ms:.1f} ms, total {elapsed_ms:.1f} ms)")
 
         # ✅ Parse expected QR data format
-        parts = data.split(",")
-        if len(parts) < 5:
-            print("⚠️ Invalid QR format. Expected 5 fields.")
+        result = parse_qr_payload(data)
+        if result is None:
             return None
 
-        subject_code, session_id, topic, class_date, start_time = parts[:5]
-
-        # ✅ Return structured result (you can directly use this in your view)
-        result = {
-            "subject_code": subject_code.strip(),
-            "session_id": session_id.strip(),
-            "topic": topic.strip(),
-            "class_date": class_date.strip(),
-            "start_time": start_time.strip(),
-        }
+        result["decode_stage"] = stage
+        result["decoder"] = backend
+        result["qr_data"] = data
 
         print(f"✅ QR decoded successfully for student {student_id or '[N/A]'} → {result}")
         return result
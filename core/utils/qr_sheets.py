@@ -0,0 +1,193 @@
+import csv
+import io
+import multiprocessing
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.utils.dateparse import parse_date
+
+from core.models import Session
+from core.utils.qr_generator import render_sheet_entry
+from core.utils.qr_token import session_token
+
+# ✅ One render pool per worker count, shared by every export in this process
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+class SheetFilterError(ValueError):
+    pass
+
+
+def sheet_filters(subject_id=None, date_from=None, date_to=None):
+    """
+    Parses the sheet filters up front (before anything is streamed).
+    Raises SheetFilterError for a non-numeric subject_id or a malformed date.
+    """
+    filters = {"subject_id": None}
+    if subject_id:
+        if not str(subject_id).isdigit():
+            raise SheetFilterError("Invalid subject_id (expected an integer).")
+        filters["subject_id"] = int(subject_id)
+    for key, value in (("date_from", date_from), ("date_to", date_to)):
+        try:
+            filters[key] = parse_date(value) if value else None
+        except ValueError:
+            filters[key] = None
+        if value and filters[key] is None:
+            raise SheetFilterError(f"Invalid {key} (expected YYYY-MM-DD).")
+    return filters
+
+
+def sheet_sessions(subject_id=None, subject_code=None, date_from=None, date_to=None):
+    """
+    Sessions to print, ordered by subject, date and start time.
+    """
+    sessions = Session.objects.select_related("subject")
+    if subject_id:
+        sessions = sessions.filter(subject_id=subject_id)
+    if subject_code:
+        sessions = sessions.filter(subject__code=subject_code)
+    if date_from:
+        sessions = sessions.filter(class_date__gte=date_from)
+    if date_to:
+        sessions = sessions.filter(class_date__lte=date_to)
+    return sessions.order_by("subject__code", "class_date", "start_time", "id")
+
+
+def _sheet_jobs(sessions):
+    for session in sessions.iterator(chunk_size=500):
+        filename = f"{session.subject.code}/{session.class_date}_{session.start_time:%H%M}_{session.id}.png"
+        yield filename, session_token(session), session
+
+
+def _get_executor(workers):
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            # Jobs live in qr_generator, which spawned children can import without django.setup()
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _executors[workers] = executor
+        return executor
+
+
+def _reset_executor(workers, executor):
+    with _executors_lock:
+        if _executors.get(workers) is executor:
+            del _executors[workers]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _inline(job):
+    future = Future()
+    future.set_result(render_sheet_entry(job))
+    return future
+
+
+def render_sheet_entries(sessions, workers=2, window=None):
+    """
+    Yields (filename, png bytes, session) in order, rendering on the shared
+    process pool. At most `window` images are in flight, so memory stays
+    bounded however many sessions there are. If the pool breaks, the rest
+    is rendered inline rather than cutting the stream short.
+    """
+    jobs = _sheet_jobs(sessions)
+    if workers <= 1:
+        for filename, token, session in jobs:
+            yield render_sheet_entry((filename, token)) + (session,)
+        return
+
+    window = window or workers * 4
+    executor = _get_executor(workers)
+    in_flight = deque()
+
+    def submit(job):
+        nonlocal executor
+        if executor is not None:
+            try:
+                return executor.submit(render_sheet_entry, job)
+            except BrokenProcessPool:
+                _reset_executor(workers, executor)
+                executor = None
+        return _inline(job)
+
+    def finish():
+        nonlocal executor
+        future, job, session = in_flight.popleft()
+        try:
+            return future.result() + (session,)
+        except BrokenProcessPool:
+            if executor is not None:
+                print("❌ QR sheet pool crashed — rendering inline.")
+                _reset_executor(workers, executor)
+                executor = None
+            return render_sheet_entry(job) + (session,)
+
+    try:
+        for filename, token, session in jobs:
+            job = (filename, token)
+            in_flight.append((submit(job), job, session))
+            if len(in_flight) >= window:
+                yield finish()
+        while in_flight:
+            yield finish()
+    finally:
+        # Client went away mid-stream: don't leave its renders queued on the shared pool
+        for future, _, _ in in_flight:
+            future.cancel()
+
+
+class _ChunkSink:
+    """
+    Write-only file object collecting ZIP output between yields.
+    (No tell()/seek(), so zipfile streams with data descriptors.)
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_qr_sheet_zip(sessions, workers=2, stats=None):
+    """
+    Streams a ZIP of session QR PNGs (plus an index.csv) chunk by chunk.
+    `stats`, if given, is filled with count / seconds / per_second at the end.
+    """
+    started = time.perf_counter()
+    sink = _ChunkSink()
+    index = io.StringIO()
+    writer = csv.writer(index)
+    writer.writerow(["file", "subject_code", "session_id", "topic", "class_date", "start_time", "end_time"])
+
+    count = 0
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for filename, png, session in render_sheet_entries(sessions, workers=workers):
+            archive.writestr(filename, png)
+            writer.writerow([
+                filename, session.subject.code, session.id, session.topic,
+                session.class_date, session.start_time, session.end_time,
+            ])
+            count += 1
+            yield sink.drain()
+        archive.writestr("index.csv", index.getvalue())
+    yield sink.drain()
+
+    elapsed = time.perf_counter() - started
+    if stats is not None:
+        stats.update(count=count, seconds=round(elapsed, 3), per_second=round(count / elapsed, 1) if elapsed else None)
+    print(f"🖨️ QR sheet: {count} sessions in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f}/s)")
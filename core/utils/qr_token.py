@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import hmac
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from django.conf import settings
+
+# ✅ Signed QR token format (plain text so any phone scanner can read it):
+#       subject_code,session_id,topic,class_date,start_time,expires_at,signature
+#    expires_at is a unix timestamp, signature is a truncated HMAC-SHA256
+#    (base64url, 22 chars) over everything before it. Rotating-window tokens
+#    are signed under a separate context, so a static token can never pass
+#    as a rotating one.
+TOKEN_SALT = "core.qr_token"
+ROTATING_CONTEXT = "rotating:"
+SIGNATURE_BYTES = 16
+SIGNATURE_LENGTH = 22
+
+
+class InvalidQRToken(Exception):
+    """Raised when a QR token is malformed, tampered with or expired."""
+
+
+@lru_cache(maxsize=1)
+def _signing_key():
+    return hashlib.sha256(f"{TOKEN_SALT}:{settings.SECRET_KEY}".encode()).digest()
+
+
+def _sign(message, rotating=False):
+    if rotating:
+        message = ROTATING_CONTEXT + message
+    digest = hmac.new(_signing_key(), message.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:SIGNATURE_BYTES]).rstrip(b"=").decode()
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def make_session_token(subject_code, session_id, topic, class_date, start_time, expires_at, rotating=False):
+    """
+    Builds the signed, expiring token embedded in a session QR code.
+    """
+    message = f"{subject_code},{session_id},{topic},{class_date},{start_time},{_timestamp(expires_at)}"
+    return f"{message},{_sign(message, rotating)}"
+
+
+def session_token(session, expires_at=None):
+    """
+    Signed token for a Session, valid until the session ends (+ grace period).
+    """
+    if expires_at is None:
+        expires_at = session.ends_at.timestamp() + getattr(settings, "QR_TOKEN_GRACE_SECONDS", 300)
+    return make_session_token(
+        subject_code=session.subject.code,
+        session_id=session.id,
+        topic=session.topic,
+        class_date=str(session.class_date),
+        start_time=str(session.start_time),
+        expires_at=expires_at,
+    )
+
+
+def looks_signed(token):
+    """
+    Cheap check whether a QR text carries a signature (vs. a legacy unsigned payload).
+    """
+    parts = token.rsplit(",", 2)
+    return len(parts) == 3 and parts[1].isdigit() and len(parts[2]) == SIGNATURE_LENGTH
+
+
+def accepts_unsigned(today=None):
+    """
+    Whether legacy unsigned QR payloads are still accepted: only while the
+    QR_ACCEPT_UNSIGNED migration switch is on and before its sunset date.
+    """
+    if not getattr(settings, "QR_ACCEPT_UNSIGNED", False):
+        return False
+    until = getattr(settings, "QR_ACCEPT_UNSIGNED_UNTIL", None)
+    if not until:
+        return True
+    today = today or datetime.now().date()
+    return today <= datetime.strptime(str(until), "%Y-%m-%d").date()
+
+
+def verify_session_token(token, now=None):
+    """
+    Verifies signature and expiry and returns the payload dict
+    (subject_code, session_id, topic, class_date, start_time, expires_at,
+    rotating).
+    Raises InvalidQRToken otherwise. No database access.
+    """
+    token = (token or "").strip()
+    if not looks_signed(token):
+        raise InvalidQRToken("Malformed QR token.")
+
+    message, signature = token.rsplit(",", 1)
+    if hmac.compare_digest(_sign(message), signature):
+        rotating = False
+    elif hmac.compare_digest(_sign(message, rotating=True), signature):
+        rotating = True
+    else:
+        raise InvalidQRToken("QR token signature is invalid.")
+
+    head, class_date, start_time, expires_at = message.rsplit(",", 3)
+    head_parts = head.split(",", 2)
+    if len(head_parts) != 3:
+        raise InvalidQRToken("Malformed QR token.")
+
+    expires_at = int(expires_at)
+    if expires_at < (now if now is not None else time.time()):
+        raise InvalidQRToken("QR code has expired.")
+
+    subject_code, session_id, topic = head_parts
+    return {
+        "subject_code": subject_code.strip(),
+        "session_id": session_id.strip(),
+        "topic": topic.strip(),
+        "class_date": class_date.strip(),
+        "start_time": start_time.strip(),
+        "expires_at": expires_at,
+        "rotating": rotating,
+    }
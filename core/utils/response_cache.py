@@ -0,0 +1,184 @@
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.response import Response
+
+from core.utils.qr_image_cache import etag_matches
+
+# ✅ Defaults — override any key with settings.RESPONSE_CACHE
+DEFAULT_RESPONSE_CACHE_CONFIG = {
+    "ENABLED": True,
+    "CACHE": "default",     # Django cache alias; must be shared (Redis) — see cache_is_shared()
+    "TTL": 300,             # seconds a rendered response is kept
+    "KEY_PREFIX": "resp",
+}
+
+# Data a cached endpoint can depend on; each has a version counter in the cache
+SCOPES = ("subject", "session", "student", "teacher", "attendance")
+STORED_HEADERS = ("Link", "X-Next-Cursor")
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0, "stored": 0, "bumps": 0}
+
+
+def get_response_cache_config():
+    config = dict(DEFAULT_RESPONSE_CACHE_CONFIG)
+    config.update(getattr(settings, "RESPONSE_CACHE", {}))
+    return config
+
+
+def cache_is_shared(config=None):
+    """
+    Whether the configured cache is visible to every worker. Version bumps
+    from one process never reach another's LocMem cache, so those workers
+    (and the ASGI scan process) would keep serving stale responses.
+    """
+    config = config or get_response_cache_config()
+    return not isinstance(caches[config["CACHE"]], (LocMemCache, DummyCache))
+
+
+def response_cache_active(config=None):
+    """
+    ENABLED and backed by a shared cache; otherwise every view runs uncached.
+    """
+    config = config or get_response_cache_config()
+    return config["ENABLED"] and cache_is_shared(config)
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _version_key(config, scope):
+    return f"{config['KEY_PREFIX']}:v:{scope}"
+
+
+def current_versions(scopes, config=None):
+    """
+    Version counters for `scopes`, one cache round trip. A counter missing
+    from the cache (first use, eviction) restarts from the clock, so it
+    never repeats a value an older cached response was stored under.
+    """
+    config = config or get_response_cache_config()
+    cache = caches[config["CACHE"]]
+    keys = [_version_key(config, scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def _bump(scopes):
+    config = get_response_cache_config()
+    cache = caches[config["CACHE"]]
+    for scope in scopes:
+        key = _version_key(config, scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+        _count("bumps")
+
+
+def bump_versions(*scopes):
+    """
+    Invalidates every cached response depending on `scopes`. Runs after the
+    current transaction commits, so a reader that sees the new version also
+    sees the new rows.
+    """
+    transaction.on_commit(functools.partial(_bump, scopes))
+
+
+def response_cache_stats():
+    with _stats_lock:
+        data = dict(_stats)
+    config = get_response_cache_config()
+    data["enabled"] = response_cache_active(config)
+    data["shared_cache"] = cache_is_shared(config)
+    return data
+
+
+def _request_key(config, view, request):
+    user = request.user
+    principal = f"{getattr(user, 'role', '')}:{getattr(user, 'linked_id', '') or user.pk}"
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.lists()))
+    raw = f"{type(view).__name__}|{principal}|{request.path}|{params}"
+    return f"{config['KEY_PREFIX']}:r:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def _replay(entry):
+    _, status_code, kind, body, headers = entry
+    if kind == "data":
+        return Response(body, status=status_code, headers=headers)
+    content, content_type = body
+    response = HttpResponse(content, status=status_code, content_type=content_type)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def _entry(etag, response):
+    headers = {name: response[name] for name in STORED_HEADERS if response.has_header(name)}
+    if isinstance(response, Response):
+        return (etag, response.status_code, "data", response.data, headers)
+    return (etag, response.status_code, "content", (response.content, response["Content-Type"]), headers)
+
+
+def cached_response(*scopes, bypass=None):
+    """
+    Decorator for APIView GET handlers whose output only changes when rows
+    in `scopes` change. Keyed by view, caller (role + linked id), path and
+    query string; the ETag is derived from the scope versions, so a matching
+    If-None-Match is answered with 304 without touching the database.
+
+    When `bypass(request, *args, **kwargs)` is true the view runs uncached
+    and nothing is stored.
+    """
+
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            config = get_response_cache_config()
+            if not response_cache_active(config) or (bypass and bypass(request, *args, **kwargs)):
+                return view_method(self, request, *args, **kwargs)
+
+            key = _request_key(config, self, request)
+            versions = current_versions(scopes, config)
+            etag = hashlib.sha1(f"{key}|{versions}".encode()).hexdigest()[:32]
+            cache = caches[config["CACHE"]]
+
+            if etag_matches(request, etag):
+                _count("not_modified")
+                response = HttpResponseNotModified()
+            else:
+                entry = cache.get(key)
+                if entry and entry[0] == etag:
+                    _count("hits")
+                    response = _replay(entry)
+                else:
+                    _count("misses")
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    cache.set(key, _entry(etag, response), config["TTL"])
+                    _count("stored")
+
+            response["ETag"] = f'"{etag}"'
+            response["Cache-Control"] = "private, no-cache"
+            response["Vary"] = "Authorization"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core.models import Session
+
+# ✅ Defaults — override any key with settings.ACTIVE_SESSION_REGISTRY
+DEFAULT_REGISTRY_CONFIG = {
+    "ENABLED": True,
+    "TTL": 30,               # seconds an entry is trusted (other workers' edits show up after this)
+    "NEGATIVE_TTL": 5,       # seconds an unknown / closed session id is remembered
+    "MAX_ENTRIES": 1024,     # bounded size (per process)
+    "OPEN_BEFORE": 900,      # seconds before start_time scans are accepted
+    "CLOSE_AFTER": 300,      # seconds after end_time scans are still accepted
+}
+
+# ✅ validate() errors
+NOT_FOUND = "session_not_found"
+NOT_STARTED = "session_not_started"
+ENDED = "session_ended"
+
+
+def get_registry_config():
+    config = dict(DEFAULT_REGISTRY_CONFIG)
+    config.update(getattr(settings, "ACTIVE_SESSION_REGISTRY", {}))
+    return config
+
+
+class ActiveSessionRegistry:
+    """
+    In-process map of live sessions: session id → (session with its subject,
+    accept-from, accept-until, expires_at).
+
+    Sessions are loaded on first scan, dropped once their window closes (or
+    after TTL) and invalidated by the Session / Subject save signals, so a
+    mark request is validated without touching the database.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_registry_config()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "rejected_window": 0, "evicted_ended": 0}
+
+    def _load(self, session_id, now):
+        session = Session.objects.select_related("subject").filter(id=session_id).first()
+        if session is None:
+            return (None, None, None, now + self.config["NEGATIVE_TTL"])
+        opens_at = session.starts_at.timestamp() - self.config["OPEN_BEFORE"]
+        closes_at = session.ends_at.timestamp() + self.config["CLOSE_AFTER"]
+        if now > closes_at:
+            return (session, opens_at, closes_at, now + self.config["NEGATIVE_TTL"])
+        return (session, opens_at, closes_at, min(now + self.config["TTL"], closes_at))
+
+    def get(self, session_id, now=None):
+        """
+        Returns (session, opens_at, closes_at); session is None if it does not exist.
+        """
+        now = now if now is not None else time.time()
+        if not self.config["ENABLED"]:
+            return self._load(session_id, now)[:3]
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry and entry[3] > now:
+                self._entries.move_to_end(session_id)
+                self._stats["hits"] += 1
+                return entry[:3]
+            if entry:
+                del self._entries[session_id]
+                if entry[2] is not None and now > entry[2]:
+                    self._stats["evicted_ended"] += 1
+            self._stats["misses"] += 1
+
+        entry = self._load(session_id, now)
+        with self._lock:
+            self._stats["loads"] += 1
+            self._entries[session_id] = entry
+            while len(self._entries) > self.config["MAX_ENTRIES"]:
+                self._entries.popitem(last=False)
+        return entry[:3]
+
+    def validate(self, session_id, subject_code, now=None):
+        """
+        Returns (session, error). error is None for an open session matching
+        subject_code, NOT_FOUND for an unknown / mismatched one, or
+        NOT_STARTED / ENDED when the scan is outside the session's time window.
+        """
+        if not str(session_id).isdigit():
+            return None, NOT_FOUND
+        now = now if now is not None else time.time()
+        session, opens_at, closes_at = self.get(int(session_id), now)
+        if session is None or session.subject.code != subject_code:
+            return None, NOT_FOUND
+        if now < opens_at or now > closes_at:
+            with self._lock:
+                self._stats["rejected_window"] += 1
+            return session, NOT_STARTED if now < opens_at else ENDED
+        return session, None
+
+    def invalidate(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["entries"] = len(self._entries)
+        return data
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_session_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ActiveSessionRegistry()
+        return _registry
+
+
+def registry_stats():
+    return get_session_registry().stats()
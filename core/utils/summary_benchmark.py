@@ -0,0 +1,78 @@
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+from core.models import AttendanceSummary
+from core.serializers import AttendancePercentageSerializer
+from core.utils.fast_summary import encode_summary_rows, percentage, summary_rows
+from core.utils.qr_benchmark import _summarise, _timed
+
+
+def synthetic_rows(count):
+    return [
+        (f"S{i:06d}", f"CS{100 + i % 12}", 40 + i % 7, (i * 7) % 41)
+        for i in range(count)
+    ]
+
+
+def drf_response_body(rows):
+    """
+    The previous read path: hand-built dicts, serializer(many=True), JSONRenderer.
+    """
+    results = []
+    for student_id, subject_code, total, attended in rows:
+        results.append({
+            "student_id": student_id,
+            "subject_code": subject_code,
+            "total_classes": total,
+            "attended": attended,
+            "percentage": percentage(attended, total),
+        })
+    return JSONRenderer().render(AttendancePercentageSerializer(results, many=True).data)
+
+
+def fast_response_body(rows):
+    return encode_summary_rows(rows)
+
+
+def _db_drf_body():
+    rows = AttendanceSummary.objects.filter(total_classes__gt=0).values_list(
+        "student_id", "subject__code", "total_classes", "attended"
+    )
+    return drf_response_body(list(rows))
+
+
+def _db_fast_body():
+    return encode_summary_rows(
+        summary_rows(AttendanceSummary.objects.filter(total_classes__gt=0), subject_code=F("subject__code"))
+    )
+
+
+def run_summary_benchmark(rows=10000, repeat=20, from_db=False):
+    """
+    Times the serializer-free summary encoder against the DRF serializer path.
+    In-memory rows isolate serialization cost; from_db times query + encoding
+    over the current AttendanceSummary table.
+    """
+    if from_db:
+        paths = {"drf": (_db_drf_body, ()), "fast": (_db_fast_body, ())}
+    else:
+        data = synthetic_rows(rows)
+        paths = {"drf": (drf_response_body, (data,)), "fast": (fast_response_body, (data,))}
+
+    results, bodies = {}, {}
+    for name, (func, args) in paths.items():
+        samples = []
+        for _ in range(repeat):
+            body, ms = _timed(func, *args)
+            samples.append((True, ms))
+        row = _summarise(samples)
+        del row["success_rate"]
+        row["bytes"] = len(body)
+        results[name] = row
+        bodies[name] = body
+
+    baseline = results["drf"]
+    for row in results.values():
+        row["speedup"] = round(baseline["p50_ms"] / row["p50_ms"], 2) if row["p50_ms"] else None
+    results["fast"]["identical_output"] = bodies["fast"] == bodies["drf"]
+    return results
@@ -2,16 +2,36 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from core.models import Teacher, Student, User, Subject, Attendance
+from core.models import Teacher, Student, User, Subject, Attendance, AttendanceSummary
 from core.serializers import (
     TeacherSerializer,
     StudentSerializer,
     UserSerializer,
-    AttendancePercentageSerializer
 )
+from core.pagination import keyset_page, paginated_response, link_next_page, InvalidCursor
 from core.permissions import IsAdminUserCustom
+from core.renderers import EXPORT_RENDERER_CLASSES
+from core.utils.attendance_export import (
+    EXPORT_FORMATS,
+    EXPORT_KINDS,
+    ExportFilterError,
+    export_filters,
+    negotiate_export_format,
+    stream_export,
+)
+from core.utils.decode_pool import pool_stats
+from core.utils.decode_cache import cache_stats
+from core.utils.qr_decoders import decoder_stats
+from core.utils.attendance_spool import spool_stats
+from core.utils.session_registry import registry_stats
+from core.utils.idempotency import idempotency_stats
+from core.utils.admission import admission_stats
+from core.utils.fast_summary import summary_rows, summary_json_response
+from core.utils.response_cache import cached_response, response_cache_stats
 from rest_framework_simplejwt.tokens import AccessToken
 from django.db.models import Count, Q, F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -127,20 +147,13 @@ class RegisterStudentAPIView(APIView):
 class StudentAttendanceSummaryAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUserCustom]
 
+    @cached_response("attendance", "subject")
     def get(self, request, student_id):
-        # Group attendance by subject for a specific student
-        attendance_data = (
-            Attendance.objects
-            .filter(student__student_id=student_id)
-            .values(
-                "session__subject__code",  # subject code
-                "student__student_id"      # student id
-            )
-            .annotate(
-                total_classes=Count("id"),
-                attended=Count("id", filter=Q(status="Present"))
-            )
-        )
+        # Per-subject counters for a specific student (maintained summary table)
+        attendance_data = list(summary_rows(
+            AttendanceSummary.objects.filter(student_id=student_id, total_classes__gt=0),
+            subject_code=F("subject__code"),
+        ))
 
         if not attendance_data:
             return Response(
@@ -148,23 +161,8 @@ class StudentAttendanceSummaryAPIView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # ✅ Rename for serializer compatibility
-        results = []
-        for record in attendance_data:
-            total = record["total_classes"]
-            attended = record["attended"]
-            percentage = round((attended / total) * 100, 2) if total else 0.0
-
-            results.append({
-                "student_id": record["student__student_id"],
-                "subject_code": record["session__subject__code"],
-                "total_classes": total,
-                "attended": attended,
-                "percentage": percentage
-            })
-
-        serializer = AttendancePercentageSerializer(results, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # ✅ Counters go straight to JSON (no serializer pass)
+        return summary_json_response(attendance_data, status=status.HTTP_200_OK)
 
 
 # ✅ View All Students Attendance Summary (ORM-based)
@@ -172,16 +170,17 @@ class AllStudentsAttendanceAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUserCustom]
 
     def get(self, request):
-        # Get attendance summary grouped by student and subject
-        attendance_data = (
-            Attendance.objects
-            .values("student__student_id", "session__subject__code")
-            .annotate(
-                total_classes=Count("id"),
-                attended=Count("id", filter=Q(status="Present"))
-            )
-            .order_by("student__student_id", "session__subject__code")
+        # Summary counters per student and subject (maintained summary table)
+        attendance_data = summary_rows(
+            AttendanceSummary.objects.filter(total_classes__gt=0),
+            subject_code=F("subject__code"),
         )
+        try:
+            attendance_data, next_cursor = keyset_page(
+                request, attendance_data, [("student_id", "student_id"), ("subject__code", "subject_code")]
+            )
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         if not attendance_data:
             return Response(
@@ -189,45 +188,103 @@ class AllStudentsAttendanceAPIView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # ✅ Normalize key names for serializer compatibility
-        results = []
-        for record in attendance_data:
-            total = record["total_classes"]
-            attended = record["attended"]
-            percentage = round((attended / total) * 100, 2) if total else 0.0
-
-            results.append({
-                "student_id": record["student__student_id"],
-                "subject_code": record["session__subject__code"],
-                "total_classes": total,
-                "attended": attended,
-                "percentage": percentage,
-            })
-
-        serializer = AttendancePercentageSerializer(results, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return link_next_page(request, summary_json_response(attendance_data), next_cursor)
 
 # ✅ View All Teachers
 class ListTeachersAPIView(APIView):
     """
-    Allows admin to view all registered teachers.
+    Allows admin to view all registered teachers. Pass ?limit= (and then
+    ?cursor=) for keyset pages; the next page is in the Link header.
     """
     permission_classes = [IsAuthenticated, IsAdminUserCustom]
 
+    @cached_response("teacher")
     def get(self, request):
-        teachers = Teacher.objects.all().order_by("teacher_id")
+        try:
+            teachers, next_cursor = keyset_page(request, Teacher.objects.all(), [("teacher_id", "teacher_id")])
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         serializer = TeacherSerializer(teachers, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_response(request, serializer.data, next_cursor)
 
 
 # ✅ View All Students
 class ListStudentsAPIView(APIView):
     """
-    Allows admin to view all registered students.
+    Allows admin to view all registered students. Pass ?limit= (and then
+    ?cursor=) for keyset pages; the next page is in the Link header.
     """
     permission_classes = [IsAuthenticated, IsAdminUserCustom]
 
+    @cached_response("student")
     def get(self, request):
-        students = Student.objects.all().order_by("student_id")
+        try:
+            students, next_cursor = keyset_page(request, Student.objects.all(), [("student_id", "student_id")])
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_response(request, serializer.data, next_cursor)
+
+
+# ✅ Streaming Attendance Export (CSV / NDJSON)
+class AttendanceExportAPIView(APIView):
+    """
+    Streams raw attendance rows (kind=attendance) or per-student, per-subject
+    totals (kind=summary) as CSV or NDJSON, straight off a server-side cursor.
+    Format: ?export_format=csv|ndjson or the Accept header (default CSV).
+    Filters: ?subject=&department=&date_from=&date_to= (YYYY-MM-DD).
+    """
+    permission_classes = [IsAuthenticated, IsAdminUserCustom]
+    renderer_classes = EXPORT_RENDERER_CLASSES
+
+    def get(self, request, kind):
+        if kind not in EXPORT_KINDS:
+            return Response(
+                {"error": f"Unknown export. Use one of: {', '.join(EXPORT_KINDS)}."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        fmt = negotiate_export_format(request)
+        if fmt is None:
+            return Response(
+                {"error": f"Unknown format. Use one of: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            filters = export_filters(request.query_params)
+        except ExportFilterError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            stream_export(kind, fmt, filters), content_type=EXPORT_FORMATS[fmt]
+        )
+        filename = f"{kind}-{timezone.localdate():%Y%m%d}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["Vary"] = "Accept"
+        return response
+
+
+# ✅ QR Decode Pool Stats (for tuning pool size / timeouts)
+class DecodeStatsAPIView(APIView):
+    """
+    Allows admin to view decode pool queue depth, latency percentiles,
+    decode cache hit/miss counters, the decoder backend order, the
+    write-behind attendance spool, the active-session registry, the
+    idempotency store, admission control (admitted / shed requests) and
+    the response cache.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUserCustom]
+
+    def get(self, request):
+        return Response(
+            {
+                "decode_pool": pool_stats(),
+                "decode_cache": cache_stats(),
+                "decoders": decoder_stats(),
+                "attendance_spool": spool_stats(),
+                "active_sessions": registry_stats(),
+                "idempotency": idempotency_stats(),
+                "admission": admission_stats(),
+                "response_cache": response_cache_stats(),
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -0,0 +1,187 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+import cv2
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from core.utils.qr_scanner import scan_qr
+
+# ✅ Live scan channel limits
+MAX_FRAME_BYTES = 512 * 1024      # low-resolution camera frames only
+MAX_FRAMES = 900                  # ~1 minute at 15 fps
+IDLE_TIMEOUT = 30                 # seconds without a frame before closing
+FINGERPRINT_SIZE = 16             # frames are compared on a 16x16 thumbnail
+DUPLICATE_THRESHOLD = 4.0         # mean abs difference (0-255) below which a frame is dropped
+
+# WebSocket close codes (4000-4999 are application defined)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_DONE = 1000
+
+
+def _db(func):
+    """
+    Runs a sync ORM helper from the socket, closing stale connections
+    around it (long-lived sockets never hit Django's request signals).
+    """
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapper)
+
+
+@_db
+def _authenticate(raw_token):
+    auth = JWTAuthentication()
+    try:
+        validated = auth.get_validated_token(raw_token)
+        return auth.get_user(validated)
+    except (InvalidToken, TokenError):
+        return None
+
+
+@_db
+def _mark(student_id, qr_result):
+    # Imported lazily — student_views pulls in the decode pool and DRF views
+    from core.views.student_views import verify_scanned_payload, mark_attendance_response
+
+    payload, error = verify_scanned_payload(qr_result)
+    if error:
+        return 403, {"error": error}
+    response = mark_attendance_response(student_id, payload)
+    return response.status_code, response.data
+
+
+def _decode_frame(frame):
+    """
+    Decodes one camera frame to grayscale and its duplicate-check thumbnail.
+    """
+    gray = cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None, None
+    thumb = cv2.resize(gray, (FINGERPRINT_SIZE, FINGERPRINT_SIZE), interpolation=cv2.INTER_AREA)
+    return gray, thumb.astype(np.int16)
+
+
+def _is_duplicate(thumb, previous):
+    if previous is None:
+        return False
+    return float(np.abs(thumb - previous).mean()) < DUPLICATE_THRESHOLD
+
+
+class ScanSocket:
+    """
+    WebSocket live-scan channel for students.
+
+    Connect to  ws://<host>/ws/student/scan/?token=<JWT access token>
+    and send camera frames as binary JPEG/PNG messages. Every frame gets a
+    JSON reply; near-duplicate frames are dropped without decoding. On the
+    first successful decode attendance is marked, the result is sent and
+    the socket is closed.
+    """
+
+    def __init__(self, scope, receive, send):
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+
+    async def send_json(self, data):
+        await self.send({"type": "websocket.send", "text": json.dumps(data, default=str)})
+
+    async def close(self, code=CLOSE_DONE):
+        await self.send({"type": "websocket.close", "code": code})
+
+    async def run(self):
+        message = await self.receive()
+        if message["type"] != "websocket.connect":
+            return
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        raw_token = (query.get("token") or [None])[0]
+        user = await _authenticate(raw_token) if raw_token else None
+        if user is None:
+            await self.close(CLOSE_UNAUTHORIZED)
+            return
+        if user.role != "student" or not user.linked_id:
+            await self.close(CLOSE_FORBIDDEN)
+            return
+
+        await self.send({"type": "websocket.accept"})
+        await self.scan_loop(user.linked_id)
+
+    async def scan_loop(self, student_id):
+        previous = None
+        frames = 0
+
+        while frames < MAX_FRAMES:
+            try:
+                message = await asyncio.wait_for(self.receive(), timeout=IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await self.send_json({"status": "timeout"})
+                await self.close()
+                return
+
+            if message["type"] == "websocket.disconnect":
+                return
+
+            frame = message.get("bytes")
+            if not frame:
+                await self.send_json({"status": "error", "error": "Send camera frames as binary messages."})
+                continue
+            if len(frame) > MAX_FRAME_BYTES:
+                await self.send_json({"status": "error", "error": "Frame too large. Send low-resolution frames."})
+                continue
+            frames += 1
+
+            # ✅ CPU work runs off the event loop (detectors are reused per thread)
+            gray, thumb = await asyncio.to_thread(_decode_frame, frame)
+            if gray is None:
+                await self.send_json({"status": "error", "error": "Unreadable frame."})
+                continue
+            if _is_duplicate(thumb, previous):
+                await self.send_json({"status": "scanning", "dropped": True})
+                continue
+            previous = thumb
+
+            qr_result = await asyncio.to_thread(scan_qr, gray, student_id)
+            if not qr_result:
+                await self.send_json({"status": "scanning", "dropped": False})
+                continue
+
+            http_status, data = await _mark(student_id, qr_result)
+            if http_status == 403:
+                # Forged / expired code in view — keep scanning for a valid one
+                await self.send_json({"status": "error", **data})
+                continue
+
+            await self.send_json({"status": "done", "http_status": http_status, "frames": frames, **data})
+            await self.close()
+            return
+
+        await self.send_json({"status": "error", "error": "Too many frames without a valid QR code."})
+        await self.close()
+
+
+SCAN_SOCKET_PATH = "/ws/student/scan/"
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI entry point for WebSocket connections.
+    """
+    if scope["path"] == SCAN_SOCKET_PATH:
+        await ScanSocket(scope, receive, send).run()
+        return
+
+    # Unknown socket path — reject the handshake
+    message = await receive()
+    if message["type"] == "websocket.connect":
+        await send({"type": "websocket.close", "code": CLOSE_FORBIDDEN})
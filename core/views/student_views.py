@@ -69,6 +69,7 @@ class StudentLoginAPIView(APIView):
         )
 
 
+import math
 import cv2
 import numpy as np
 from PIL import Image
@@ -76,10 +77,52 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from core.models import Student, Subject, Session, Attendance
+from core.models import Student, Subject, Session, Attendance, AttendanceSummary
 from core.serializers import AttendanceSerializer
 from core.permissions import IsStudentUserCustom
-from core.utils.qr_scanner import scan_qr  # ✅ use the updated scanner
+from django.db import transaction
+from django.utils import timezone
+from core.utils.decode_pool import batch_capacity, decode_upload, decode_uploads, DecodeCrashed, DecodePoolBusy, DecodeTimeout
+from core.utils.decode_cache import pin_to_session_end
+from core.utils.qr_token import accepts_unsigned, verify_session_token, looks_signed, InvalidQRToken
+from core.utils.qr_rotation import ROTATION_REQUIRED_ERROR, check_rotation_policy, get_rotation_config
+from core.utils.attendance_writer import (
+    insert_attendance, mark_attendance, ALREADY_MARKED, SESSION_ENDED, SESSION_NOT_FOUND, SESSION_NOT_STARTED, STUDENT_NOT_FOUND,
+)
+from core.utils.session_registry import get_session_registry
+from core.utils.idempotency import idempotent
+from core.utils.admission import get_admission_controller
+from core.utils.attendance_summary import bump_summaries
+from core.throttles import MarkAdmissionThrottle, UploadAdmissionThrottle, charge_verified_session
+from core.utils.attendance_spool import get_attendance_spool, has_pending_marks, pending_marks, spool_enabled
+from core.utils.fast_summary import add_pending_marks, summary_rows, summary_json_response
+from core.utils.response_cache import bump_versions, cached_response
+from django.conf import settings
+
+
+def decode_shed_response():
+    """
+    Fast 429 when this worker is already running its share of decodes.
+    """
+    return Response(
+        {"error": "Too many scans are being processed right now. Please retry."},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": "1"},
+    )
+
+
+SESSION_SHED_ERROR = "Too many scans for this session right now. Please retry."
+
+
+def session_shed_response(wait):
+    """
+    429 for an upload whose verified session has used up its admission budget.
+    """
+    return Response(
+        {"error": SESSION_SHED_ERROR},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(max(1, math.ceil(wait)))},
+    )
 
 
 class MarkAttendanceAPIView(APIView):
@@ -88,7 +131,9 @@ class MarkAttendanceAPIView(APIView):
     """
 
     permission_classes = [IsAuthenticated, IsStudentUserCustom]
+    throttle_classes = [UploadAdmissionThrottle]
 
+    @idempotent
     def post(self, request):
         student_id = request.data.get("student_id")
         qr_image = request.FILES.get("qr_image") or request.data.get("qr_image")
@@ -100,49 +145,300 @@ class MarkAttendanceAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # ✅ Decode the QR code (works for both uploaded file and path)
-        qr_result = scan_qr(qr_image, student_id=student_id)
+        # ✅ Decode the QR code on the decode pool (works for both uploaded file and path)
+        try:
+            with get_admission_controller().decode_slot() as admitted:
+                if not admitted:
+                    return decode_shed_response()
+                qr_result = decode_upload(qr_image, student_id=student_id)
+        except DecodePoolBusy:
+            return Response(
+                {"error": "Server is busy decoding other scans. Please retry."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        except DecodeTimeout:
+            return Response(
+                {"error": "QR decoding took too long. Please retry with a clearer image."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        except DecodeCrashed:
+            return Response(
+                {"error": "QR decoding failed. Please retry with a different photo."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
 
         if not qr_result:
             return Response({"error": "Unable to decode QR code."}, status=400)
 
-        # ✅ Expected structure from scan_qr()
-        subject_code = qr_result["subject_code"]
-        session_id = qr_result["session_id"]
-        topic = qr_result["topic"]
-        class_date = qr_result["class_date"]
-        start_time = qr_result["start_time"]
+        # ✅ Verify the signed token carried by the QR
+        qr_result, error = verify_scanned_payload(qr_result)
+        if error:
+            return Response({"error": error}, status=status.HTTP_403_FORBIDDEN)
 
-        # ✅ Fetch student, subject, and session properly
-        student = Student.objects.filter(student_id=student_id).first()
-        subject = Subject.objects.filter(code=subject_code).first()
-        session = Session.objects.filter(id=session_id, subject=subject).first()
+        # ✅ Charge the verified session's bucket too (admission only knew the student)
+        admitted, wait = charge_verified_session(qr_result["session_id"])
+        if not admitted:
+            return session_shed_response(wait)
 
-        if not student:
-            return Response({"error": "Student not found."}, status=404)
+        return mark_attendance_response(student_id, qr_result)
+
+
+class MarkAttendanceTokenAPIView(APIView):
+    """
+    Student submits the QR token decoded on the phone itself —
+    no image upload and no server-side image processing.
+    """
+
+    permission_classes = [IsAuthenticated, IsStudentUserCustom]
+    throttle_classes = [MarkAdmissionThrottle]
 
-        if not subject or not session:
-            return Response({"error": "Invalid or expired session."}, status=404)
+    @idempotent
+    def post(self, request):
+        student_id = request.data.get("student_id")
+        token = request.data.get("token")
 
-        # ✅ Prevent duplicate attendance
-        if Attendance.objects.filter(student=student, session=session).exists():
+        # ✅ Validate input
+        if not student_id or not token:
             return Response(
-                {"message": "⚠️ Attendance already marked for this session."},
-                status=status.HTTP_200_OK,
+                {"error": "Student ID and QR token are required."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # ✅ Mark attendance
-        attendance = Attendance.objects.create(
-            student=student,
-            session=session,
-            subject=subject,
-            status="Present",
+        try:
+            qr_result = verify_session_token(token)
+        except InvalidQRToken as e:
+            return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
+
+        error = check_rotation_policy(qr_result)
+        if error:
+            return Response({"error": error}, status=status.HTTP_403_FORBIDDEN)
+
+        return mark_attendance_response(student_id, qr_result)
+
+
+def verify_scanned_payload(qr_result):
+    """
+    Verifies the token decoded from an uploaded QR image.
+    Returns (payload, None) on success or (None, error message).
+    Legacy unsigned QR codes are accepted only while the QR_ACCEPT_UNSIGNED
+    migration switch is on (and before QR_ACCEPT_UNSIGNED_UNTIL); unsigned
+    and static tokens are both refused when rotating codes are required.
+    """
+    qr_data = qr_result.get("qr_data", "")
+    if not looks_signed(qr_data):
+        if get_rotation_config()["REQUIRED"]:
+            return None, ROTATION_REQUIRED_ERROR
+        if accepts_unsigned():
+            return qr_result, None
+        return None, "QR code is not signed."
+
+    try:
+        payload = verify_session_token(qr_data)
+    except InvalidQRToken as e:
+        return None, str(e)
+    error = check_rotation_policy(payload)
+    if error:
+        return None, error
+    payload["image_hash"] = qr_result.get("image_hash")
+    return payload, None
+
+
+SESSION_WINDOW_ERRORS = {
+    SESSION_NOT_STARTED: "This session has not started yet.",
+    SESSION_ENDED: "This session has ended.",
+}
+
+
+def mark_attendance_response(student_id, qr_result):
+    """
+    Marks attendance for a decoded / verified QR payload and builds the API response.
+    """
+    # ✅ Validate student / session and insert in one round-trip
+    #    (or spool the mark for a batched insert when write-behind is on)
+    writer = get_attendance_spool().submit if spool_enabled() else mark_attendance
+    outcome, attendance, session = writer(
+        student_id, qr_result["subject_code"], qr_result["session_id"]
+    )
+
+    if outcome == STUDENT_NOT_FOUND:
+        return Response({"error": "Student not found."}, status=404)
+
+    if outcome == SESSION_NOT_FOUND:
+        return Response({"error": "Invalid or expired session."}, status=404)
+
+    if outcome in SESSION_WINDOW_ERRORS:
+        return Response({"error": SESSION_WINDOW_ERRORS[outcome]}, status=status.HTTP_403_FORBIDDEN)
+
+    # ✅ Keep this image's decode cached until the session ends
+    pin_to_session_end(qr_result, session)
+
+    # ✅ Duplicate (or concurrent duplicate) scan
+    if outcome == ALREADY_MARKED:
+        return Response(
+            {"message": "⚠️ Attendance already marked for this session."},
+            status=status.HTTP_200_OK,
         )
 
-        serializer = AttendanceSerializer(attendance)
+    serializer = AttendanceSerializer(attendance)
+    return Response(
+        {"message": "✅ Attendance marked successfully!", "data": serializer.data},
+        status=status.HTTP_201_CREATED,
+    )
+
+
+# ✅ Batch Mark Attendance (kiosk / proxy devices)
+MAX_BATCH_IMAGES = 50
+
+
+class MarkAttendanceBatchAPIView(APIView):
+    """
+    Uploads several QR images in one request, decodes them in parallel and
+    marks all resulting attendance rows in a single transaction.
+    Returns one result per uploaded image (in upload order).
+    """
+
+    permission_classes = [IsAuthenticated, IsStudentUserCustom]
+    throttle_classes = [UploadAdmissionThrottle]
+
+    @idempotent
+    def post(self, request):
+        student_id = request.data.get("student_id")
+        qr_images = request.FILES.getlist("qr_images")
+
+        # ✅ Validate input
+        if not student_id or not qr_images:
+            return Response(
+                {"error": "Student ID and at least one QR image are required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        max_images = min(MAX_BATCH_IMAGES, batch_capacity())
+        if len(qr_images) > max_images:
+            return Response(
+                {"error": f"At most {max_images} images can be uploaded per batch."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        student = Student.objects.filter(student_id=student_id).first()
+        if not student:
+            return Response({"error": "Student not found."}, status=404)
+
+        # ✅ Decode every image in parallel on the decode pool
+        try:
+            with get_admission_controller().decode_slot() as admitted:
+                if not admitted:
+                    return decode_shed_response()
+                qr_results = decode_uploads(qr_images, student_id=student_id)
+        except DecodePoolBusy:
+            return Response(
+                {"error": "Server is busy decoding other scans. Please retry."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        except DecodeTimeout:
+            return Response(
+                {"error": "QR decoding took too long. Please retry with fewer images."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        except DecodeCrashed:
+            return Response(
+                {"error": "QR decoding failed. Please retry with a different photo."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+
+        # ✅ Verify each QR's signed token before touching the database
+        payloads, errors = [], []
+        for qr_result in qr_results:
+            payload, error = verify_scanned_payload(qr_result) if qr_result else (None, None)
+            payloads.append(payload)
+            errors.append(error)
+
+        # ✅ Sessions (and their time windows) come from the active-session registry
+        registry = get_session_registry()
+        sessions = {}
+        for payload in payloads:
+            if payload:
+                sessions[payload["session_id"]] = registry.validate(payload["session_id"], payload["subject_code"])
+        # ✅ Charge each verified session's bucket once (admission only knew the student)
+        shed = {
+            session_id for session_id, (session, error) in sessions.items()
+            if session and not error and not charge_verified_session(session_id)[0]
+        }
+        session_ids = {
+            session.id for session_id, (session, error) in sessions.items()
+            if session and not error and session_id not in shed
+        }
+
+        results = []
+        with transaction.atomic():
+            # ✅ One query for already-marked rows, one insert
+            already_marked = set(
+                Attendance.objects
+                .filter(student=student, session_id__in=session_ids)
+                .values_list("session_id", flat=True)
+            )
+
+            to_create = {}
+            marked_at = timezone.now()
+            for index, (upload, qr_result, error) in enumerate(zip(qr_images, payloads, errors)):
+                item = {"index": index, "file": upload.name}
+                results.append(item)
+
+                if error:
+                    item.update(status="error", error=error)
+                    continue
+
+                if not qr_result:
+                    item.update(status="error", error="Unable to decode QR code.")
+                    continue
+
+                if qr_result["session_id"] in shed:
+                    item.update(status="error", error=SESSION_SHED_ERROR)
+                    continue
+
+                session, session_error = sessions[qr_result["session_id"]]
+                if session_error in SESSION_WINDOW_ERRORS:
+                    item.update(status="error", error=SESSION_WINDOW_ERRORS[session_error])
+                    continue
+                if session_error:
+                    item.update(status="error", error="Invalid or expired session.")
+                    continue
+
+                pin_to_session_end(qr_result, session)
+                item["session_id"] = session.id
+                item["subject_code"] = session.subject.code
+                if session.id in already_marked or session.id in to_create:
+                    item["status"] = "already_marked"
+                    continue
+
+                to_create[session.id] = (session.id, session.subject_id, student.student_id, marked_at)
+                item["status"] = "marked"
+
+            # ✅ Rows a concurrent scan stored first were skipped — report them as such
+            inserted = insert_attendance(to_create.values())
+            for item in results:
+                if item["status"] == "marked" and (item["session_id"], student.student_id) not in inserted:
+                    item["status"] = "already_marked"
+            bump_summaries(
+                (student.student_id, row[1]) for row in to_create.values()
+                if (row[0], student.student_id) in inserted
+            )
+            bump_versions("attendance")
+
         return Response(
-            {"message": "✅ Attendance marked successfully!", "data": serializer.data},
-            status=status.HTTP_201_CREATED,
+            {
+                "message": f"✅ Processed {len(results)} images.",
+                "marked": sum(1 for item in results if item["status"] == "marked"),
+                "already_marked": sum(1 for item in results if item["status"] == "already_marked"),
+                "failed": sum(1 for item in results if item["status"] == "error"),
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
         )
 
 
@@ -153,36 +449,21 @@ class OverallAttendanceAPIView(APIView):
     """
     permission_classes = [IsAuthenticated, IsStudentUserCustom]
 
+    @cached_response("attendance", "subject", bypass=has_pending_marks)
     def get(self, request, student_id):
-        attendance_data = (
-            Attendance.objects
-            .filter(student__student_id=student_id)
-            .values(subject_code=F("session__subject__code"))
-            .annotate(
-                total_classes=Count("id"),
-                attended=Count("id", filter=Q(status="Present"))
-            )
+        # ✅ Read the maintained per-subject counters (no scan of attendance history)
+        attendance_data = summary_rows(
+            AttendanceSummary.objects.filter(student_id=student_id, total_classes__gt=0),
+            subject_code=F("subject__code"),
         )
 
+        # ✅ Read-your-writes: include marks still waiting in the write-behind spool
+        attendance_data = add_pending_marks(attendance_data, student_id, pending_marks(student_id))
+
         if not attendance_data:
             return Response({"message": "No attendance data found."}, status=404)
 
-        formatted_data = []
-        for record in attendance_data:
-            total = record["total_classes"]
-            attended = record["attended"]
-            percentage = round((attended / total) * 100, 2) if total else 0.0
-
-            formatted_data.append({
-                "student_id": student_id,               # ✅ add missing key
-                "subject_code": record["subject_code"], # ✅ consistent field name
-                "total_classes": total,
-                "attended": attended,
-                "percentage": percentage,
-            })
-
-        serializer = AttendancePercentageSerializer(formatted_data, many=True)
-        return Response(serializer.data, status=200)
+        return summary_json_response(attendance_data, status=200)
 
 
 
@@ -192,18 +473,20 @@ class SubjectAttendanceAPIView(APIView):
     """
     permission_classes = [IsAuthenticated, IsStudentUserCustom]
 
+    @cached_response("attendance", "subject", bypass=has_pending_marks)
     def get(self, request, student_id, subject_code):
         attendance_stats = (
             Attendance.objects
-            .filter(student__student_id=student_id, session__subject__code=subject_code)
+            .filter(student_id=student_id, subject__code=subject_code)
             .aggregate(
                 total_classes=Count("id"),
                 attended=Count("id", filter=Q(status="Present"))
             )
         )
 
-        total = attendance_stats.get("total_classes") or 0
-        attended = attendance_stats.get("attended") or 0
+        pending = len(pending_marks(student_id, subject_code))
+        total = (attendance_stats.get("total_classes") or 0) + pending
+        attended = (attendance_stats.get("attended") or 0) + pending
 
         if total == 0:
             return Response(
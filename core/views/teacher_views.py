@@ -4,15 +4,21 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import AccessToken
 from django.db.models import Count, Q, F
-from core.models import Subject, Session, Attendance, Student, User
+from core.models import Subject, Session, Attendance, AttendanceSummary, Student, User
 from core.serializers import (
     SubjectSerializer,
     SessionSerializer,
     AttendanceSerializer,
     AttendancePercentageSerializer
 )
-from core.utils.qr_generator import generate_session_qr_response
+from core.utils.qr_generator import negotiate_qr_format, QR_FORMATS
 from core.permissions import IsTeacherUserCustom
+from core.renderers import QR_RENDERER_CLASSES
+from core.pagination import keyset_page, paginated_response, InvalidCursor
+from core.utils.fast_summary import summary_rows, summary_json_response
+from core.utils.response_cache import cached_response
+from core.utils.attendance_export import ExportFilterError, export_filters
+from core.utils.attendance_trends import compute_trends, fetch_trend_arrays, rolling_window
 
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
@@ -75,12 +81,23 @@ class CreateSubjectAPIView(APIView):
 
 
 # ✅ 2️⃣ Create Session (Generate QR)
-from core.utils.qr_generator import generate_session_qr_response
+from core.utils.qr_image_cache import session_qr_response, etag_matches
+from core.utils.qr_rotation import get_rotating_frame_cache, get_rotation_config, session_fields
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.conf import settings
+from core.utils.qr_sheets import SheetFilterError, sheet_filters, sheet_sessions, stream_qr_sheet_zip
+import time
 
 class CreateSessionAPIView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherUserCustom]
+    renderer_classes = QR_RENDERER_CLASSES
 
     def post(self, request):
+        # ✅ Reject an unknown QR format before anything is saved
+        fmt, _ = negotiate_qr_format(request)
+        if fmt is None:
+            return Response({"error": f"Unknown format. Use one of: {', '.join(QR_FORMATS)}."}, status=400)
+
         session_data = {
             "subject_id": request.data.get("subject_id"),
             "topic": request.data.get("topic"),
@@ -93,24 +110,99 @@ class CreateSessionAPIView(APIView):
         if serializer.is_valid():
             session = serializer.save()
 
-            # ✅ Generate and return the QR as an image
-            return generate_session_qr_response(
-                subject_code=session.subject.code,
-                session_id=session.id,
-                topic=session.topic,
-                class_date=str(session.class_date),
-                start_time=str(session.start_time),
-            )
+            # ✅ Render, cache and return the QR as an image
+            return session_qr_response(request, session)
 
         return Response(serializer.errors, status=400)
 
 
+# ✅ Fetch a Session's QR (cached, supports If-None-Match → 304)
+class SessionQRAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsTeacherUserCustom]
+    renderer_classes = QR_RENDERER_CLASSES
+
+    def get(self, request, session_id):
+        session = Session.objects.select_related("subject").filter(id=session_id).first()
+        if not session:
+            return Response({"error": "Session not found."}, status=404)
+        return session_qr_response(request, session)
+
+
+# ✅ Rotating QR — poll for the frame of the current time window
+class SessionRotatingQRAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsTeacherUserCustom]
+    renderer_classes = QR_RENDERER_CLASSES
+
+    def get(self, request, session_id):
+        fmt, scale = negotiate_qr_format(request)
+        if fmt is None:
+            return Response({"error": f"Unknown format. Use one of: {', '.join(QR_FORMATS)}."}, status=400)
+        frames = get_rotating_frame_cache()
+
+        # ✅ Session fields are loaded once; later polls need no DB query
+        frame = frames.frame(session_id, fmt=fmt, scale=scale)
+        if frame is None:
+            session = Session.objects.select_related("subject").filter(id=session_id).first()
+            if not session:
+                return Response({"error": "Session not found."}, status=404)
+            frames.set_fields(session_id, session_fields(session))
+            frame = frames.frame(session_id, fmt=fmt, scale=scale)
+
+        window, etag, body, headers = frame
+        period = get_rotation_config()["PERIOD"]
+        expires_in = max(0, int((window + 1) * period - time.time()))
+
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type=QR_FORMATS[fmt])
+            for name, value in headers.items():
+                response[name] = value
+        response["ETag"] = f'"{etag}"'
+        response["Cache-Control"] = f"private, max-age={expires_in}"
+        response["Vary"] = "Accept"
+        response["X-QR-Window"] = str(window)
+        response["X-QR-Expires-In"] = str(expires_in)
+        return response
+
+
+# ✅ Bulk QR Sheets — ZIP of every session QR for a subject / date range
+class SessionQRSheetAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsTeacherUserCustom]
+
+    def get(self, request):
+        subject_id = request.query_params.get("subject_id")
+        date_from = request.query_params.get("date_from")
+        date_to = request.query_params.get("date_to")
+
+        if not (subject_id or date_from or date_to):
+            return Response(
+                {"error": "subject_id and/or a date_from/date_to range is required."},
+                status=400,
+            )
+
+        try:
+            filters = sheet_filters(subject_id, date_from, date_to)
+        except SheetFilterError as e:
+            return Response({"error": str(e)}, status=400)
+        sessions = sheet_sessions(**filters)
+
+        # ✅ Streamed as it renders — the whole ZIP is never held in memory
+        response = StreamingHttpResponse(
+            stream_qr_sheet_zip(sessions, workers=settings.QR_SHEET_WORKERS),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = 'attachment; filename="session_qr_codes.zip"'
+        return response
+
+
 # ✅ 3️⃣ View My Subjects
 class TeacherSubjectsAPIView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherUserCustom]
 
+    @cached_response("subject", "teacher")
     def get(self, request, teacher_id):
-        subjects = Subject.objects.filter(teacher_id=teacher_id).order_by("code")
+        subjects = Subject.objects.filter(teacher_id=teacher_id).select_related("teacher").order_by("code")
         serializer = SubjectSerializer(subjects, many=True)
         return Response(serializer.data, status=200)
 
@@ -119,8 +211,13 @@ class TeacherSubjectsAPIView(APIView):
 class SubjectSessionsAPIView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherUserCustom]
 
+    @cached_response("session", "subject", "teacher")
     def get(self, request, subject_id):
-        sessions = Session.objects.filter(subject_id=subject_id).order_by("-class_date")
+        sessions = (
+            Session.objects.filter(subject_id=subject_id)
+            .select_related("subject__teacher")
+            .order_by("-class_date")
+        )
         serializer = SessionSerializer(sessions, many=True)
         return Response(serializer.data, status=200)
 
@@ -130,9 +227,13 @@ class SubjectAttendanceAPIView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherUserCustom]
 
     def get(self, request, subject_id):
-        attendance = Attendance.objects.filter(session__subject_id=subject_id)
+        attendance = Attendance.objects.filter(subject_id=subject_id)
+        try:
+            attendance, next_cursor = keyset_page(request, attendance, [("id", "id")])
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=400)
         serializer = AttendanceSerializer(attendance, many=True)
-        return Response(serializer.data, status=200)
+        return paginated_response(request, serializer.data, next_cursor)
 
 
 # ✅ 6️⃣ Check Attendance % for a Specific Student
@@ -140,13 +241,16 @@ class SubjectAttendanceAPIView(APIView):
 class StudentAttendancePercentageAPIView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherUserCustom]
 
+    @cached_response("attendance", "subject")
     def get(self, request, subject_id, student_id):
-        queryset = Attendance.objects.filter(
-            session__subject_id=subject_id, student__student_id=student_id
+        # ✅ One aggregate over the denormalized subject FK (no join through Session)
+        stats = Attendance.objects.filter(subject_id=subject_id, student_id=student_id).aggregate(
+            total_classes=Count("id"),
+            attended=Count("id", filter=Q(status="Present")),
         )
 
-        total_classes = queryset.count()
-        attended_classes = queryset.filter(status="Present").count()
+        total_classes = stats["total_classes"]
+        attended_classes = stats["attended"]
 
         if total_classes == 0:
             return Response({"message": "No attendance records found."}, status=404)
@@ -171,39 +275,47 @@ class StudentAttendancePercentageAPIView(APIView):
 class SubjectAllStudentsAttendanceAPIView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherUserCustom]
 
+    @cached_response("attendance", "subject")
     def get(self, request, subject_id):
         # ✅ Fetch attendance summary per student for a given subject
-        attendance_summary = (
-            Attendance.objects
-            .filter(session__subject_id=subject_id)
-            .values("student__student_id")
-            .annotate(
-                total_classes=Count("id"),
-                attended=Count("id", filter=Q(status="Present"))
-            )
-            .order_by("student__student_id")
-        )
+        attendance_summary = list(summary_rows(
+            AttendanceSummary.objects
+            .filter(subject_id=subject_id, total_classes__gt=0)
+            .order_by("student_id"),
+            subject_code=F("subject__code"),
+        ))
 
         if not attendance_summary:
             return Response({"message": "No attendance data found."}, status=404)
 
-        # ✅ Normalize data for serializer
-        formatted_data = []
-        subject = Subject.objects.filter(id=subject_id).first()
-        subject_code = subject.code if subject else "Unknown"
-
-        for record in attendance_summary:
-            total = record["total_classes"]
-            attended = record["attended"]
-            percentage = round((attended / total) * 100, 2) if total else 0.0
-
-            formatted_data.append({
-                "subject_code": subject_code,                # ✅ Added this field
-                "student_id": record["student__student_id"], # ✅ Renamed
-                "total_classes": total,
-                "attended": attended,
-                "percentage": percentage,
-            })
-
-        serializer = AttendancePercentageSerializer(formatted_data, many=True)
-        return Response(serializer.data, status=200)
+        # ✅ Counters go straight to JSON (no serializer pass)
+        return summary_json_response(attendance_summary, status=200)
+
+
+# ✅ 7️⃣ Attendance Trends (daily / rolling / weekly / weekday / topic)
+class AttendanceTrendsAPIView(APIView):
+    """
+    Attendance trends for a subject (?subject=<code>) and/or a student
+    department (?department=), optionally within ?date_from=&date_to=.
+    ?window= sets the rolling rate's span in class days.
+    """
+    permission_classes = [IsAuthenticated, IsTeacherUserCustom]
+
+    @cached_response("attendance", "session", "subject", "student")
+    def get(self, request):
+        try:
+            filters = export_filters(request.query_params)
+        except ExportFilterError as e:
+            return Response({"error": str(e)}, status=400)
+        if not filters["subject"] and not filters["department"]:
+            return Response({"error": "Pass subject and/or department."}, status=400)
+
+        arrays = fetch_trend_arrays(filters)
+        if not len(arrays["session_id"]):
+            return Response({"message": "No sessions found."}, status=404)
+
+        trends = compute_trends(arrays, window=rolling_window(request))
+        trends["scope"] = {
+            key: str(value) if value else None for key, value in filters.items()
+        }
+        return Response(trends, status=200)
@@ -2,6 +2,9 @@
 ASGI config for qr_attendance project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections go to the live QR scan
+channel (``/ws/student/scan/``, see core/views/scan_socket.py). Serve it with
+an ASGI server, e.g. ``gunicorn -k uvicorn.workers.UvicornWorker``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +16,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'qr_attendance.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up (the scan socket uses the ORM and DRF)
+from core.views.scan_socket import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -86,6 +86,23 @@ DATABASES = {
 }
 
 
+# ✅ Local / CI PostgreSQL (e.g. the GitHub Actions service container) instead of Railway
+if os.getenv('POSTGRES_HOST'):
+    DATABASES['default'].update({
+        'NAME': os.getenv('POSTGRES_DB', 'postgres'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('POSTGRES_HOST'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+    })
+
+# ✅ Time zone — Session class_date/start_time/end_time are naive wall-clock
+#    times read in this zone (scan windows, QR token expiry). Set it to the
+#    campus zone; America/Chicago is Django's implicit default, kept so existing
+#    sessions keep their meaning.
+TIME_ZONE = os.getenv('TIME_ZONE', 'America/Chicago')
+USE_TZ = True
+
 # ✅ Django REST Framework & JWT Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -97,6 +114,10 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # ✅ Admission control — mark endpoints set their own classes (core/throttles.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttles.ReadAdmissionThrottle',
+    ],
     'DEFAULT_PARSER_CLASSES': [
     'rest_framework.parsers.JSONParser',
     'rest_framework.parsers.MultiPartParser',   # ✅ allows file uploads
@@ -113,6 +134,138 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# ✅ QR decode process pool (see core/utils/decode_pool.py)
+QR_DECODE_POOL = {
+    'ENABLED': os.getenv('QR_DECODE_POOL_ENABLED', 'true').lower() == 'true',
+    'MAX_WORKERS': int(os.getenv('QR_DECODE_POOL_WORKERS', '2')),
+    'MAX_PENDING': int(os.getenv('QR_DECODE_POOL_PENDING', '8')),
+    'TIMEOUT': float(os.getenv('QR_DECODE_TIMEOUT', '5')),
+    'BATCH_TIMEOUT': float(os.getenv('QR_DECODE_BATCH_TIMEOUT', '10')),
+    'OPENCV_THREADS': 1,
+}
+
+# ✅ QR decode result cache (see core/utils/decode_cache.py)
+QR_DECODE_CACHE = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 2048,
+    'DEFAULT_TTL': 3600,
+    'NEGATIVE_TTL': 60,
+}
+
+# ✅ QR decoder backends (see core/utils/qr_decoders.py)
+#    None → adaptive ordering; e.g. "pyzbar,opencv" pins the try order.
+QR_DECODER_ORDER = [name for name in os.getenv('QR_DECODER_ORDER', '').split(',') if name] or None
+
+# ✅ Signed QR tokens (see core/utils/qr_token.py)
+QR_TOKEN_GRACE_SECONDS = 300          # token stays valid this long after the session ends
+# Migration switch for QR codes printed before tokens were signed: off by
+# default (a hand-written "subject,session,topic,date,start" would otherwise
+# pass). When turned on it still stops working after the sunset date.
+QR_ACCEPT_UNSIGNED = os.getenv('QR_ACCEPT_UNSIGNED', 'false').lower() == 'true'
+QR_ACCEPT_UNSIGNED_UNTIL = os.getenv('QR_ACCEPT_UNSIGNED_UNTIL', '2026-12-31')
+
+# ✅ Rotating QR codes (see core/utils/qr_rotation.py)
+QR_ROTATION = {
+    'PERIOD': int(os.getenv('QR_ROTATION_PERIOD', '10')),
+    'GRACE_WINDOWS': 1,
+    'PRECOMPUTE': 6,
+    'MAX_FRAMES': 512,
+    'REQUIRED': os.getenv('QR_ROTATION_REQUIRED', 'false').lower() == 'true',
+}
+
+# ✅ Bulk QR sheet export — render processes per request
+QR_SHEET_WORKERS = int(os.getenv('QR_SHEET_WORKERS', '2'))
+
+# ✅ Write-behind attendance ingestion (see core/utils/attendance_spool.py)
+#    Marks are fsynced to a local spool, acknowledged, and bulk-inserted in batches.
+ATTENDANCE_SPOOL = {
+    'ENABLED': os.getenv('ATTENDANCE_SPOOL_ENABLED', 'false').lower() == 'true',
+    'PATH': os.getenv('ATTENDANCE_SPOOL_PATH', os.path.join(BASE_DIR, 'var', 'attendance_spool')),
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 0.5,
+    'FSYNC': True,
+    # Duplicate claims and not-yet-flushed marks (read-your-writes) live in this
+    # cache: only shared when CACHES is Redis (REDIS_URL). With the LocMem fallback
+    # two workers may both acknowledge the same mark, and a mark is only visible
+    # to the worker that took it until the flush stores it.
+    'CLAIM_CACHE': 'default',
+    'CLAIM_TTL': 300,
+}
+
+# ✅ Active-session registry (see core/utils/session_registry.py)
+#    Scans are accepted from OPEN_BEFORE seconds before start_time
+#    until CLOSE_AFTER seconds after end_time.
+ACTIVE_SESSION_REGISTRY = {
+    'ENABLED': True,
+    'TTL': 30,
+    'NEGATIVE_TTL': 5,
+    'MAX_ENTRIES': 1024,
+    'OPEN_BEFORE': int(os.getenv('SESSION_OPEN_BEFORE', '900')),
+    'CLOSE_AFTER': int(os.getenv('SESSION_CLOSE_AFTER', '300')),
+}
+
+# ✅ Idempotency-Key replay for mark-attendance retries (see core/utils/idempotency.py)
+IDEMPOTENCY = {
+    'ENABLED': True,
+    'CACHE': 'default',      # claims are shared across workers only with REDIS_URL set
+    'TTL': 600,
+    'LOCK_TTL': 60,
+    'WAIT_TIMEOUT': 10,
+}
+
+# ✅ Admission control / load shedding (see core/utils/admission.py)
+#    Budgets are per worker process.
+ADMISSION_CONTROL = {
+    'ENABLED': os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true',
+    'RATE': int(os.getenv('ADMISSION_RATE', '100')),
+    'BURST': int(os.getenv('ADMISSION_BURST', '200')),
+    'READ_RESERVE': 0.25,
+    'SESSION_RATE': 10,
+    'SESSION_BURST': 40,
+    # Per process: only binds under threaded (gthread) / ASGI workers, since a
+    # sync gunicorn worker never runs more than one decode at a time.
+    'MAX_CONCURRENT_DECODES': int(os.getenv('ADMISSION_MAX_DECODES', '4')),
+}
+
+# ✅ Keyset pagination for list endpoints (see core/pagination.py) — opt-in:
+#    only requests with ?limit= or ?cursor= are paginated
+KEYSET_PAGINATION = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+}
+
+# ✅ Shared cache for response caching / invalidation counters, idempotency
+#    keys and spool claims. Without REDIS_URL each worker process keeps its own
+#    local-memory cache, and the response cache stays off (see below).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# ✅ Read-endpoint response cache with ETag / 304 (see core/utils/response_cache.py)
+#    Requires REDIS_URL: with a per-process cache, invalidations would not reach
+#    other workers, so the cache only switches on over a shared backend.
+RESPONSE_CACHE = {
+    'ENABLED': os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true',
+    'CACHE': 'default',
+    'TTL': 300,
+}
+
+# ✅ Streaming CSV / NDJSON exports (see core/utils/attendance_export.py)
+ATTENDANCE_EXPORT = {
+    'CHUNK_SIZE': 2000,
+    'ROWS_PER_CHUNK': 500,
+}
+
+# ✅ Attendance trend analytics (see core/utils/attendance_trends.py)
+ATTENDANCE_TRENDS = {
+    'ROLLING_WINDOW': 3,
+    'MAX_ROLLING_WINDOW': 30,
+}
+
 # ✅ Allow API access from frontend or Postman
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -125,6 +278,20 @@ CORS_ALLOW_HEADERS = [
     'dnt',
     'cache-control',
     'x-requested-with',
+    'idempotency-key',
+    'if-none-match',
+]
+CORS_EXPOSE_HEADERS = [
+    'link',
+    'x-next-cursor',
+    'etag',
+    'retry-after',
+    'idempotent-replayed',
+    'x-qr-window',
+    'x-qr-expires-in',
+    'x-qr-modules',
+    'content-disposition',
+    'cache-control',
 ]
 
 STATIC_URL = '/static/'